@@ -0,0 +1,72 @@
+"""
+Precalentamiento del servidor.
+
+Importar backend.main no toca la BD ni carga nada pesado: pandas, sklearn,
+los modelos, WeasyPrint (en los procesos de reportes), la foto heurística y
+el catálogo de recomendaciones se cargan la primera vez que se usan. Así un
+worker arranca rápido y aunque la BD no responda.
+
+Al iniciar la app, `Precalentamiento` recorre esos mismos pasos en un hilo
+en segundo plano para que la primera petición real no pague la carga. Un
+paso que falla queda registrado con su error y no detiene a los demás; el
+componente se vuelve a intentar cuando una petición lo necesite.
+"""
+import threading
+import time
+import traceback
+
+
+class Precalentamiento:
+    """`pasos`: lista de (nombre, función sin argumentos), en orden."""
+
+    def __init__(self, pasos, activo=True):
+        self.pasos = list(pasos)
+        self.activo = activo
+        self._estado = {nombre: {"estado": "pendiente"} for nombre, _ in self.pasos}
+        self._lock = threading.Lock()
+        self._hilo = None
+        self.iniciado_en = None
+        self.terminado_en = None
+
+    def iniciar(self):
+        """Lanza el hilo (una sola vez). No bloquea."""
+        with self._lock:
+            if not self.activo or self._hilo is not None:
+                return
+            self.iniciado_en = time.monotonic()
+            self._hilo = threading.Thread(target=self._correr, name="precalentamiento", daemon=True)
+            self._hilo.start()
+
+    def esperar(self, timeout=None):
+        hilo = self._hilo
+        if hilo is not None:
+            hilo.join(timeout)
+
+    def estado(self):
+        with self._lock:
+            total = None
+            if self.iniciado_en is not None:
+                total = (self.terminado_en or time.monotonic()) - self.iniciado_en
+            return {
+                "activo": self.activo,
+                "terminado": self.terminado_en is not None,
+                "segundos": total,
+                "pasos": {nombre: dict(estado) for nombre, estado in self._estado.items()},
+            }
+
+    def _correr(self):
+        for nombre, funcion in self.pasos:
+            inicio = time.perf_counter()
+            try:
+                funcion()
+                resultado = {"estado": "listo"}
+            except Exception:
+                resultado = {
+                    "estado": "error",
+                    "error": traceback.format_exc(limit=1).strip().splitlines()[-1],
+                }
+            resultado["segundos"] = time.perf_counter() - inicio
+            with self._lock:
+                self._estado[nombre] = resultado
+        with self._lock:
+            self.terminado_en = time.monotonic()
@@ -0,0 +1,503 @@
+"""
+SQL Server falso sobre SQLite, para desarrollo y benchmarks sin acceso al
+servidor de producción.
+
+Las tablas viven en un archivo SQLite adjuntado como esquema `dbo`, así que
+`dbo.Tabla`, `[dbo].[Tabla]`, `[PBI_Docencia].[dbo].[Tabla]` y el nombre
+solo resuelven a la misma tabla. La conexión se comporta como una de pyodbc
+para lo que usa el backend:
+
+- `cursor.execute(sql, *params)` o `cursor.execute(sql, [params])`;
+- lotes de varias sentencias separadas por `;`, con un result set por cada
+  SELECT que se recorren con `nextset()`;
+- `fast_executemany` (se acepta y se ignora) y `executemany`;
+- DATETIME llega como `datetime`, y los `datetime` de los parámetros se
+  guardan como el mismo texto que GETDATE(). Los parámetros los convierte
+  el cursor (no hay adaptador global de sqlite3); el conversor de DATETIME
+  se registra recién en `conectar()`, solo cuando se usa la base falsa.
+
+El T-SQL se traduce antes de ejecutarlo (`traducir`), y solo cubre lo que
+el código del repositorio ejecuta: TOP, ISNULL, TRY_CAST, GETDATE, FORMAT
+con cultura es-ES, tablas temporales #, SELECT ... INTO, IF OBJECT_ID(...)
+DROP TABLE y el MERGE ... OUTPUT de backend/factores_apoyo.py. No hay
+triggers ni CROSS APPLY: RamosReprobados la materializa el generador de
+cohortes (backend/cohorte_sintetica.py) igual que `--reconstruir`.
+
+    conn = bd_falsa.conectar("cohorte.db")
+    db.configure_pool(lambda: bd_falsa.conectar("cohorte.db"))
+    DB_FALSA=cohorte.db uvicorn backend.main:app
+"""
+import re
+import sqlite3
+from datetime import datetime
+from functools import lru_cache
+
+# Segundos que una conexión espera a que otra libere la escritura
+TIMEOUT = 30.0
+
+MESES = ("enero", "febrero", "marzo", "abril", "mayo", "junio", "julio",
+         "agosto", "septiembre", "octubre", "noviembre", "diciembre")
+
+# Mismos nombres y tipos que en PBI_Docencia; los RUT son texto en todas las tablas
+ESQUEMA = """
+CREATE TABLE IF NOT EXISTS dbo.PACE2024_ACTUALIZADO (
+    RUT VARCHAR(12) PRIMARY KEY,
+    [NOMBRE COMPLETO] NVARCHAR(200),
+    Carrera NVARCHAR(200),
+    [AÑO DE INGRESO] INT,
+    Ciudad NVARCHAR(100),
+    [Via de Ingreso] NVARCHAR(100),
+    Estado NVARCHAR(50)
+);
+CREATE TABLE IF NOT EXISTS dbo.NotasPace2025 (
+    RUT VARCHAR(12),
+    [Denominación Actividad Curricular] NVARCHAR(200),
+    Nota_1 NVARCHAR(10), Nota_2 NVARCHAR(10), Nota_3 NVARCHAR(10),
+    Nota_4 NVARCHAR(10), Nota_5 NVARCHAR(10), Nota_6 NVARCHAR(10)
+);
+CREATE TABLE IF NOT EXISTS dbo.[Epaes$] (
+    RUT VARCHAR(12),
+    [PROMEDIO AUTOEFICACIA ACADÉMICA] FLOAT,
+    [PROMEDIO AUTODETERMINACIÓN PERSONAL] FLOAT,
+    [PROMEDIO MODULACIÓN EMOCIONAL] FLOAT,
+    [PROMEDIO SOCIABILIDAD] FLOAT,
+    [PROMEDIO ANTICIPACIÓN ANALÍTICA] FLOAT,
+    [PROMEDIO PROSPECTIVA ACADÉMICA] FLOAT,
+    [PROMEDIO COMUNICACIÓN EFECTIVA] FLOAT
+);
+CREATE TABLE IF NOT EXISTS dbo.[Caracterizacion_Ingreso$] (
+    [Institución] VARCHAR(12),
+    [Género] NVARCHAR(50),
+    [¿Eres padre/madre?] NVARCHAR(10),
+    [Durante el año, ¿trabajarás para costear tus estudios y gastos p] NVARCHAR(10),
+    [(5) ¿Cuentas con alguna beca?] NVARCHAR(10),
+    [¿Cuentas con algún crédito universitario?] NVARCHAR(10),
+    [¿Hay algún otro miembro de tu núcleo familiar que haya ingresado] NVARCHAR(10),
+    [(3) ¿Tienes algún tipo de discapacidad?] NVARCHAR(10),
+    [(4) ¿Presentas alguna condición de salud que ha dificultado tus ] NVARCHAR(10),
+    [Fecha de nacimiento] NVARCHAR(50)
+);
+CREATE TABLE IF NOT EXISTS dbo.RamosReprobadosDetalle (
+    RUT VARCHAR(12),
+    [Denominación Actividad Curricular] NVARCHAR(200)
+);
+CREATE TABLE IF NOT EXISTS dbo.RamosReprobados (
+    RUT VARCHAR(12) PRIMARY KEY,
+    RamosReprobados INT
+);
+CREATE TABLE IF NOT EXISTS dbo.EvaluacionRiesgo (
+    Id INTEGER PRIMARY KEY,
+    Run VARCHAR(12),
+    NombreCompleto NVARCHAR(200),
+    Carrera NVARCHAR(200),
+    NivelRiesgo NVARCHAR(20),
+    FechaEvaluacion DATETIME
+);
+CREATE TABLE IF NOT EXISTS dbo.EvaluacionDeRut (
+    Id INTEGER PRIMARY KEY,
+    Run VARCHAR(12),
+    NombreCompleto NVARCHAR(200),
+    Carrera NVARCHAR(200),
+    NivelRiesgo NVARCHAR(20),
+    NivelRiesgoAcademico NVARCHAR(20),
+    NivelRiesgoPsicologico NVARCHAR(20),
+    NivelRiesgoInterseccional NVARCHAR(20),
+    FechaEvaluacion DATETIME
+);
+CREATE TABLE IF NOT EXISTS dbo.Recomendaciones (
+    TipoRiesgo NVARCHAR(50),
+    NivelRiesgo NVARCHAR(20),
+    Acciones NVARCHAR(2000)
+);
+CREATE TABLE IF NOT EXISTS dbo.FactoresPsicologicos (
+    rut_estudiante VARCHAR(12) PRIMARY KEY,
+    nivel_riesgo NVARCHAR(20),
+    esta_recibiendo_apoyo INT,
+    nombre_profesional NVARCHAR(200),
+    observaciones NVARCHAR(2000),
+    fecha_registro DATETIME DEFAULT (strftime('%Y-%m-%dT%H:%M:%f', 'now', 'localtime'))
+);
+CREATE TABLE IF NOT EXISTS dbo.FactoresAcademicos (
+    rut_estudiante VARCHAR(12) PRIMARY KEY,
+    nivel_riesgo NVARCHAR(20),
+    esta_recibiendo_apoyo INT,
+    nombre_profesional NVARCHAR(200),
+    observaciones NVARCHAR(2000),
+    fecha_registro DATETIME DEFAULT (strftime('%Y-%m-%dT%H:%M:%f', 'now', 'localtime'))
+);
+"""
+
+# Los de SQL Server, más uno por expresión para los JOIN con CAST(RUT AS VARCHAR)
+INDICES = """
+CREATE INDEX IF NOT EXISTS dbo.IX_PACE_Carrera ON PACE2024_ACTUALIZADO (Carrera, RUT);
+CREATE INDEX IF NOT EXISTS dbo.IX_NotasPace2025_RUT ON NotasPace2025 (RUT);
+CREATE INDEX IF NOT EXISTS dbo.IX_Epaes_RUT ON [Epaes$] (RUT);
+CREATE INDEX IF NOT EXISTS dbo.IX_Epaes_RUT_Texto ON [Epaes$] (CAST(RUT AS VARCHAR));
+CREATE INDEX IF NOT EXISTS dbo.IX_Caracterizacion_Institucion ON [Caracterizacion_Ingreso$] ([Institución]);
+CREATE INDEX IF NOT EXISTS dbo.IX_RamosReprobadosDetalle_RUT ON RamosReprobadosDetalle (RUT);
+CREATE INDEX IF NOT EXISTS dbo.IX_EvaluacionRiesgo_Run ON EvaluacionRiesgo (Run, FechaEvaluacion);
+CREATE INDEX IF NOT EXISTS dbo.IX_EvaluacionDeRut_Run ON EvaluacionDeRut (Run, FechaEvaluacion);
+"""
+
+
+# -- tipos y funciones de SQL Server ----------------------------------------
+
+def fecha_a_texto(valor):
+    """Texto con que se guarda un DATETIME: el mismo de GETDATE() y de
+    paginacion._valor_cursor, así comparan bien."""
+    return valor.isoformat(timespec="milliseconds")
+
+
+def _texto_a_fecha(valor):
+    return datetime.fromisoformat(valor.decode())
+
+
+def _parametro(valor):
+    return fecha_a_texto(valor) if isinstance(valor, datetime) else valor
+
+_NUMERO = re.compile(r"\s*[+-]?(\d+\.?\d*|\.\d+)([eE][+-]?\d+)?\s*")
+
+
+def _try_float(valor):
+    """TRY_CAST(valor AS FLOAT): NULL si no es un número ("5,5" incluido)."""
+    if valor is None or isinstance(valor, (int, float)):
+        return valor
+    if isinstance(valor, str) and _NUMERO.fullmatch(valor):
+        return float(valor)
+    return None
+
+
+def _try_int(valor):
+    numero = _try_float(valor)
+    return None if numero is None or numero != int(numero) else int(numero)
+
+
+def _getdate():
+    return fecha_a_texto(datetime.now())
+
+
+_FORMATO_FECHA = re.compile(r"'(?:[^']|'')*'|yyyy|yy|MMMM|MMM|MM|M|dd|d|HH|H|mm|ss|.", re.S)
+
+
+def _format(valor, patron, cultura=None):
+    """FORMAT(fecha, patron[, 'es-ES']) con los especificadores de .NET que
+    usa el backend; los nombres de mes van siempre en español."""
+    if valor is None or patron is None:
+        return None
+    fecha = datetime.fromisoformat(valor) if isinstance(valor, str) else valor
+    partes = []
+    for token in _FORMATO_FECHA.findall(patron):
+        if token.startswith("'"):
+            partes.append(token[1:-1].replace("''", "'"))
+        else:
+            partes.append({
+                "yyyy": f"{fecha.year:04d}", "yy": f"{fecha.year % 100:02d}",
+                "MMMM": MESES[fecha.month - 1], "MMM": MESES[fecha.month - 1][:3],
+                "MM": f"{fecha.month:02d}", "M": str(fecha.month),
+                "dd": f"{fecha.day:02d}", "d": str(fecha.day),
+                "HH": f"{fecha.hour:02d}", "H": str(fecha.hour),
+                "mm": f"{fecha.minute:02d}", "ss": f"{fecha.second:02d}",
+            }.get(token, token))
+    return "".join(partes)
+
+
+# -- traducción de T-SQL ----------------------------------------------------
+
+# Literales y nombres entre corchetes/comillas: se ocultan mientras se reescribe
+_LITERAL = re.compile(r"'(?:[^']|'')*'|\[[^\]]*\]|\"[^\"]*\"")
+_MARCA = re.compile(r"\x00(\d+)\x00")
+
+
+def _enmascarar(sql):
+    literales = []
+
+    def marcar(coincidencia):
+        literales.append(coincidencia.group(0))
+        return f"\x00{len(literales) - 1}\x00"
+
+    return _LITERAL.sub(marcar, sql), literales
+
+
+def _desenmascarar(texto, literales):
+    return _MARCA.sub(lambda m: literales[int(m.group(1))], texto)
+
+
+def _cerrar_parentesis(texto, inicio):
+    """Índice del `)` que cierra el `(` en `inicio`."""
+    nivel = 0
+    for i in range(inicio, len(texto)):
+        if texto[i] == "(":
+            nivel += 1
+        elif texto[i] == ")":
+            nivel -= 1
+            if nivel == 0:
+                return i
+    raise ValueError("Paréntesis sin cerrar en la consulta")
+
+
+_TRY_CAST = {"FLOAT": "try_float", "REAL": "try_float", "INT": "try_int", "BIGINT": "try_int"}
+
+
+def _try_cast(texto):
+    # De atrás hacia adelante, así los TRY_CAST anidados se traducen primero
+    for coincidencia in reversed(list(re.finditer(r"\bTRY_CAST\s*\(", texto, re.I))):
+        abre = coincidencia.end() - 1
+        cierra = _cerrar_parentesis(texto, abre)
+        expresion, _, tipo = texto[abre + 1:cierra].rpartition(" AS ")
+        funcion = _TRY_CAST.get(tipo.strip().upper())
+        if funcion is None:
+            raise NotImplementedError(f"TRY_CAST a {tipo.strip()} no está soportado")
+        texto = f"{texto[:coincidencia.start()]}{funcion}({expresion}){texto[cierra + 1:]}"
+    return texto
+
+
+_SELECT_INTO = re.compile(
+    r"^SELECT\s+(?:TOP\s*\(?\s*(?P<top>\d+)\s*\)?\s+)?(?P<columnas>.+?)\s+INTO\s+(?P<destino>\S+)\s+FROM\s+(?P<resto>.+)$",
+    re.I | re.S,
+)
+_TOP = re.compile(r"^SELECT\s+TOP\s*(?:\(\s*(?P<valor>\?|\d+)\s*\)|(?P<numero>\d+))\s+", re.I)
+
+_MERGE = re.compile(
+    r"^MERGE\s+(?:INTO\s+)?(?P<tabla>\S+)\s+(?:WITH\s*\(\s*HOLDLOCK\s*\)\s+)?(?:AS\s+)?(?P<destino>\w+)\s+"
+    r"USING\s+(?P<origen>.+?)\s+(?:AS\s+)?(?P<fuente>\w+)\s+ON\s+(?P<on>.+?)\s+"
+    r"WHEN\s+MATCHED\s+THEN\s+UPDATE\s+SET\s+(?P<asignaciones>.+?)\s+"
+    r"WHEN\s+NOT\s+MATCHED(?:\s+BY\s+TARGET)?\s+THEN\s+INSERT\s*\((?P<columnas>[^)]*)\)\s*"
+    r"VALUES\s*\((?P<valores>.+)\)\s+OUTPUT\s+(?P<salida>.+)$",
+    re.I | re.S,
+)
+
+
+def _reescribir(texto):
+    """Reescribe una sentencia enmascarada a SQLite (sin TOP ni MERGE)."""
+    # [PBI_Docencia].[dbo].Tabla -> dbo.Tabla (el nombre de la base se ignora)
+    texto = re.sub(r"\x00\d+\x00\.(?=\x00\d+\x00\.|dbo\.)", "", texto)
+    texto = re.sub(r"\bISNULL\s*\(", "IFNULL(", texto, flags=re.I)
+    texto = _try_cast(texto)
+    texto = re.sub(r"(?<![\w\x00])#(\w+)", r'"#\1"', texto)
+
+    into = _SELECT_INTO.match(texto)
+    if into:
+        temporal = "TEMP " if into["destino"].startswith('"#') else ""
+        limite = f" LIMIT {into['top']}" if into["top"] is not None else ""
+        texto = (f"CREATE {temporal}TABLE {into['destino']} AS "
+                 f"SELECT {into['columnas']} FROM {into['resto']}{limite}")
+    return texto
+
+
+class _Sentencia:
+    """Una sentencia ya traducida: `sql` para SQLite y cuántos parámetros usa."""
+
+    def __init__(self, sql, parametros, rotar=False):
+        self.sql = sql
+        self.parametros = parametros
+        self.rotar = rotar  # TOP (?) pasó a LIMIT ?: el primer parámetro va al final
+
+    def ordenar(self, params):
+        return params[1:] + params[:1] if self.rotar else params
+
+    def ejecutar(self, cursor, params):
+        cursor.execute(self.sql, self.ordenar(params))
+
+
+class _Merge(_Sentencia):
+    """MERGE ... WHEN MATCHED UPDATE ... WHEN NOT MATCHED INSERT ... OUTPUT,
+    como UPDATE + INSERT sobre una copia temporal del origen. El OUTPUT
+    ($action incluido) se calcula antes de modificar la tabla."""
+
+    ORIGEN = '"#merge_origen"'
+
+    def __init__(self, partes, parametros, literales):
+        sql = {k: _desenmascarar(v, literales) for k, v in partes.items()}
+        origen = sql["origen"].strip()
+        if not origen.startswith("("):
+            origen = f"(SELECT * FROM {origen})"
+        accion = f"CASE WHEN {sql['destino']}.rowid IS NULL THEN 'INSERT' ELSE 'UPDATE' END"
+        salida = re.sub(r"\$action\b", accion, sql["salida"], flags=re.I)
+        union = f"{self.ORIGEN} AS {sql['fuente']}"
+        destino = f"{sql['tabla']} AS {sql['destino']}"
+        self.pasos = [
+            f"DROP TABLE IF EXISTS {self.ORIGEN}",
+            f"CREATE TEMP TABLE {self.ORIGEN} AS SELECT * FROM {origen}",
+        ]
+        self.salida = f"SELECT {salida} FROM {union} LEFT JOIN {destino} ON {sql['on']}"
+        self.cambios = [
+            f"UPDATE {destino} SET {sql['asignaciones']} FROM {union} WHERE {sql['on']}",
+            f"INSERT INTO {sql['tabla']} ({sql['columnas']}) SELECT {sql['valores']} FROM {union} "
+            f"WHERE NOT EXISTS (SELECT 1 FROM {destino} WHERE {sql['on']})",
+            f"DROP TABLE {self.ORIGEN}",
+        ]
+        super().__init__(self.salida, parametros)
+
+    def ejecutar(self, cursor, params):
+        cursor.execute(self.pasos[0])
+        cursor.execute(self.pasos[1], params)
+        cursor.execute(self.salida)
+        filas = cursor.fetchall()
+        descripcion = cursor.description
+        for paso in self.cambios:
+            cursor.execute(paso)
+        return descripcion, filas
+
+
+def _partir(texto):
+    """Sentencias del lote enmascarado, separadas por `;`."""
+    return [s.strip() for s in texto.split(";") if s.strip()]
+
+
+@lru_cache(maxsize=512)
+def traducir(sql):
+    """Lista de _Sentencia equivalentes al lote T-SQL `sql`."""
+    texto, literales = _enmascarar(sql)
+    sentencias = []
+    for sentencia in _partir(texto):
+        parametros = sentencia.count("?")
+        if re.fullmatch(r"SET\s+NOCOUNT\s+(ON|OFF)", sentencia, re.I):
+            continue
+        sentencia = re.sub(
+            r"^IF\s+OBJECT_ID\s*\(\s*\x00\d+\x00\s*\)\s+IS\s+NOT\s+NULL\s+DROP\s+TABLE\s+",
+            "DROP TABLE IF EXISTS ", sentencia, flags=re.I,
+        )
+        sentencia = _reescribir(sentencia)
+
+        merge = _MERGE.match(sentencia)
+        if merge:
+            sentencias.append(_Merge(merge.groupdict(), parametros, literales))
+            continue
+
+        rotar = False
+        top = _TOP.match(sentencia)
+        if top:
+            valor = top["valor"] or top["numero"]
+            rotar = valor == "?"
+            sentencia = f"SELECT {sentencia[top.end():]} LIMIT {valor}"
+        sentencias.append(_Sentencia(_desenmascarar(sentencia, literales), parametros, rotar))
+    return sentencias
+
+
+# -- conexión y cursor estilo pyodbc ----------------------------------------
+
+class CursorFalso:
+    """Cursor DBAPI con la semántica de pyodbc que usa el backend.
+
+    Un lote de una sola sentencia se lee directo del cursor de SQLite (sin
+    materializar, para fetchmany por tramos); en lotes de varias sentencias
+    cada result set se guarda en memoria y `nextset()` pasa al siguiente."""
+
+    def __init__(self, conexion):
+        self._cursor = conexion.cursor()
+        self._resultados = []
+        self._filas = None
+        self.description = None
+        self.rowcount = -1
+        self.fast_executemany = False
+
+    def execute(self, sql, *params):
+        if len(params) == 1 and isinstance(params[0], (list, tuple)):
+            params = params[0]
+        params = [_parametro(p) for p in params]
+        sentencias = traducir(sql)
+        if sum(s.parametros for s in sentencias) != len(params):
+            raise sqlite3.ProgrammingError(
+                f"La consulta usa {sum(s.parametros for s in sentencias)} parámetros y se pasaron {len(params)}"
+            )
+
+        self._resultados, self._filas, self.description = [], None, None
+        if len(sentencias) == 1 and type(sentencias[0]) is _Sentencia:
+            sentencias[0].ejecutar(self._cursor, params)
+            self.description = self._cursor.description
+            self.rowcount = self._cursor.rowcount
+            return self
+
+        for sentencia in sentencias:
+            propios, params = params[:sentencia.parametros], params[sentencia.parametros:]
+            resultado = sentencia.ejecutar(self._cursor, propios)
+            if resultado is None and self._cursor.description is not None:
+                resultado = (self._cursor.description, self._cursor.fetchall())
+            if resultado is not None:
+                self._resultados.append(resultado)
+        self.rowcount = self._cursor.rowcount
+        self.nextset()
+        return self
+
+    def executemany(self, sql, filas):
+        (sentencia,) = traducir(sql)
+        self._cursor.executemany(sentencia.sql, [sentencia.ordenar([_parametro(v) for v in fila]) for fila in filas])
+        self.rowcount = self._cursor.rowcount
+        self.description = None
+
+    def nextset(self):
+        if not self._resultados:
+            self._filas, self.description = None, None
+            return False
+        self.description, filas = self._resultados.pop(0)
+        self._filas = iter(filas)
+        return True
+
+    def fetchone(self):
+        if self._filas is None:
+            return self._cursor.fetchone()
+        return next(self._filas, None)
+
+    def fetchmany(self, tamano=1):
+        if self._filas is None:
+            return self._cursor.fetchmany(tamano)
+        return [fila for _, fila in zip(range(tamano), self._filas)]
+
+    def fetchall(self):
+        if self._filas is None:
+            return self._cursor.fetchall()
+        return list(self._filas)
+
+    def __iter__(self):
+        return iter(self.fetchone, None)
+
+    def close(self):
+        self._resultados, self._filas = [], None
+        self._cursor.close()
+
+
+class ConexionFalsa:
+    """Conexión DBAPI sobre SQLite que acepta el T-SQL del backend.
+    `sqlite` es la conexión nativa, para SQL propio de SQLite."""
+
+    def __init__(self, sqlite):
+        self.sqlite = sqlite
+
+    def cursor(self):
+        return CursorFalso(self.sqlite)
+
+    def execute(self, sql, *params):
+        return self.cursor().execute(sql, *params)
+
+    def commit(self):
+        self.sqlite.commit()
+
+    def rollback(self):
+        self.sqlite.rollback()
+
+    def close(self):
+        self.sqlite.close()
+
+
+def conectar(ruta, timeout=TIMEOUT):
+    """Abre `ruta` (se crea con el esquema si no existe) como base falsa."""
+    # Los conversores de sqlite3 son del proceso: solo afecta a conexiones
+    # abiertas con PARSE_DECLTYPES y se registra al usar la base falsa
+    sqlite3.register_converter("DATETIME", _texto_a_fecha)
+    sqlite = sqlite3.connect(":memory:", timeout=timeout, detect_types=sqlite3.PARSE_DECLTYPES,
+                             check_same_thread=False)
+    sqlite.execute("ATTACH DATABASE ? AS dbo", [str(ruta)])
+    sqlite.execute("PRAGMA dbo.journal_mode = WAL")
+    sqlite.create_function("try_float", 1, _try_float, deterministic=True)
+    sqlite.create_function("try_int", 1, _try_int, deterministic=True)
+    sqlite.create_function("GETDATE", 0, _getdate)
+    sqlite.create_function("FORMAT", 2, _format, deterministic=True)
+    sqlite.create_function("FORMAT", 3, _format, deterministic=True)
+    crear_esquema(sqlite)
+    return ConexionFalsa(sqlite)
+
+
+def crear_esquema(sqlite):
+    """Crea en `sqlite` (conexión nativa con `dbo` adjuntado) las tablas e
+    índices que falten."""
+    sqlite.executescript(ESQUEMA + INDICES)
@@ -0,0 +1,260 @@
+"""
+Bosques aleatorios compilados a arreglos NumPy planos.
+
+Un RandomForestClassifier de sklearn guarda cada árbol como un objeto Tree
+con una estructura de 64 bytes por nodo más `value` para todos los nodos, y
+cada `predict_proba` valida la entrada (DataFrame -> float32, nombres de
+columnas) y recorre los árboles uno por uno. Para una sola fila eso es casi
+todo el costo.
+
+`compilar` concatena todos los árboles en unos pocos arreglos:
+
+    caracteristica[n]  int32    columna que compara el nodo n
+    umbral[n]          float64  va a la izquierda si x <= umbral
+    izquierdo[n]       int32    hijos (las hojas apuntan a sí mismas)
+    derecho[n]         int32
+    nan_izquierda[n]   bool     a dónde va un NaN (missing_go_to_left)
+    hoja[n]            int32    fila de `valores` (-1 si no es hoja)
+    valores[h, c]      float64  probabilidades de la hoja h, ya normalizadas
+    raices[t]          int32    nodo raíz del árbol t
+
+y `BosqueCompilado.predict_proba` recorre todos los árboles (y todas las
+filas) a la vez, un nivel por iteración. Reproduce exactamente las
+operaciones de sklearn: X se convierte a float32, la comparación es `<=`
+contra el umbral float64, cada hoja vale lo mismo que en
+DecisionTreeClassifier.predict_proba (normalizada solo en las versiones de
+scikit-learn que guardan conteos en `tree_.value`) y los árboles se suman en orden
+antes de dividir por la cantidad de árboles. Las probabilidades son
+idénticas bit a bit, no solo cercanas.
+
+    python -m backend.bosque_compilado modelo_riesgo.pkl modelo_hibrido.pkl
+
+escribe modelo_*.npz junto a cada .pkl (después de verificar que coincide
+con predict_proba en datos aleatorios). backend/modelos.py los usa si
+corresponden al SHA-256 del .pkl vigente.
+"""
+import argparse
+import hashlib
+from pathlib import Path
+
+import numpy as np
+
+# Versión del formato .npz (cambia si cambian los arreglos guardados)
+FORMATO = 2
+
+ARREGLOS = ("caracteristica", "umbral", "izquierdo", "derecho", "nan_izquierda", "hoja", "valores", "raices")
+
+
+def _hojas_con_conteos():
+    """Antes de scikit-learn 1.4 `tree_.value` guarda conteos por clase y
+    predict_proba los normaliza; desde 1.4 ya guarda fracciones y
+    predict_proba las devuelve tal cual (normalizarlas de nuevo cambia el
+    último bit)."""
+    import sklearn
+
+    version = tuple(int(parte) for parte in sklearn.__version__.split(".")[:2])
+    return version < (1, 4)
+
+
+class ModeloNoCompilableError(TypeError):
+    """El estimador no es un bosque de árboles de clasificación de una salida."""
+
+
+class BosqueCompilado:
+    """Bosque de clasificación con la interfaz que usa el backend:
+    `classes_`, `predict_proba(X)` y `predict(X)`."""
+
+    def __init__(self, caracteristica, umbral, izquierdo, derecho, nan_izquierda, hoja, valores, raices,
+                 profundidad, clases, columnas=None):
+        self.caracteristica = caracteristica
+        self.umbral = umbral
+        self.izquierdo = izquierdo
+        self.derecho = derecho
+        self.nan_izquierda = nan_izquierda
+        self.hoja = hoja
+        self.valores = valores
+        self.raices = raices
+        self.profundidad = int(profundidad)
+        self.classes_ = clases
+        self.columnas = None if columnas is None else list(columnas)
+
+    @property
+    def n_estimators(self):
+        return len(self.raices)
+
+    @property
+    def nbytes(self):
+        return sum(getattr(self, nombre).nbytes for nombre in ARREGLOS)
+
+    def _matriz(self, X):
+        if hasattr(X, "columns") and self.columnas is not None:
+            X = X[self.columnas]
+        X = np.asarray(X, dtype=np.float32)  # igual que check_array(X, dtype=DTYPE) en sklearn
+        return X.reshape(1, -1) if X.ndim == 1 else X
+
+    def predict_proba(self, X):
+        X = self._matriz(X)
+        filas = np.arange(len(X))[:, None]
+        nodos = np.broadcast_to(self.raices, (len(X), len(self.raices)))
+        for _ in range(self.profundidad):
+            valor = X[filas, self.caracteristica[nodos]]
+            izquierda = (valor <= self.umbral[nodos]) | (np.isnan(valor) & self.nan_izquierda[nodos])
+            nodos = np.where(izquierda, self.izquierdo[nodos], self.derecho[nodos])
+        # Suma secuencial por árbol (cumsum no reordena) y luego el promedio
+        suma = np.cumsum(self.valores[self.hoja[nodos]], axis=1)[:, -1]
+        return suma / len(self.raices)
+
+    def predict(self, X):
+        return self.classes_[np.argmax(self.predict_proba(X), axis=1)]
+
+
+def entrada(modelo, filas, columnas):
+    """Matriz para `modelo.predict_proba` con `filas` en el orden de `columnas`:
+    arreglo float para un BosqueCompilado (sin DataFrame) y DataFrame con
+    nombres de columna para un estimador de sklearn."""
+    if isinstance(modelo, BosqueCompilado):
+        return np.array(filas, dtype=np.float64)
+    import pandas as pd
+
+    return pd.DataFrame(filas, columns=columnas)
+
+
+def compilar(modelo):
+    """BosqueCompilado equivalente a `modelo` (RandomForest/ExtraTrees de clasificación)."""
+    arboles = getattr(modelo, "estimators_", None)
+    if not arboles or getattr(modelo, "n_outputs_", 1) != 1 or not hasattr(modelo, "classes_"):
+        raise ModeloNoCompilableError(f"{type(modelo).__name__} no es un bosque de clasificación de una salida")
+
+    normalizar = _hojas_con_conteos()
+    partes = {nombre: [] for nombre in ARREGLOS}
+    desplazamiento = 0
+    hojas = 0
+    profundidad = 0
+    for arbol in arboles:
+        t = arbol.tree_
+        n = t.node_count
+        es_hoja = t.children_left == -1
+        propios = np.arange(n)
+
+        partes["raices"].append(desplazamiento)
+        partes["caracteristica"].append(np.where(es_hoja, 0, t.feature))
+        partes["umbral"].append(np.where(es_hoja, 0.0, t.threshold))
+        partes["izquierdo"].append(np.where(es_hoja, propios, t.children_left) + desplazamiento)
+        partes["derecho"].append(np.where(es_hoja, propios, t.children_right) + desplazamiento)
+        partes["nan_izquierda"].append(np.asarray(t.missing_go_to_left, dtype=bool))
+
+        indice = np.full(n, -1)
+        indice[es_hoja] = hojas + np.arange(es_hoja.sum())
+        partes["hoja"].append(indice)
+
+        # Igual que DecisionTreeClassifier.predict_proba
+        proba = t.value[es_hoja, 0, :modelo.n_classes_]
+        if normalizar:
+            normalizador = proba.sum(axis=1)[:, None]
+            normalizador[normalizador == 0.0] = 1.0
+            proba = proba / normalizador
+        partes["valores"].append(proba)
+
+        desplazamiento += n
+        hojas += int(es_hoja.sum())
+        profundidad = max(profundidad, t.max_depth)
+
+    return BosqueCompilado(
+        caracteristica=np.concatenate(partes["caracteristica"]).astype(np.int32),
+        umbral=np.concatenate(partes["umbral"]).astype(np.float64),
+        izquierdo=np.concatenate(partes["izquierdo"]).astype(np.int32),
+        derecho=np.concatenate(partes["derecho"]).astype(np.int32),
+        nan_izquierda=np.concatenate(partes["nan_izquierda"]),
+        hoja=np.concatenate(partes["hoja"]).astype(np.int32),
+        valores=np.concatenate(partes["valores"]).astype(np.float64),
+        raices=np.asarray(partes["raices"], dtype=np.int32),
+        profundidad=profundidad,
+        clases=np.asarray(modelo.classes_),
+        columnas=getattr(modelo, "feature_names_in_", None),
+    )
+
+
+def ruta_compilada(ruta_modelo):
+    return Path(ruta_modelo).with_suffix(".npz")
+
+
+def guardar(bosque, ruta, sha256_origen):
+    """Escribe el .npz (sin compresión) con el SHA-256 del .pkl de origen."""
+    extra = {} if bosque.columnas is None else {"columnas": np.asarray(bosque.columnas, dtype=str)}
+    with open(ruta, "wb") as destino:
+        np.savez(
+            destino,
+            formato=FORMATO,
+            sha256_origen=sha256_origen,
+            profundidad=bosque.profundidad,
+            clases=bosque.classes_,
+            **{nombre: getattr(bosque, nombre) for nombre in ARREGLOS},
+            **extra,
+        )
+
+
+def cargar(ruta, sha256_origen=None):
+    """BosqueCompilado de `ruta`, o None si no existe, es de otro formato o
+    (con `sha256_origen`) se compiló desde otro .pkl."""
+    ruta = Path(ruta)
+    if not ruta.exists():
+        return None
+    with np.load(ruta, allow_pickle=False) as datos:
+        if int(datos["formato"]) != FORMATO:
+            return None
+        if sha256_origen is not None and str(datos["sha256_origen"]) != sha256_origen:
+            return None
+        return BosqueCompilado(
+            **{nombre: datos[nombre] for nombre in ARREGLOS},
+            profundidad=int(datos["profundidad"]),
+            clases=datos["clases"],
+            columnas=datos["columnas"].tolist() if "columnas" in datos.files else None,
+        )
+
+
+def verificar(modelo, bosque, filas=2000, semilla=0):
+    """Compara predict_proba en filas aleatorias alrededor de los umbrales
+    (con algunos NaN). Lanza AssertionError si algo difiere."""
+    import pandas as pd
+
+    rng = np.random.default_rng(semilla)
+    n_columnas = modelo.n_features_in_
+    X = np.empty((filas, n_columnas))
+    for j in range(n_columnas):
+        umbrales = bosque.umbral[(bosque.caracteristica == j) & (bosque.hoja < 0)]
+        # Los cortes que solo separan los NaN tienen umbral infinito
+        umbrales = umbrales[np.isfinite(umbrales)]
+        if len(umbrales) == 0:
+            umbrales = np.zeros(1)
+        X[:, j] = rng.choice(umbrales, filas) + rng.choice([-1e-3, 0.0, 1e-3], filas)
+    X[rng.random(X.shape) < 0.05] = np.nan
+    if bosque.columnas is not None:
+        X = pd.DataFrame(X, columns=bosque.columnas)
+    esperado = modelo.predict_proba(X)
+    obtenido = bosque.predict_proba(X)
+    if not np.array_equal(esperado, obtenido):
+        raise AssertionError(f"máxima diferencia {np.nanmax(np.abs(esperado - obtenido))}")
+
+
+def exportar(ruta_modelo):
+    """Compila el .pkl, lo verifica y escribe el .npz al lado. Retorna la ruta."""
+    import joblib
+
+    ruta_modelo = Path(ruta_modelo)
+    contenido = ruta_modelo.read_bytes()
+    modelo = joblib.load(ruta_modelo)
+    bosque = compilar(modelo)
+    verificar(modelo, bosque)
+    destino = ruta_compilada(ruta_modelo)
+    guardar(bosque, destino, hashlib.sha256(contenido).hexdigest())
+    return destino, bosque
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compila modelos .pkl de bosques aleatorios a .npz")
+    parser.add_argument("modelos", nargs="+")
+    args = parser.parse_args()
+    for ruta in args.modelos:
+        destino, bosque = exportar(ruta)
+        print(f"✅ {ruta} -> {destino} ({bosque.n_estimators} árboles, {len(bosque.umbral)} nodos, "
+              f"{bosque.nbytes / 1024:.0f} KB)")
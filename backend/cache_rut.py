@@ -0,0 +1,130 @@
+import functools
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from backend.perfil_estudiante import clave_rut
+
+_AUSENTE = object()
+
+
+class CacheRut:
+    """
+    Caché en memoria de respuestas por (endpoint, RUT).
+
+    - LRU acotado por bytes: el tamaño de cada respuesta se estima por su
+      largo en JSON y se descartan las menos usadas al pasar `max_bytes`.
+    - Cada respuesta vence a los `ttl` segundos.
+    - `invalidar(rut)` borra todas las respuestas de ese RUT; lo llaman los
+      endpoints que registran datos del estudiante.
+    """
+
+    def __init__(self, max_bytes=16 * 1024 * 1024, ttl=120.0):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._entradas = OrderedDict()  # (endpoint, rut) -> (valor, bytes, vence_en)
+        self._por_rut = {}              # rut -> {endpoints en caché}
+        self._generaciones = {}         # rut -> n° de invalidaciones
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._aciertos = {}
+        self._fallos = {}
+        self.invalidaciones = 0
+
+    def obtener(self, endpoint, rut, defecto=None):
+        clave = (endpoint, clave_rut(rut))
+        with self._lock:
+            entrada = self._entradas.get(clave)
+            if entrada is not None and entrada[2] <= time.monotonic():
+                self._quitar(clave)
+                entrada = None
+            if entrada is None:
+                self._fallos[endpoint] = self._fallos.get(endpoint, 0) + 1
+                return defecto
+            self._entradas.move_to_end(clave)
+            self._aciertos[endpoint] = self._aciertos.get(endpoint, 0) + 1
+            return entrada[0]
+
+    def generacion(self, rut):
+        return self._generaciones.get(clave_rut(rut), 0)
+
+    def guardar(self, endpoint, rut, valor, generacion=None):
+        """Con `generacion` (tomada antes de calcular) no se guarda si el RUT
+        se invalidó mientras tanto: el valor podría ser anterior a la escritura."""
+        tamano = len(json.dumps(valor, default=str))
+        if tamano > self.max_bytes:
+            return
+        clave = (endpoint, clave_rut(rut))
+        with self._lock:
+            if generacion is not None and generacion != self._generaciones.get(clave[1], 0):
+                return
+            self._quitar(clave)
+            self._entradas[clave] = (valor, tamano, time.monotonic() + self.ttl)
+            self._por_rut.setdefault(clave[1], set()).add(endpoint)
+            self._bytes += tamano
+            while self._bytes > self.max_bytes:
+                self._quitar(next(iter(self._entradas)))
+
+    def por_rut(self, endpoint):
+        """Decorador para endpoints `async def f(rut)`: responde desde el caché
+        si puede y guarda lo calculado. Las excepciones (p. ej. 404) no se guardan."""
+        def decorador(funcion):
+            @functools.wraps(funcion)
+            async def envoltura(rut, *args, **kwargs):
+                valor = self.obtener(endpoint, rut, _AUSENTE)
+                if valor is _AUSENTE:
+                    generacion = self.generacion(rut)
+                    valor = await funcion(rut, *args, **kwargs)
+                    self.guardar(endpoint, rut, valor, generacion)
+                return valor
+            return envoltura
+        return decorador
+
+    def invalidar(self, rut):
+        rut = clave_rut(rut)
+        with self._lock:
+            for endpoint in list(self._por_rut.get(rut, ())):
+                self._quitar((endpoint, rut))
+            self._generaciones[rut] = self._generaciones.get(rut, 0) + 1
+            self.invalidaciones += 1
+
+    def limpiar(self):
+        with self._lock:
+            self._entradas.clear()
+            self._por_rut.clear()
+            self._bytes = 0
+
+    def stats(self):
+        with self._lock:
+            endpoints = sorted(set(self._aciertos) | set(self._fallos))
+            return {
+                "entradas": len(self._entradas),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "ttl": self.ttl,
+                "invalidaciones": self.invalidaciones,
+                "por_endpoint": {
+                    e: {"aciertos": self._aciertos.get(e, 0), "fallos": self._fallos.get(e, 0)}
+                    for e in endpoints
+                },
+            }
+
+    def _quitar(self, clave):
+        entrada = self._entradas.pop(clave, None)
+        if entrada is None:
+            return
+        self._bytes -= entrada[1]
+        endpoint, rut = clave
+        endpoints = self._por_rut.get(rut)
+        if endpoints is not None:
+            endpoints.discard(endpoint)
+            if not endpoints:
+                del self._por_rut[rut]
+
+
+cache = CacheRut(
+    max_bytes=int(float(os.getenv("CACHE_RUT_MB", "16")) * 1024 * 1024),
+    ttl=float(os.getenv("CACHE_RUT_TTL", "120")),
+)
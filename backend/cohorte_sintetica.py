@@ -0,0 +1,260 @@
+"""
+Cohorte sintética para la base falsa (backend/bd_falsa.py).
+
+    python -m backend.cohorte_sintetica cohorte.db [--estudiantes 10000] [--semilla 0]
+
+Genera de 1k a 1M estudiantes con todas las tablas que lee el backend:
+
+- PACE2024_ACTUALIZADO: RUT correlativo desde 10000000, carrera, año de
+  ingreso, ciudad, vía de ingreso y estado.
+- NotasPace2025: 3 a 8 ramos por estudiante (algunos sin notas), seis notas
+  por ramo como texto con coma decimal ("4,5"), algunas vacías o "NP".
+- Epaes$ (~85 % de la cohorte) y Caracterizacion_Ingreso$ (~70 %), con la
+  fecha de nacimiento como texto "%d %B %Y", que es lo que parsea
+  riesgo_interseccional.
+- RamosReprobados / RamosReprobadosDetalle materializados como en
+  `backend.ramos_reprobados --reconstruir`.
+- Historial en EvaluacionRiesgo y EvaluacionDeRut, FactoresPsicologicos /
+  FactoresAcademicos para una parte de la cohorte y el catálogo de
+  Recomendaciones.
+
+Cada estudiante tiene una "habilidad" latente que mueve sus notas y sus
+puntajes Epaes, así los niveles de riesgo salen repartidos y no al azar.
+Con la misma semilla, cantidad de estudiantes y tramo se obtiene la misma
+base (las fechas se cuentan hacia atrás desde el día en que se genera). Los
+datos se generan y escriben por tramos, con memoria acotada.
+"""
+import argparse
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import numpy as np
+
+from backend import bd_falsa
+
+# Estudiantes por tramo de generación (un executemany por tabla y tramo)
+TRAMO = 20000
+
+RUT_INICIAL = 10_000_000
+
+CARRERAS = (
+    "Ingeniería Civil Informática", "Ingeniería Comercial", "Enfermería", "Psicología",
+    "Derecho", "Pedagogía en Matemática", "Trabajo Social", "Arquitectura",
+    "Kinesiología", "Ingeniería Civil Industrial", "Contador Auditor", "Pedagogía en Historia",
+)
+CIUDADES = ("Santiago", "Valparaíso", "Concepción", "Temuco", "La Serena", "Rancagua", "Talca", "Arica")
+VIAS = ("PACE", "PAES", "Ingreso Especial", "Continuidad de Estudios")
+ESTADOS = ("Regular", "Regular", "Regular", "Eliminado", "Retirado", "Suspendido")
+NOMBRES = ("Camila", "Benjamín", "Valentina", "Matías", "Javiera", "Vicente", "Fernanda", "Martín",
+           "Catalina", "Agustín", "Constanza", "Tomás", "Francisca", "Diego", "Antonia", "Joaquín")
+APELLIDOS = ("González", "Muñoz", "Rojas", "Díaz", "Pérez", "Soto", "Contreras", "Silva",
+             "Martínez", "Sepúlveda", "Morales", "Rodríguez", "López", "Fuentes", "Hernández", "Torres")
+RAMOS = tuple(f"{nombre} {nivel}" for nombre in (
+    "Cálculo", "Álgebra", "Física", "Química", "Programación", "Comunicación Oral y Escrita",
+    "Inglés", "Estadística", "Economía", "Biología", "Anatomía", "Fundamentos de la Disciplina",
+) for nivel in ("I", "II"))
+GENEROS = ("Masculino", "Femenino", "Prefiero no especificar", "No binario")
+MESES_EN = ("January", "February", "March", "April", "May", "June", "July",
+            "August", "September", "October", "November", "December")
+NIVELES = ("Bajo", "Medio", "Alto")
+PROFESIONALES = ("Ps. Daniela Vergara", "Ps. Rodrigo Araya", "Tutor Felipe Castro", "Tutora Paula Reyes")
+
+RECOMENDACIONES = [
+    ("Académico", "Bajo", "Mantener seguimiento regular del rendimiento."),
+    ("Académico", "Medio", "Derivar a tutorías de pares en los ramos con notas bajo 4,0."),
+    ("Académico", "Alto", "Plan de acompañamiento académico y reunión con jefatura de carrera."),
+    ("Psicológico", "Bajo", "Informar sobre los servicios de bienestar estudiantil."),
+    ("Psicológico", "Medio", "Ofrecer talleres de manejo del estrés y autorregulación."),
+    ("Psicológico", "Alto", "Derivar a atención psicológica y contactar al estudiante esta semana."),
+]
+
+# Mismas columnas y orden que bd_falsa.ESQUEMA
+COLUMNAS_EPAES = 7
+PREGUNTAS_SI_NO = 7
+
+SQL_ESTUDIANTE = "INSERT INTO dbo.PACE2024_ACTUALIZADO VALUES (?, ?, ?, ?, ?, ?, ?)"
+SQL_NOTAS = "INSERT INTO dbo.NotasPace2025 VALUES (?, ?, ?, ?, ?, ?, ?, ?)"
+SQL_EPAES = "INSERT INTO dbo.[Epaes$] VALUES (?, ?, ?, ?, ?, ?, ?, ?)"
+SQL_CARACTERIZACION = "INSERT INTO dbo.[Caracterizacion_Ingreso$] VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)"
+SQL_EVALUACION_RIESGO = """
+    INSERT INTO dbo.EvaluacionRiesgo (Run, NombreCompleto, Carrera, NivelRiesgo, FechaEvaluacion)
+    VALUES (?, ?, ?, ?, ?)
+"""
+SQL_EVALUACION_DE_RUT = """
+    INSERT INTO dbo.EvaluacionDeRut
+        (Run, NombreCompleto, Carrera, NivelRiesgo, NivelRiesgoAcademico, NivelRiesgoPsicologico,
+         NivelRiesgoInterseccional, FechaEvaluacion)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+"""
+SQL_FACTORES = """
+    INSERT INTO dbo.{tabla} (rut_estudiante, nivel_riesgo, esta_recibiendo_apoyo, nombre_profesional, observaciones)
+    VALUES (?, ?, ?, ?, ?)
+"""
+
+# Dialecto SQLite de SQL_RECONSTRUIR en backend/ramos_reprobados.py (sin CROSS APPLY)
+SQL_RAMOS_REPROBADOS = """
+DELETE FROM dbo.RamosReprobadosDetalle;
+DELETE FROM dbo.RamosReprobados;
+
+INSERT INTO dbo.RamosReprobadosDetalle (RUT, [Denominación Actividad Curricular])
+SELECT DISTINCT n.RUT, n.[Denominación Actividad Curricular]
+FROM dbo.NotasPace2025 n
+WHERE n.[Denominación Actividad Curricular] IS NOT NULL
+  AND EXISTS (
+      SELECT 1 FROM (
+          SELECT n.Nota_1 AS nota UNION ALL SELECT n.Nota_2 UNION ALL SELECT n.Nota_3 UNION ALL
+          SELECT n.Nota_4 UNION ALL SELECT n.Nota_5 UNION ALL SELECT n.Nota_6
+      )
+      WHERE try_float(REPLACE(nota, ',', '.')) < 4.0
+  );
+
+INSERT INTO dbo.RamosReprobados (RUT, RamosReprobados)
+SELECT RUT, COUNT(*)
+FROM dbo.RamosReprobadosDetalle
+GROUP BY RUT;
+"""
+
+
+def _elegir(rng, opciones, n, p=None):
+    return np.asarray(opciones, dtype=object)[rng.choice(len(opciones), n, p=p)]
+
+
+def _notas_texto(notas, vacias):
+    """Notas con coma decimal como en NotasPace2025; NULL, "" o "NP" donde falta."""
+    texto = np.char.replace(np.char.mod("%.1f", notas), ".", ",").astype(object)
+    texto[vacias == 1] = None
+    texto[vacias == 2] = ""
+    texto[vacias == 3] = "NP"
+    return texto
+
+
+def _tramo(rng, inicio, n, hoy):
+    """Filas de todas las tablas para los estudiantes inicio..inicio+n-1."""
+    ruts = np.char.mod("%d", np.arange(RUT_INICIAL + inicio, RUT_INICIAL + inicio + n)).astype(object)
+    habilidad = rng.normal(0.0, 1.0, n)
+    nombres = [
+        f"{a} {b} {c}" for a, b, c in zip(
+            _elegir(rng, NOMBRES, n), _elegir(rng, APELLIDOS, n), _elegir(rng, APELLIDOS, n)
+        )
+    ]
+    carreras = _elegir(rng, CARRERAS, n)
+    filas = {}
+
+    filas[SQL_ESTUDIANTE] = list(zip(
+        ruts, nombres, carreras, rng.integers(2019, 2025, n).tolist(),
+        _elegir(rng, CIUDADES, n), _elegir(rng, VIAS, n, p=[0.55, 0.3, 0.1, 0.05]), _elegir(rng, ESTADOS, n),
+    ))
+
+    # Notas: ~5 % sin ramos inscritos
+    ramos = np.where(rng.random(n) < 0.05, 0, rng.integers(3, 9, n))
+    dueno = np.repeat(np.arange(n), ramos)
+    total = len(dueno)
+    notas = np.clip(rng.normal(4.9 + 0.8 * habilidad[dueno, None], 1.0, (total, 6)), 1.0, 7.0).round(1)
+    vacias = rng.choice(4, (total, 6), p=[0.9, 0.06, 0.02, 0.02])
+    texto = _notas_texto(notas, vacias)
+    nombres_ramos = _elegir(rng, RAMOS, total)
+    filas[SQL_NOTAS] = [(ruts[d], ramo, *fila) for d, ramo, fila in zip(dueno, nombres_ramos, texto.tolist())]
+
+    # Epaes: promedios 1 a 5 con dos decimales
+    con_epaes = np.flatnonzero(rng.random(n) < 0.85)
+    epaes = np.clip(rng.normal(3.2 + 0.5 * habilidad[con_epaes, None], 0.8, (len(con_epaes), COLUMNAS_EPAES)),
+                    1.0, 5.0).round(2)
+    filas[SQL_EPAES] = [(ruts[i], *fila) for i, fila in zip(con_epaes, epaes.tolist())]
+
+    # Caracterización de ingreso
+    con_caracterizacion = np.flatnonzero(rng.random(n) < 0.7)
+    m = len(con_caracterizacion)
+    respuestas = np.where(rng.random((m, PREGUNTAS_SI_NO)) < [0.08, 0.35, 0.6, 0.4, 0.55, 0.05, 0.15], "Sí", "No")
+    edades = np.clip(rng.gamma(2.0, 2.5, m) + 17, 17, 60)
+    nacimientos = [hoy - timedelta(days=float(e * 365.25)) for e in edades]
+    fechas = [f"{f.day:02d} {MESES_EN[f.month - 1]} {f.year}" for f in nacimientos]
+    filas[SQL_CARACTERIZACION] = [
+        (ruts[i], genero, *fila, fecha)
+        for i, genero, fila, fecha in zip(
+            con_caracterizacion, _elegir(rng, GENEROS, m, p=[0.45, 0.48, 0.04, 0.03]), respuestas.tolist(), fechas
+        )
+    ]
+
+    # Historial de evaluaciones: 0 a 3 por estudiante en el último año
+    nivel = np.clip(np.round(1 - habilidad + rng.normal(0, 0.5, n)), 0, 2).astype(int)
+    for sql, maximo in ((SQL_EVALUACION_RIESGO, 4), (SQL_EVALUACION_DE_RUT, 3)):
+        cuantas = rng.integers(0, maximo, n)
+        evaluados = np.repeat(np.arange(n), cuantas)
+        dias = rng.uniform(0, 365, len(evaluados))
+        fechas = [bd_falsa.fecha_a_texto(hoy - timedelta(days=float(d))) for d in dias]
+        niveles = np.clip(nivel[evaluados, None] + rng.integers(-1, 2, (len(evaluados), 4)), 0, 2)
+        niveles = np.asarray(NIVELES, dtype=object)[niveles]
+        if sql is SQL_EVALUACION_RIESGO:
+            filas[sql] = [
+                (ruts[i], nombres[i], carreras[i], nv[0], fecha)
+                for i, nv, fecha in zip(evaluados, niveles.tolist(), fechas)
+            ]
+        else:
+            filas[sql] = [
+                (ruts[i], nombres[i], carreras[i], *nv, fecha)
+                for i, nv, fecha in zip(evaluados, niveles.tolist(), fechas)
+            ]
+
+    # Factores de apoyo registrados para una parte de la cohorte
+    for tabla, proporcion in (("FactoresPsicologicos", 0.1), ("FactoresAcademicos", 0.08)):
+        con_factor = np.flatnonzero(rng.random(n) < proporcion)
+        k = len(con_factor)
+        filas[SQL_FACTORES.format(tabla=tabla)] = list(zip(
+            ruts[con_factor], np.asarray(NIVELES, dtype=object)[nivel[con_factor]],
+            rng.integers(0, 2, k).tolist(), _elegir(rng, PROFESIONALES, k),
+            ["Seguimiento quincenal" if i % 2 else "" for i in range(k)],
+        ))
+    return filas
+
+
+def generar(ruta, estudiantes, semilla=0, tramo=TRAMO, informar=print):
+    """Crea (o reemplaza) la base falsa en `ruta` con `estudiantes` estudiantes."""
+    ruta = Path(ruta)
+    for sufijo in ("", "-wal", "-shm"):
+        Path(f"{ruta}{sufijo}").unlink(missing_ok=True)
+    conn = bd_falsa.conectar(ruta)
+    sqlite = conn.sqlite
+    sqlite.execute("PRAGMA dbo.synchronous = OFF")
+    hoy = datetime.now().replace(microsecond=0)
+    inicio = time.perf_counter()
+
+    try:
+        sqlite.executemany("INSERT INTO dbo.Recomendaciones VALUES (?, ?, ?)", RECOMENDACIONES)
+        for n_tramo, desde in enumerate(range(0, estudiantes, tramo)):
+            # Semilla por tramo: cada tramo es reproducible por sí solo
+            rng = np.random.default_rng([semilla, n_tramo])
+            for sql, filas in _tramo(rng, desde, min(tramo, estudiantes - desde), hoy).items():
+                sqlite.executemany(sql, filas)
+            sqlite.commit()
+            informar(f"  {min(desde + tramo, estudiantes):>9} estudiantes")
+        sqlite.executescript(SQL_RAMOS_REPROBADOS)
+        sqlite.execute("ANALYZE dbo")
+        sqlite.commit()
+    finally:
+        conn.close()
+    informar(f"✅ {ruta}: {estudiantes} estudiantes en {time.perf_counter() - inicio:.1f} s")
+    return ruta
+
+
+def contar_estudiantes(ruta):
+    """Estudiantes en la base falsa de `ruta` (0 si no existe)."""
+    if not Path(ruta).exists():
+        return 0
+    conn = bd_falsa.conectar(ruta)
+    try:
+        return conn.sqlite.execute("SELECT COUNT(*) FROM dbo.PACE2024_ACTUALIZADO").fetchone()[0]
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Genera una cohorte sintética en la base falsa (SQLite)")
+    parser.add_argument("ruta", help="archivo SQLite a crear (se reemplaza si existe)")
+    parser.add_argument("--estudiantes", type=int, default=10000, help="de 1.000 a 1.000.000")
+    parser.add_argument("--semilla", type=int, default=0)
+    parser.add_argument("--tramo", type=int, default=TRAMO, help="estudiantes por tramo")
+    args = parser.parse_args()
+    if not 1000 <= args.estudiantes <= 1_000_000:
+        parser.error("--estudiantes debe estar entre 1000 y 1000000")
+    generar(args.ruta, args.estudiantes, args.semilla, args.tramo)
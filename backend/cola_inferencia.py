@@ -0,0 +1,70 @@
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+import numpy as np
+
+from backend.bosque_compilado import entrada
+
+
+class ColaInferencia:
+    """
+    Junta las predicciones que llegan casi al mismo tiempo y las resuelve con
+    una sola llamada a `predict_proba` sobre la matriz completa.
+
+    El primer pedido abre una ventana de `ventana_ms`; todo lo que llegue
+    dentro de ella (hasta `max_lote` filas) va en el mismo lote. La clase se
+    deriva de las probabilidades (igual que hace `predict` en un
+    RandomForest), así que cada lote recorre los árboles una sola vez.
+    """
+
+    def __init__(self, obtener_modelo, columnas, ventana_ms=2.0, max_lote=64):
+        self._obtener_modelo = obtener_modelo  # () -> (modelo, version)
+        self.columnas = list(columnas)
+        self.ventana = ventana_ms / 1000.0
+        self.max_lote = max_lote
+        self._pendientes = queue.Queue()
+        self._hilo = None
+        self._lock = threading.Lock()
+
+    def predecir(self, fila):
+        """fila: valores en el orden de `columnas`.
+        Retorna (probabilidades, clase, version_modelo)."""
+        futuro = Future()
+        self._asegurar_hilo()
+        self._pendientes.put((fila, futuro))
+        return futuro.result()
+
+    def _asegurar_hilo(self):
+        if self._hilo is None:
+            with self._lock:
+                if self._hilo is None:
+                    self._hilo = threading.Thread(target=self._atender, daemon=True)
+                    self._hilo.start()
+
+    def _atender(self):
+        while True:
+            lote = [self._pendientes.get()]
+            limite = time.monotonic() + self.ventana
+            while len(lote) < self.max_lote:
+                restante = limite - time.monotonic()
+                try:
+                    lote.append(self._pendientes.get(timeout=restante) if restante > 0
+                                else self._pendientes.get_nowait())
+                except queue.Empty:
+                    break
+            self._resolver(lote)
+
+    def _resolver(self, lote):
+        try:
+            modelo, version = self._obtener_modelo()
+            X = entrada(modelo, [fila for fila, _ in lote], self.columnas)
+            probabilidades = modelo.predict_proba(X)
+            clases = modelo.classes_[np.argmax(probabilidades, axis=1)]
+        except Exception as e:
+            for _, futuro in lote:
+                futuro.set_exception(e)
+            return
+        for (_, futuro), proba, clase in zip(lote, probabilidades, clases):
+            futuro.set_result((proba, clase, version))
@@ -0,0 +1,35 @@
+"""
+Lecturas livianas para los caminos por RUT.
+
+`pd.read_sql` para traer cero o una fila paga la construcción del
+DataFrame, la inferencia de tipos por columna y la advertencia de pandas
+por usar una conexión DBAPI que no es de SQLAlchemy. Aquí el cursor se lee
+con fetchone directo a registros NamedTuple (tuplas con
+__slots__ vacíos y acceso por nombre). Los NULL llegan como None.
+
+El registro define el orden de las columnas del SELECT; si la consulta
+trae otra cantidad de columnas se lanza ValueError en vez de desalinear
+los campos.
+
+pandas queda para las lecturas masivas (cohorte completa, entrenamiento,
+puntuación nocturna), donde el DataFrame sí se amortiza.
+"""
+
+
+def _verificar(cursor, tipo):
+    columnas = len(cursor.description)
+    if columnas != len(tipo._fields):
+        raise ValueError(f"{tipo.__name__} espera {len(tipo._fields)} columnas y la consulta trae {columnas}")
+
+
+def uno(conn, tipo, query, params=()):
+    """Primera fila del SELECT como `tipo`, o None si no hay filas."""
+    cursor = conn.cursor()
+    try:
+        cursor.execute(query, params)
+        _verificar(cursor, tipo)
+        fila = cursor.fetchone()
+        return None if fila is None else tipo._make(fila)
+    finally:
+        cursor.close()
+
@@ -0,0 +1,116 @@
+"""
+Dataset del modelo híbrido en formato columnar (Arrow IPC sin compresión),
+particionado por año de ingreso:
+
+    dataset_hibrido/anio_ingreso=2024/parte.arrow
+    dataset_hibrido/anio_ingreso=__HIVE_DEFAULT_PARTITION__/parte.arrow  (sin año)
+
+Cada fila guarda `_hash`, el hash de sus columnas de origen, para que la
+extracción reescriba solo las particiones con estudiantes nuevos,
+modificados o eliminados. Los archivos se leen con memory-map y solo las
+columnas pedidas, sin parsear texto como el CSV. La tabla Arrow resultante
+no copia los datos; convertirla a pandas/NumPy para entrenar sí los copia.
+"""
+import os
+from pathlib import Path
+
+import pyarrow as pa
+import pyarrow.ipc as ipc
+
+from backend.modelos import RAIZ
+
+RUTA = Path(os.getenv("DATASET_HIBRIDO_PATH", RAIZ / "dataset_hibrido"))
+PARTICION = "anio_ingreso"
+SIN_ANIO = "__HIVE_DEFAULT_PARTITION__"
+ARCHIVO = "parte.arrow"
+
+# Columnas que vienen de la BD (las que se hashean)
+ORIGEN = pa.schema([
+    ("RUT", pa.string()),
+    ("NOMBRE COMPLETO", pa.string()),
+    ("Carrera", pa.string()),
+    ("AnioIngreso", pa.int32()),
+    ("RamosReprobados", pa.int32()),
+    ("Autoeficacia", pa.float64()),
+    ("Emocional", pa.float64()),
+    ("Autodeterminacion", pa.float64()),
+    ("Sociabilidad", pa.float64()),
+    ("Prospectiva", pa.float64()),
+])
+
+COLUMNAS_EPAES = ["Autoeficacia", "Emocional", "Autodeterminacion", "Sociabilidad", "Prospectiva"]
+
+# Consulta de las columnas de ORIGEN, la misma para extraer el dataset y
+# para la puntuación nocturna (puntuar_cohorte.py). Los ramos reprobados
+# vienen materializados (backend/ramos_reprobados.py).
+CONSULTA = """
+SELECT
+    p.RUT,
+    p.[NOMBRE COMPLETO],
+    p.Carrera,
+    p.[AÑO DE INGRESO] AS AnioIngreso,
+    ISNULL(r.RamosReprobados, 0) AS RamosReprobados,
+    e.[PROMEDIO AUTOEFICACIA ACADÉMICA] AS Autoeficacia,
+    e.[PROMEDIO MODULACIÓN EMOCIONAL] AS Emocional,
+    e.[PROMEDIO AUTODETERMINACIÓN PERSONAL] AS Autodeterminacion,
+    e.[PROMEDIO SOCIABILIDAD] AS Sociabilidad,
+    e.[PROMEDIO PROSPECTIVA ACADÉMICA] AS Prospectiva
+FROM [dbo].[PACE2024_ACTUALIZADO] p
+LEFT JOIN [dbo].[RamosReprobados] r ON p.RUT = r.RUT
+LEFT JOIN [dbo].[Epaes$] e ON CAST(p.RUT AS VARCHAR) = CAST(e.RUT AS VARCHAR)
+"""
+
+ESQUEMA = pa.schema(list(ORIGEN) + [
+    ("PuntajeHeuristico", pa.int8()),
+    ("NivelHeuristico", pa.int8()),  # 0 = Bajo, 1 = Medio, 2 = Alto
+    ("_hash", pa.uint64()),
+])
+
+
+def ruta_particion(anio, raiz=RUTA):
+    return Path(raiz) / f"{PARTICION}={SIN_ANIO if anio is None else int(anio)}" / ARCHIVO
+
+
+def particiones(raiz=RUTA):
+    """{anio (o None): ruta} de las particiones existentes."""
+    encontradas = {}
+    for archivo in Path(raiz).glob(f"{PARTICION}=*/{ARCHIVO}"):
+        valor = archivo.parent.name.split("=", 1)[1]
+        encontradas[None if valor == SIN_ANIO else int(valor)] = archivo
+    return encontradas
+
+
+def leer_particion(ruta, columnas=None, mapear=True):
+    """Tabla de un archivo Arrow. Con `mapear` los buffers apuntan al archivo
+    mapeado en memoria (sin copia); sin él se leen a memoria y el archivo
+    queda cerrado (necesario para reemplazarlo en Windows)."""
+    if mapear:
+        tabla = ipc.open_file(pa.memory_map(str(ruta), "r")).read_all()
+    else:
+        with pa.OSFile(str(ruta), "rb") as fuente:
+            tabla = ipc.open_file(fuente).read_all()
+    return tabla.select(columnas) if columnas else tabla
+
+
+def escribir_archivo(tabla, ruta):
+    with pa.OSFile(str(ruta), "wb") as destino:
+        with ipc.new_file(destino, ESQUEMA) as escritor:
+            escritor.write_table(tabla.cast(ESQUEMA))
+
+
+def escribir_particion(tabla, anio, raiz=RUTA):
+    """Reemplaza la partición de forma atómica (escribe aparte y renombra)."""
+    ruta = ruta_particion(anio, raiz)
+    ruta.parent.mkdir(parents=True, exist_ok=True)
+    temporal = ruta.with_suffix(".tmp")
+    escribir_archivo(tabla, temporal)
+    os.replace(temporal, ruta)
+
+
+def leer_dataset(columnas=None, raiz=RUTA):
+    """Todas las particiones como una tabla Arrow (memory-mapped)."""
+    ordenadas = sorted(particiones(raiz).items(), key=lambda p: (p[0] is None, p[0] or 0))
+    tablas = [leer_particion(ruta, columnas) for _, ruta in ordenadas]
+    if not tablas:
+        raise FileNotFoundError(f"No hay particiones en {raiz}; ejecute generar_dataset_hibrido.py")
+    return pa.concat_tables(tablas)
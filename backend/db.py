@@ -1,15 +1,235 @@
-import pyodbc
 import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
 from dotenv import load_dotenv
 
 load_dotenv()
 
-def get_connection():
-    conn = pyodbc.connect(
+
+def crear_conexion():
+    """Abre una conexión nueva a SQL Server (sin pool).
+    Con DB_FALSA=<archivo> abre en cambio la base SQLite de backend/bd_falsa.py."""
+    if os.getenv("DB_FALSA"):
+        from backend import bd_falsa
+
+        return bd_falsa.conectar(os.getenv("DB_FALSA"))
+    import pyodbc
+
+    return pyodbc.connect(
         f"DRIVER={{ODBC Driver 17 for SQL Server}};"
         f"SERVER={os.getenv('DB_SERVER')};"
         f"DATABASE={os.getenv('DB_NAME')};"
         f"UID={os.getenv('DB_USER')};"
         f"PWD={os.getenv('DB_PASSWORD')}"
     )
-    return conn
+
+
+class PoolTimeoutError(RuntimeError):
+    """No se liberó ninguna conexión del pool dentro del tiempo de espera."""
+
+
+class ConnectionPool:
+    """
+    Pool acotado de conexiones DBAPI reutilizables.
+
+    - Nunca mantiene más de `max_size` conexiones abiertas (en uso + libres).
+    - Al pedir una conexión que estuvo libre más de `ping_after` segundos se
+      verifica con `ping_sql`; si falla se descarta y se abre otra.
+    - Las conexiones libres por más de `max_idle` segundos se cierran.
+    - Al devolverla se hace rollback para no arrastrar transacciones abiertas.
+
+    `factory` es cualquier función que retorne una conexión DBAPI, así que en
+    pruebas se puede usar `lambda: sqlite3.connect(..., check_same_thread=False)`.
+    """
+
+    def __init__(self, factory, max_size=10, max_idle=300.0, timeout=30.0,
+                 ping_after=30.0, ping_sql="SELECT 1"):
+        if max_size < 1:
+            raise ValueError("max_size debe ser al menos 1")
+        self._factory = factory
+        self.max_size = max_size
+        self.max_idle = max_idle
+        self.timeout = timeout
+        self.ping_after = ping_after
+        self.ping_sql = ping_sql
+
+        self._libres = deque()  # (conexion, instante en que se devolvió)
+        self._en_uso = 0
+        self._cond = threading.Condition()
+        self._cerrado = False
+        self._contadores = {
+            "creadas": 0,
+            "reutilizadas": 0,
+            "descartadas": 0,
+            "expiradas": 0,
+            "esperas": 0,
+            "timeouts": 0,
+        }
+
+    # -- API pública -------------------------------------------------------
+
+    @contextmanager
+    def connection(self):
+        conn = self._adquirir()
+        try:
+            yield conn
+        finally:
+            self._liberar(conn, sana=self._rollback(conn))
+
+    def stats(self):
+        with self._cond:
+            return {
+                "max_size": self.max_size,
+                "en_uso": self._en_uso,
+                "libres": len(self._libres),
+                **self._contadores,
+            }
+
+    def close(self):
+        with self._cond:
+            self._cerrado = True
+            libres = [conn for conn, _ in self._libres]
+            self._libres.clear()
+            self._cond.notify_all()
+        for conn in libres:
+            self._cerrar(conn)
+
+    # -- internos ----------------------------------------------------------
+
+    def _adquirir(self):
+        limite = time.monotonic() + self.timeout
+        expiradas = []
+        try:
+            conn, devuelta_en = self._esperar_turno(limite, expiradas)
+        finally:
+            for vieja in expiradas:
+                self._cerrar(vieja)
+
+        if conn is not None:
+            if time.monotonic() - devuelta_en < self.ping_after or self._viva(conn):
+                with self._cond:
+                    self._contadores["reutilizadas"] += 1
+                return conn
+            self._cerrar(conn)
+            with self._cond:
+                self._contadores["descartadas"] += 1
+
+        try:
+            conn = self._factory()
+        except BaseException:
+            with self._cond:
+                self._en_uso -= 1
+                self._cond.notify()
+            raise
+        with self._cond:
+            self._contadores["creadas"] += 1
+        return conn
+
+    def _esperar_turno(self, limite, expiradas):
+        """Reserva un cupo del pool. Retorna (conexion, devuelta_en) si había
+        una libre, o (None, None) si hay que abrir una nueva."""
+        with self._cond:
+            while True:
+                if self._cerrado:
+                    raise RuntimeError("El pool de conexiones está cerrado")
+                expiradas.extend(self._expirar_libres())
+                if self._libres:
+                    # LIFO: la conexión usada más recientemente es la más "tibia"
+                    conn, devuelta_en = self._libres.pop()
+                    self._en_uso += 1
+                    return conn, devuelta_en
+                if self._en_uso + len(self._libres) < self.max_size:
+                    self._en_uso += 1
+                    return None, None
+                restante = limite - time.monotonic()
+                if restante <= 0:
+                    self._contadores["timeouts"] += 1
+                    raise PoolTimeoutError(
+                        f"Sin conexiones disponibles tras {self.timeout} s "
+                        f"(max_size={self.max_size})"
+                    )
+                self._contadores["esperas"] += 1
+                self._cond.wait(restante)
+
+    def _liberar(self, conn, sana):
+        with self._cond:
+            self._en_uso -= 1
+            if sana and not self._cerrado:
+                self._libres.append((conn, time.monotonic()))
+                conn = None
+            else:
+                self._contadores["descartadas"] += 1
+            self._cond.notify()
+        if conn is not None:
+            self._cerrar(conn)
+
+    def _expirar_libres(self):
+        """Saca del pool las conexiones libres más antiguas que `max_idle`.
+        Se llama con el lock tomado; el cierre real lo hace quien llama."""
+        expiradas = []
+        ahora = time.monotonic()
+        while self._libres and ahora - self._libres[0][1] > self.max_idle:
+            expiradas.append(self._libres.popleft()[0])
+        self._contadores["expiradas"] += len(expiradas)
+        return expiradas
+
+    def _viva(self, conn):
+        try:
+            cursor = conn.cursor()
+            cursor.execute(self.ping_sql)
+            cursor.fetchone()
+            cursor.close()
+            return True
+        except Exception:
+            return False
+
+    @staticmethod
+    def _rollback(conn):
+        try:
+            conn.rollback()
+            return True
+        except Exception:
+            return False
+
+    @staticmethod
+    def _cerrar(conn):
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_pool():
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ConnectionPool(
+                    crear_conexion,
+                    max_size=int(os.getenv("DB_POOL_SIZE", "10")),
+                    max_idle=float(os.getenv("DB_POOL_MAX_IDLE", "300")),
+                    timeout=float(os.getenv("DB_POOL_TIMEOUT", "30")),
+                )
+    return _pool
+
+
+def configure_pool(factory=crear_conexion, **opciones):
+    """Reemplaza el pool compartido (p. ej. por uno sobre SQLite en pruebas)."""
+    global _pool
+    with _pool_lock:
+        anterior, _pool = _pool, ConnectionPool(factory, **opciones)
+    if anterior is not None:
+        anterior.close()
+    return _pool
+
+
+def get_connection():
+    """Uso: `with get_connection() as conn: ...` — la conexión vuelve al pool al salir."""
+    return get_pool().connection()
@@ -0,0 +1,116 @@
+"""
+Acceso a la BD desde endpoints `async def` sin bloquear el event loop.
+
+Las llamadas bloqueantes (pyodbc, pandas, modelos) corren en un executor
+propio, del mismo tamaño que el pool de conexiones, para no competir con el
+threadpool de Starlette. Además cada endpoint tiene un límite de
+concurrencia: las llamadas pesadas (reporte, global) esperan su turno sin
+ocupar todas las conexiones, y las consultas livianas siguen respondiendo.
+"""
+import asyncio
+import functools
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+
+from backend.db import get_connection, get_pool
+
+# Máximo de llamadas simultáneas por endpoint (sobrescribible con LIMITE_<NOMBRE>)
+LIMITES = {
+    "estudiantes": 4,
+    "notas": 8,
+    "riesgo": 8,
+    "riesgo_hibrido": 8,
+    "riesgos_calculados": 4,
+    "riesgo_academico": 8,
+    "riesgo_psicologico": 8,
+    "riesgo_global": 4,
+    "riesgo_global_batch": 1,
+    "reporte": 4,
+    "exportar": 1,
+    "registrar": 4,
+}
+LIMITE_POR_DEFECTO = 8
+
+_executor = None
+_executor_lock = threading.Lock()
+_semaforos = {}
+
+
+def _get_executor():
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                hilos = int(os.getenv("DB_HILOS", get_pool().max_size))
+                _executor = ThreadPoolExecutor(max_workers=hilos, thread_name_prefix="db")
+    return _executor
+
+
+async def en_db(funcion, *args, **kwargs):
+    """Ejecuta una función bloqueante en el executor de la BD."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_get_executor(), functools.partial(funcion, *args, **kwargs))
+
+
+def _con_conexion(funcion, *args, **kwargs):
+    with get_connection() as conn:
+        return funcion(conn, *args, **kwargs)
+
+
+async def con_conexion(funcion, *args, **kwargs):
+    """`await con_conexion(f, x)` ejecuta `f(conn, x)` con una conexión del pool."""
+    return await en_db(_con_conexion, funcion, *args, **kwargs)
+
+
+def _ejecutar(conn, query, params):
+    cursor = conn.cursor()
+    cursor.execute(query, params or [])
+    return cursor
+
+
+def _filas(conn, query, params):
+    cursor = _ejecutar(conn, query, params)
+    columnas = [c[0] for c in cursor.description]
+    filas = [dict(zip(columnas, fila)) for fila in cursor.fetchall()]
+    cursor.close()
+    return filas
+
+
+async def leer_filas(query, params=None):
+    """Resultado de un SELECT como lista de dicts."""
+    return await con_conexion(_filas, query, params)
+
+
+async def lotes_de_filas(query, params=None, tamano=1000):
+    """Genera el resultado en listas de hasta `tamano` dicts, leyendo con
+    fetchmany: nunca hay más de un lote en memoria. La conexión queda tomada
+    hasta que se agota el resultado o se cierra el generador."""
+    contexto = get_connection()
+    conn = await en_db(contexto.__enter__)
+    cursor = None
+    try:
+        cursor = await en_db(_ejecutar, conn, query, params)
+        columnas = [c[0] for c in cursor.description]
+        while True:
+            filas = await en_db(cursor.fetchmany, tamano)
+            if not filas:
+                break
+            yield [dict(zip(columnas, fila)) for fila in filas]
+    finally:
+        # Cerrar el cursor descarta lo no leído antes de devolver la conexión
+        if cursor is not None:
+            await en_db(cursor.close)
+        await en_db(contexto.__exit__, None, None, None)
+
+
+@asynccontextmanager
+async def limite(nombre):
+    """`async with limite("reporte"):` — espera turno si el endpoint está lleno."""
+    semaforo = _semaforos.get(nombre)
+    if semaforo is None:
+        maximo = int(os.getenv(f"LIMITE_{nombre.upper()}", LIMITES.get(nombre, LIMITE_POR_DEFECTO)))
+        semaforo = _semaforos.setdefault(nombre, asyncio.Semaphore(maximo))
+    async with semaforo:
+        yield
@@ -0,0 +1,284 @@
+"""
+Arnés de entrenamiento para entrenar_modelo.py y entrenar_modelo_hibrido.py.
+
+- La matriz de características extraída se guarda en disco (Arrow/Feather en
+  cache_entrenamiento/) con una clave que depende de su origen: la consulta
+  SQL o las particiones del dataset. Reentrenar no vuelve a leer la BD.
+- La búsqueda de hiperparámetros es validación cruzada estratificada; cada
+  (candidato, pliegue) se ajusta en un pool de procesos con todos los núcleos
+  (los datos se pasan una vez por proceso, no por tarea).
+- Por candidato se registra el puntaje, el tiempo de ajuste, la latencia de
+  predicción (una fila y por fila en lote) y el tamaño del modelo serializado.
+- El elegido se reentrena con todo el conjunto de entrenamiento, se evalúa
+  en el conjunto de prueba y se guarda junto a `<modelo>.sha256` (lo verifica
+  backend/modelos.py), `<modelo>.json` con metadatos y métricas y el bosque
+  compilado `.npz` (backend/bosque_compilado.py).
+"""
+import hashlib
+import io
+import json
+import multiprocessing
+import os
+import platform
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.feather as feather
+
+from backend.modelos import RAIZ
+
+CACHE = Path(os.getenv("ENTRENAMIENTO_CACHE_PATH", RAIZ / "cache_entrenamiento"))
+# Horas tras las que una caché se vuelve a extraer aunque la clave no cambie
+CACHE_MAX_HORAS = float(os.getenv("ENTRENAMIENTO_CACHE_MAX_HORAS", "24"))
+
+# Grilla por defecto (RandomForestClassifier)
+GRILLA = {
+    "n_estimators": [100, 300],
+    "max_depth": [None, 12],
+    "min_samples_leaf": [1, 4],
+    "max_features": ["sqrt", None],
+}
+
+# Repeticiones para medir la latencia de una sola fila
+REPETICIONES_LATENCIA = 50
+
+
+# 1️⃣ Caché de características
+
+def clave_origen(*partes):
+    """Clave corta de caché a partir del texto de la consulta, firmas de archivos, etc."""
+    contenido = json.dumps(partes, sort_keys=True, default=str, ensure_ascii=False)
+    return hashlib.sha256(contenido.encode("utf-8")).hexdigest()[:16]
+
+
+def firma_archivos(rutas):
+    """(nombre, mtime_ns, tamaño) de cada archivo: cambia si se reescribe."""
+    firmas = []
+    for ruta in sorted(map(str, rutas)):
+        estado = os.stat(ruta)
+        firmas.append((ruta, estado.st_mtime_ns, estado.st_size))
+    return firmas
+
+
+def caracteristicas(nombre, clave, extraer, refrescar=False, max_horas=CACHE_MAX_HORAS):
+    """
+    DataFrame de `extraer()` guardado en CACHE/<nombre>-<clave>.feather. Si
+    ya existe, tiene menos de `max_horas` (None: sin límite) y no se pide
+    `refrescar`, se lee de ahí en vez de volver a extraer; `to_pandas()`
+    copia las columnas a memoria. Los archivos anteriores del mismo nombre
+    se eliminan.
+    """
+    CACHE.mkdir(parents=True, exist_ok=True)
+    ruta = CACHE / f"{nombre}-{clave}.feather"
+    vigente = ruta.exists() and (max_horas is None or time.time() - ruta.stat().st_mtime < max_horas * 3600)
+    if vigente and not refrescar:
+        print(f"📦 Características desde caché: {ruta.name}")
+        return feather.read_table(str(ruta), memory_map=True).to_pandas()
+
+    inicio = time.perf_counter()
+    df = extraer()
+    temporal = ruta.with_suffix(".tmp")
+    feather.write_feather(pa.Table.from_pandas(df, preserve_index=False), str(temporal), compression="uncompressed")
+    os.replace(temporal, ruta)
+    for anterior in CACHE.glob(f"{nombre}-*.feather"):
+        if anterior != ruta:
+            anterior.unlink(missing_ok=True)
+    print(f"📦 {len(df)} filas extraídas en {time.perf_counter() - inicio:.1f} s y guardadas en {ruta.name}")
+    return df
+
+
+# 2️⃣ Búsqueda con validación cruzada en procesos
+
+_datos = {}
+
+
+def _iniciar_proceso(X, y):
+    _datos["X"], _datos["y"] = X, y
+
+
+def tamano_modelo(modelo):
+    buffer = io.BytesIO()
+    import joblib
+
+    joblib.dump(modelo, buffer)
+    return buffer.tell()
+
+
+def latencias(modelo, X):
+    """(ms para una fila (mediana), µs por fila prediciendo `X` completo)."""
+    fila = X[:1]
+    tiempos = []
+    for _ in range(REPETICIONES_LATENCIA):
+        inicio = time.perf_counter()
+        modelo.predict_proba(fila)
+        tiempos.append(time.perf_counter() - inicio)
+    inicio = time.perf_counter()
+    modelo.predict_proba(X)
+    por_fila = (time.perf_counter() - inicio) / max(len(X), 1)
+    return float(np.median(tiempos)) * 1e3, por_fila * 1e6
+
+
+def _ajustar_pliegue(indice, params, entrenamiento, validacion, semilla):
+    from sklearn.ensemble import RandomForestClassifier
+    from sklearn.metrics import accuracy_score, f1_score
+
+    X, y = _datos["X"], _datos["y"]
+    modelo = RandomForestClassifier(**params, random_state=semilla, n_jobs=1)
+    inicio = time.perf_counter()
+    modelo.fit(X[entrenamiento], y[entrenamiento])
+    ajuste = time.perf_counter() - inicio
+
+    prediccion = modelo.predict(X[validacion])
+    una_fila_ms, por_fila_us = latencias(modelo, X[validacion])
+    return indice, {
+        "f1_macro": f1_score(y[validacion], prediccion, average="macro"),
+        "accuracy": accuracy_score(y[validacion], prediccion),
+        "ajuste_s": ajuste,
+        "prediccion_una_fila_ms": una_fila_ms,
+        "prediccion_por_fila_us": por_fila_us,
+        "tamano_bytes": tamano_modelo(modelo),
+    }
+
+
+def buscar(X, y, grilla=GRILLA, pliegues=5, procesos=None, semilla=42):
+    """
+    Evalúa cada combinación de `grilla` con `pliegues` pliegues estratificados.
+    Retorna una lista de candidatos {"params", "metricas" (promedios),
+    "f1_macro_std"} ordenada del mejor al peor (f1_macro, luego menor tiempo
+    de ajuste).
+    """
+    from sklearn.model_selection import ParameterGrid, StratifiedKFold
+
+    X = np.ascontiguousarray(X)
+    y = np.asarray(y)
+    candidatos = list(ParameterGrid(grilla))
+    divisiones = list(StratifiedKFold(pliegues, shuffle=True, random_state=semilla).split(X, y))
+    procesos = procesos or os.cpu_count() or 1
+
+    resultados = [[] for _ in candidatos]
+    # spawn: igual que los reportes, los hijos no heredan hilos ni conexiones
+    contexto = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(procesos, mp_context=contexto, initializer=_iniciar_proceso, initargs=(X, y)) as pool:
+        tareas = [
+            pool.submit(_ajustar_pliegue, i, params, entrenamiento, validacion, semilla)
+            for i, params in enumerate(candidatos)
+            for entrenamiento, validacion in divisiones
+        ]
+        for tarea in tareas:
+            indice, metricas = tarea.result()
+            resultados[indice].append(metricas)
+
+    tabla = []
+    for params, pliegues_candidato in zip(candidatos, resultados):
+        metricas = {m: float(np.mean([p[m] for p in pliegues_candidato])) for m in pliegues_candidato[0]}
+        tabla.append({
+            "params": params,
+            "metricas": metricas,
+            "f1_macro_std": float(np.std([p["f1_macro"] for p in pliegues_candidato])),
+        })
+    tabla.sort(key=lambda c: (-round(c["metricas"]["f1_macro"], 4), c["metricas"]["ajuste_s"]))
+    return tabla
+
+
+def imprimir_candidatos(tabla):
+    print(f"{'f1_macro':>9} {'±':>6} {'ajuste s':>9} {'1 fila ms':>10} {'µs/fila':>8} {'KB':>8}  params")
+    for c in tabla:
+        m = c["metricas"]
+        print(f"{m['f1_macro']:9.4f} {c['f1_macro_std']:6.3f} {m['ajuste_s']:9.2f} "
+              f"{m['prediccion_una_fila_ms']:10.2f} {m['prediccion_por_fila_us']:8.1f} "
+              f"{m['tamano_bytes'] / 1024:8.0f}  {c['params']}")
+
+
+# 3️⃣ Modelo final y metadatos
+
+def guardar_modelo(modelo, ruta, metadatos):
+    """Escribe el .pkl (atómico), su .sha256, el .npz compilado y el .json de metadatos."""
+    import joblib
+
+    from backend import bosque_compilado
+
+    ruta = Path(ruta)
+    temporal = ruta.with_name(ruta.name + ".tmp")
+    joblib.dump(modelo, temporal)
+    sha256 = hashlib.sha256(temporal.read_bytes()).hexdigest()
+    os.replace(temporal, ruta)
+    ruta.with_name(ruta.name + ".sha256").write_text(f"{sha256}  {ruta.name}\n")
+
+    bosque = bosque_compilado.compilar(modelo)
+    bosque_compilado.verificar(modelo, bosque)
+    bosque_compilado.guardar(bosque, bosque_compilado.ruta_compilada(ruta), sha256)
+
+    metadatos = {**metadatos, "archivo": ruta.name, "sha256": sha256, "version": sha256[:12]}
+    ruta.with_name(ruta.name + ".json").write_text(
+        json.dumps(metadatos, indent=2, ensure_ascii=False, default=str), encoding="utf-8"
+    )
+    return sha256
+
+
+def entrenar(nombre, X, y, ruta_modelo, grilla=GRILLA, pliegues=5, procesos=None,
+             prueba=0.2, semilla=42, origen=None):
+    """
+    Búsqueda con validación cruzada sobre el conjunto de entrenamiento,
+    reentrenamiento del mejor candidato con todos los núcleos, evaluación en
+    el conjunto de prueba y guardado. Retorna el modelo elegido.
+    """
+    import sklearn
+    from sklearn.ensemble import RandomForestClassifier
+    from sklearn.metrics import classification_report
+    from sklearn.model_selection import train_test_split
+
+    X_train, X_test, y_train, y_test = train_test_split(
+        X, y, test_size=prueba, random_state=semilla, stratify=y
+    )
+
+    inicio = time.perf_counter()
+    tabla = buscar(X_train.to_numpy(), y_train.to_numpy(), grilla, pliegues, procesos, semilla)
+    busqueda = time.perf_counter() - inicio
+    print(f"\n🔎 {len(tabla)} candidatos × {pliegues} pliegues en {busqueda:.1f} s")
+    imprimir_candidatos(tabla)
+
+    elegido = tabla[0]
+    modelo = RandomForestClassifier(**elegido["params"], random_state=semilla, n_jobs=-1)
+    inicio = time.perf_counter()
+    modelo.fit(X_train, y_train)
+    ajuste = time.perf_counter() - inicio
+    # La latencia de producción es con un solo hilo por predicción
+    modelo.set_params(n_jobs=None)
+    una_fila_ms, por_fila_us = latencias(modelo, X_test)
+
+    y_pred = modelo.predict(X_test)
+    print(f"\n🧪 Evaluación del modelo elegido {elegido['params']}:")
+    print(classification_report(y_test, y_pred, digits=3))
+
+    sha256 = guardar_modelo(modelo, ruta_modelo, {
+        "nombre": nombre,
+        "entrenado_en": datetime.now().isoformat(timespec="seconds"),
+        "estimador": type(modelo).__name__,
+        "params": modelo.get_params(),
+        "columnas": list(X.columns),
+        "clases": modelo.classes_.tolist(),
+        "filas": {"entrenamiento": len(X_train), "prueba": len(X_test)},
+        "origen": origen,
+        "busqueda": {"pliegues": pliegues, "segundos": busqueda, "candidatos": tabla},
+        "final": {
+            "ajuste_s": ajuste,
+            "prediccion_una_fila_ms": una_fila_ms,
+            "prediccion_por_fila_us": por_fila_us,
+            "tamano_bytes": tamano_modelo(modelo),
+            "prueba": classification_report(y_test, y_pred, output_dict=True),
+        },
+        "entorno": {
+            "python": platform.python_version(),
+            "sklearn": sklearn.__version__,
+            "numpy": np.__version__,
+            "pandas": pd.__version__,
+        },
+    })
+    print(f"✅ Modelo guardado como {Path(ruta_modelo).name} (versión {sha256[:12]}) con metadatos en "
+          f"{Path(ruta_modelo).name}.json")
+    return modelo
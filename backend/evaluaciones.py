@@ -0,0 +1,197 @@
+"""
+Registro de evaluaciones en dbo.EvaluacionDeRut con escritura diferida.
+
+GET /riesgo/global/{rut} ya no hace INSERT + COMMIT antes de responder: deja
+la fila en un buffer en memoria y un hilo la escribe junto con las demás
+con un solo `executemany` (fast_executemany) cada `max_filas` filas o cada
+`intervalo_ms`, lo que ocurra primero. FechaEvaluacion es el momento en que
+se evaluó (se toma al armar la fila), no el de la escritura. Al apagar el
+servidor se vacía el buffer. Si el mismo RUT se vuelve a evaluar con exactamente los mismos
+niveles dentro de `colapso` segundos, no se agrega otra fila.
+"""
+import os
+import threading
+import time
+import traceback
+from collections import deque
+from datetime import datetime
+
+from backend.db import get_connection
+
+QUERY_INSERT_EVALUACION = """
+    INSERT INTO [dbo].[EvaluacionDeRut]
+        (Run, NombreCompleto, Carrera, NivelRiesgo, NivelRiesgoAcademico, NivelRiesgoPsicologico, NivelRiesgoInterseccional, FechaEvaluacion)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?);
+"""
+
+
+def fila_evaluacion(resultado, fecha=None):
+    """Parámetros de QUERY_INSERT_EVALUACION; la fecha (por defecto, ahora) va al final."""
+    riesgos = resultado["riesgos"]
+    return (
+        resultado["rut"], resultado["nombre_completo"], resultado["carrera"], resultado["riesgo_global"],
+        riesgos["academico"]["nivel"], riesgos["psicologico"]["nivel"], riesgos["interseccional"]["nivel"],
+        fecha or datetime.now(),
+    )
+
+
+def insertar_evaluaciones(conn, filas):
+    cursor = conn.cursor()
+    cursor.fast_executemany = True
+    cursor.executemany(QUERY_INSERT_EVALUACION, filas)
+    conn.commit()
+    cursor.close()
+
+
+def _escribir_en_bd(filas):
+    with get_connection() as conn:
+        insertar_evaluaciones(conn, filas)
+
+
+class BufferEvaluaciones:
+    """
+    Cola de filas para QUERY_INSERT_EVALUACION escrita en lotes por un hilo.
+
+    Si una escritura falla, las filas vuelven al inicio de la cola y se
+    reintenta en el próximo ciclo; pasadas `max_pendientes` filas se
+    descartan las más antiguas (y se cuentan en `descartadas`). Lo que no se
+    pudo escribir al cerrar también se cuenta ahí y se informa.
+    """
+
+    def __init__(self, escribir=_escribir_en_bd, max_filas=200, intervalo_ms=500.0,
+                 colapso=60.0, max_pendientes=50000):
+        self._escribir = escribir
+        self.max_filas = max_filas
+        self.intervalo = intervalo_ms / 1000.0
+        self.colapso = colapso
+        self.max_pendientes = max_pendientes
+        self._pendientes = deque()
+        self._ultimas = {}  # rut -> (fila, momento) de la última fila encolada
+        self._condicion = threading.Condition()
+        self._hilo = None
+        self._cerrando = False
+        self.encoladas = 0
+        self.colapsadas = 0
+        self.escritas = 0
+        self.descartadas = 0
+        self.lotes = 0
+        self.errores = 0
+        self.ultimo_error = None
+
+    def agregar(self, fila):
+        ahora = time.monotonic()
+        rut, niveles = fila[0], fila[:-1]  # se compara sin la fecha
+        with self._condicion:
+            ultima = self._ultimas.get(rut)
+            if ultima is not None and ultima[0] == niveles and ahora - ultima[1] < self.colapso:
+                self.colapsadas += 1
+                return
+            self._ultimas[rut] = (niveles, ahora)
+            self._pendientes.append(fila)
+            self.encoladas += 1
+            self._recortar()
+            self._asegurar_hilo()
+            if len(self._pendientes) >= self.max_filas:
+                self._condicion.notify()
+
+    def vaciar(self):
+        """Escribe ya todo lo pendiente (en el hilo que llama). Se detiene en
+        la primera escritura fallida; retorna cuántas filas quedaron en cola."""
+        while True:
+            with self._condicion:
+                lote = self._tomar_lote()
+            if not lote or not self._escribir_lote(lote):
+                with self._condicion:
+                    return len(self._pendientes)
+
+    def cerrar(self):
+        """Detiene el hilo después de escribir lo pendiente."""
+        with self._condicion:
+            self._cerrando = True
+            self._condicion.notify()
+            hilo = self._hilo
+        if hilo is not None:
+            hilo.join()
+        if self.vaciar():
+            with self._condicion:
+                perdidas = len(self._pendientes)
+                self._pendientes.clear()
+                self.descartadas += perdidas
+            print(f"⚠️ {perdidas} evaluaciones sin escribir en EvaluacionDeRut al cerrar: {self.ultimo_error}")
+
+    def stats(self):
+        with self._condicion:
+            return {
+                "pendientes": len(self._pendientes),
+                "encoladas": self.encoladas,
+                "colapsadas": self.colapsadas,
+                "escritas": self.escritas,
+                "descartadas": self.descartadas,
+                "lotes": self.lotes,
+                "errores": self.errores,
+                "ultimo_error": self.ultimo_error,
+            }
+
+    def _asegurar_hilo(self):
+        if self._hilo is None and not self._cerrando:
+            self._hilo = threading.Thread(target=self._atender, name="evaluaciones", daemon=True)
+            self._hilo.start()
+
+    def _atender(self):
+        while True:
+            with self._condicion:
+                limite = time.monotonic() + self.intervalo
+                while not self._cerrando and len(self._pendientes) < self.max_filas:
+                    restante = limite - time.monotonic()
+                    if restante <= 0:
+                        break
+                    self._condicion.wait(restante)
+                if self._cerrando:
+                    return
+                lote = self._tomar_lote()
+                self._olvidar_viejas()
+            if lote and not self._escribir_lote(lote):
+                # La cola reencolada ya puede llenar un lote: sin esta pausa
+                # se reintentaría sin esperar contra una BD caída
+                with self._condicion:
+                    self._condicion.wait_for(lambda: self._cerrando, self.intervalo)
+
+    def _tomar_lote(self):
+        lote = []
+        while self._pendientes and len(lote) < self.max_filas:
+            lote.append(self._pendientes.popleft())
+        return lote
+
+    def _escribir_lote(self, lote):
+        try:
+            self._escribir(lote)
+        except Exception:
+            with self._condicion:
+                self._pendientes.extendleft(reversed(lote))
+                self._recortar()
+                self.errores += 1
+                self.ultimo_error = traceback.format_exc(limit=1).strip().splitlines()[-1]
+            return False
+        with self._condicion:
+            self.escritas += len(lote)
+            self.lotes += 1
+        return True
+
+    def _recortar(self):
+        # Se llama con el lock tomado: sobre `max_pendientes` se van las más antiguas
+        while len(self._pendientes) > self.max_pendientes:
+            self._pendientes.popleft()
+            self.descartadas += 1
+
+    def _olvidar_viejas(self):
+        # Las últimas filas solo sirven para colapsar dentro de la ventana
+        if len(self._ultimas) > self.max_pendientes:
+            limite = time.monotonic() - self.colapso
+            self._ultimas = {r: u for r, u in self._ultimas.items() if u[1] >= limite}
+
+
+buffer = BufferEvaluaciones(
+    max_filas=int(os.getenv("EVALUACIONES_MAX_FILAS", "200")),
+    intervalo_ms=float(os.getenv("EVALUACIONES_INTERVALO_MS", "500")),
+    colapso=float(os.getenv("EVALUACIONES_COLAPSO", "60")),
+)
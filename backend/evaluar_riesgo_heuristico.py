@@ -1,39 +1,13 @@
-import pandas as pd
-import pyodbc
-from dotenv import load_dotenv
 import os
+import threading
+import time
 
-# Cargar variables de entorno
-load_dotenv()
+from backend.db import get_connection
+from backend.perfil_estudiante import clave_rut
+from backend.reglas_riesgo import evaluar_heuristico, motivos_heuristicos, niveles
 
-# Conexión a SQL Server
-conn = pyodbc.connect(
-    f"DRIVER={{ODBC Driver 17 for SQL Server}};"
-    f"SERVER={os.getenv('DB_SERVER')};"
-    f"DATABASE={os.getenv('DB_NAME')};"
-    f"UID={os.getenv('DB_USER')};"
-    f"PWD={os.getenv('DB_PASSWORD')}"
-)
-
-# Consulta SQL que replica la lógica en C# con reemplazo de comas y validación ISNUMERIC
+# Consulta SQL de toda la cohorte; los ramos reprobados vienen materializados (backend/ramos_reprobados.py)
 query = """
-WITH RamosConNotasCriticas AS (
-    SELECT 
-        RUT,
-        COUNT(DISTINCT [Denominación Actividad Curricular]) AS RamosReprobados
-    FROM [dbo].[NotasPace2025]
-    CROSS APPLY (
-        SELECT 
-            CASE WHEN ISNUMERIC(REPLACE([Nota_1], ',', '.')) = 1 THEN CAST(REPLACE([Nota_1], ',', '.') AS FLOAT) ELSE NULL END UNION ALL
-            SELECT CASE WHEN ISNUMERIC(REPLACE([Nota_2], ',', '.')) = 1 THEN CAST(REPLACE([Nota_2], ',', '.') AS FLOAT) ELSE NULL END UNION ALL
-            SELECT CASE WHEN ISNUMERIC(REPLACE([Nota_3], ',', '.')) = 1 THEN CAST(REPLACE([Nota_3], ',', '.') AS FLOAT) ELSE NULL END UNION ALL
-            SELECT CASE WHEN ISNUMERIC(REPLACE([Nota_4], ',', '.')) = 1 THEN CAST(REPLACE([Nota_4], ',', '.') AS FLOAT) ELSE NULL END UNION ALL
-            SELECT CASE WHEN ISNUMERIC(REPLACE([Nota_5], ',', '.')) = 1 THEN CAST(REPLACE([Nota_5], ',', '.') AS FLOAT) ELSE NULL END UNION ALL
-            SELECT CASE WHEN ISNUMERIC(REPLACE([Nota_6], ',', '.')) = 1 THEN CAST(REPLACE([Nota_6], ',', '.') AS FLOAT) ELSE NULL END
-    ) AS Notas(nota)
-    WHERE nota IS NOT NULL AND nota < 4.0
-    GROUP BY RUT
-)
 SELECT 
     p.RUT,
     p.[NOMBRE COMPLETO],
@@ -45,60 +19,130 @@ SELECT
     e.[PROMEDIO SOCIABILIDAD],
     e.[PROMEDIO PROSPECTIVA ACADÉMICA]
 FROM [dbo].[PACE2024_ACTUALIZADO] p
-LEFT JOIN RamosConNotasCriticas r ON p.RUT = r.RUT
+LEFT JOIN [dbo].[RamosReprobados] r ON p.RUT = r.RUT
 LEFT JOIN [dbo].[Epaes$] e ON CAST(p.RUT AS VARCHAR) = CAST(e.RUT AS VARCHAR)
 """
 
-# Ejecutar consulta y cargar DataFrame
-df = pd.read_sql(query, conn)
-
-# Evaluación de riesgo según lógica heurística
-def evaluar_riesgo(row):
-    puntaje = 0
-    motivos = []
-
-    ramos = row["RamosReprobados"] if not pd.isna(row["RamosReprobados"]) else 0
-    if ramos == 1:
-        puntaje += 1
-        motivos.append("1 ramo con nota menor a 4.0")
-    elif ramos >= 2:
-        puntaje += 2
-        motivos.append(f"{int(ramos)} ramos con nota menor a 4.0")
-
-    if pd.notna(row["PROMEDIO AUTOEFICACIA ACADÉMICA"]) and row["PROMEDIO AUTOEFICACIA ACADÉMICA"] < 3.0:
-        puntaje += 1
-        motivos.append("Autoeficacia baja")
-    if pd.notna(row["PROMEDIO MODULACIÓN EMOCIONAL"]) and row["PROMEDIO MODULACIÓN EMOCIONAL"] < 3.0:
-        puntaje += 1
-        motivos.append("Modulación emocional baja")
-    if pd.notna(row["PROMEDIO AUTODETERMINACIÓN PERSONAL"]) and row["PROMEDIO AUTODETERMINACIÓN PERSONAL"] < 3.0:
-        puntaje += 1
-        motivos.append("Autodeterminación baja")
-    if pd.notna(row["PROMEDIO SOCIABILIDAD"]) and row["PROMEDIO SOCIABILIDAD"] < 3.0:
-        puntaje += 1
-        motivos.append("Sociabilidad baja")
-    if pd.notna(row["PROMEDIO PROSPECTIVA ACADÉMICA"]) and row["PROMEDIO PROSPECTIVA ACADÉMICA"] < 3.0:
-        puntaje += 1
-        motivos.append("Prospectiva académica baja")
-
-    nivel = "Bajo" if puntaje <= 1 else "Medio" if puntaje == 2 else "Alto"
-
-    return pd.Series([puntaje, nivel, ", ".join(motivos)])
-
-# Aplicar evaluación
-df[["Puntaje", "NivelRiesgo", "Motivos"]] = df.apply(evaluar_riesgo, axis=1)
+COLUMNAS_EPAES = [
+    "PROMEDIO AUTOEFICACIA ACADÉMICA",
+    "PROMEDIO MODULACIÓN EMOCIONAL",
+    "PROMEDIO AUTODETERMINACIÓN PERSONAL",
+    "PROMEDIO SOCIABILIDAD",
+    "PROMEDIO PROSPECTIVA ACADÉMICA",
+]
+
+# Evaluación de riesgo según lógica heurística (vectorizada sobre toda la cohorte)
+def evaluar_riesgo(df):
+    ramos = df["RamosReprobados"].to_numpy(dtype=float)
+    puntaje, codigo, mascara = evaluar_heuristico(ramos, df[COLUMNAS_EPAES].to_numpy(dtype=float))
+    df["Puntaje"] = puntaje
+    df["NivelRiesgo"] = niveles(codigo)
+    df["Motivos"] = motivos_heuristicos(ramos, mascara)
+    return df
+
+
+def cargar_indice():
+    """Ejecuta la consulta de toda la cohorte, la evalúa y la indexa por RUT."""
+    import pandas as pd
+
+    with get_connection() as conn:
+        df = pd.read_sql(query, conn)
+    evaluar_riesgo(df)
+
+    indice = {}
+    for rut, nombre, carrera, nivel, puntaje, motivos in zip(
+        df["RUT"], df["NOMBRE COMPLETO"], df["Carrera"],
+        df["NivelRiesgo"], df["Puntaje"], df["Motivos"],
+    ):
+        # Igual que antes con iloc[0]: si el RUT se repite gana la primera fila
+        indice.setdefault(clave_rut(rut), (nombre, carrera, nivel, int(puntaje), motivos))
+    return indice
+
+
+class SnapshotHeuristico:
+    """
+    Foto en memoria del riesgo heurístico de toda la cohorte, indexada por RUT.
+
+    Se carga en la primera consulta (o antes con `precargar()`) y luego un
+    hilo la recarga cada `intervalo` segundos. La foto nueva se arma aparte y
+    se reemplaza de una sola asignación, así que las lecturas nunca ven una
+    foto a medio construir. Si una recarga falla se mantiene la anterior.
+    """
+
+    def __init__(self, cargador=cargar_indice, intervalo=900.0):
+        self._cargador = cargador
+        self.intervalo = intervalo
+        self._foto = None  # (indice, instante de carga)
+        self._lock = threading.Lock()
+        self._hilo = None
+
+    def obtener(self, rut):
+        indice, _ = self._vigente()
+        return indice.get(clave_rut(rut))
+
+    def precargar(self):
+        """Carga en segundo plano sin bloquear a quien llama."""
+        with self._lock:
+            self._iniciar_refresco()
+
+    def edad(self):
+        foto = self._foto
+        return None if foto is None else time.monotonic() - foto[1]
+
+    def tamano(self):
+        foto = self._foto
+        return 0 if foto is None else len(foto[0])
+
+    def estado(self):
+        return {"cargado": self._foto is not None, "edad_segundos": self.edad(), "estudiantes": self.tamano()}
+
+    def recargar(self):
+        self._foto = (self._cargador(), time.monotonic())
+
+    def _vigente(self):
+        foto = self._foto
+        if foto is None:
+            with self._lock:
+                if self._foto is None:
+                    self.recargar()
+                self._iniciar_refresco()
+                foto = self._foto
+        return foto
+
+    def _iniciar_refresco(self):
+        # Se llama con el lock tomado
+        if self._hilo is None:
+            self._hilo = threading.Thread(target=self._refrescar, daemon=True)
+            self._hilo.start()
+
+    def _refrescar(self):
+        try:
+            # Con el lock, igual que una consulta: si una llega mientras se
+            # carga, espera esta carga en vez de lanzar otra.
+            self._vigente()
+        except Exception:
+            pass  # se reintenta en el próximo ciclo o en la primera consulta
+        while True:
+            time.sleep(self.intervalo)
+            try:
+                self.recargar()
+            except Exception:
+                pass
+
+
+snapshot = SnapshotHeuristico(intervalo=float(os.getenv("HEURISTICO_REFRESCO", "900")))
 
 # Para usar en FastAPI
 def obtener_riesgo_por_rut(rut: str):
-    fila = df[df["RUT"] == rut]
-    if fila.empty:
+    fila = snapshot.obtener(rut)
+    if fila is None:
         return None
-    fila = fila.iloc[0]
+    nombre, carrera, nivel, puntaje, motivos = fila
     return {
         "rut": rut,
-        "nombre": fila["NOMBRE COMPLETO"],
-        "carrera": fila["Carrera"],
-        "riesgo": fila["NivelRiesgo"],
-        "puntaje": int(fila["Puntaje"]),
-        "motivos": fila["Motivos"]
+        "nombre": nombre,
+        "carrera": carrera,
+        "riesgo": nivel,
+        "puntaje": puntaje,
+        "motivos": motivos
     }
@@ -0,0 +1,179 @@
+"""
+Exportación masiva de reportes PDF de una cohorte (carrera y/o año de
+ingreso) como un ZIP transmitido a medida que se generan los PDFs.
+
+- Los datos se cargan por tramos de RUTs con `cargar_perfiles` (un lote SQL
+  por tramo) en vez de seis consultas por estudiante.
+- Cada tramo se renderiza en paralelo en el pool de procesos de reportes y
+  cada PDF se escribe al ZIP apenas termina, en el orden en que terminan.
+- En memoria hay a lo más un tramo de datos y sus PDFs: el ZIP no se arma
+  completo, cada entrada se envía al cliente y se descarta.
+- Cada exportación tiene un id (cabecera X-Exportacion) para consultar su
+  avance mientras se descarga.
+"""
+import asyncio
+import threading
+import time
+import uuid
+import zipfile
+from collections import OrderedDict
+from dataclasses import dataclass, field
+
+from backend.db_async import con_conexion
+from backend.perfil_estudiante import cargar_perfiles, clave_rut, SECCIONES_REPORTE
+from backend.recomendaciones import catalogo as catalogo_recomendaciones
+from backend.reportes import datos_reporte, generador as generador_reportes
+
+# RUTs por tramo: un lote SQL y a lo más esta cantidad de PDFs en memoria
+TAMANO_TRAMO = 100
+
+# Exportaciones recordadas para consultar su estado
+MAX_EXPORTACIONES = 50
+
+SQL_RUTS_COHORTE = """
+    SELECT [RUT]
+    FROM dbo.PACE2024_ACTUALIZADO
+    WHERE (? IS NULL OR [Carrera] = ?)
+      AND (? IS NULL OR [AÑO DE INGRESO] = ?)
+    ORDER BY [RUT]
+"""
+
+
+@dataclass
+class Exportacion:
+    carrera: object = None
+    anio_ingreso: object = None
+    id: str = field(default_factory=lambda: uuid.uuid4().hex)
+    estado: str = "pendiente"  # pendiente, en curso, terminada, cancelada, error
+    total: int = 0
+    listos: int = 0
+    errores: list = field(default_factory=list)
+    iniciada_en: float = field(default_factory=time.time)
+    terminada_en: float = None
+
+    def to_dict(self):
+        return {
+            "id": self.id,
+            "carrera": self.carrera,
+            "anio_ingreso": self.anio_ingreso,
+            "estado": self.estado,
+            "total": self.total,
+            "listos": self.listos,
+            "errores": len(self.errores),
+            "avance": round(self.listos / self.total, 4) if self.total else 0.0,
+            "iniciada_en": self.iniciada_en,
+            "terminada_en": self.terminada_en,
+        }
+
+    def nombre_archivo(self):
+        partes = [str(p) for p in (self.carrera, self.anio_ingreso) if p is not None]
+        nombre = "_".join(partes) or "cohorte"
+        return "reportes_" + "".join(c if c.isalnum() or c in "-_" else "_" for c in nombre) + ".zip"
+
+
+class _Registro:
+    def __init__(self, maximo):
+        self.maximo = maximo
+        self._exportaciones = OrderedDict()
+        self._lock = threading.Lock()
+
+    def nueva(self, carrera, anio_ingreso):
+        exportacion = Exportacion(carrera, anio_ingreso)
+        with self._lock:
+            self._exportaciones[exportacion.id] = exportacion
+            while len(self._exportaciones) > self.maximo:
+                self._exportaciones.popitem(last=False)
+        return exportacion
+
+    def obtener(self, id):
+        with self._lock:
+            return self._exportaciones.get(id)
+
+
+registro = _Registro(MAX_EXPORTACIONES)
+
+
+class _Salida:
+    """Destino del ZIP sin seek: acumula lo escrito hasta que se retira."""
+
+    def __init__(self):
+        self._partes = []
+
+    def write(self, datos):
+        self._partes.append(bytes(datos))
+        return len(datos)
+
+    def flush(self):
+        pass
+
+    def retirar(self):
+        datos = b"".join(self._partes)
+        self._partes.clear()
+        return datos
+
+
+def _ruts_cohorte(conn, carrera, anio_ingreso):
+    cursor = conn.cursor()
+    cursor.execute(SQL_RUTS_COHORTE, carrera, carrera, anio_ingreso, anio_ingreso)
+    ruts = [fila[0] for fila in cursor.fetchall()]
+    cursor.close()
+    return ruts
+
+
+def _datos_tramo(conn, ruts):
+    perfiles = cargar_perfiles(conn, ruts, SECCIONES_REPORTE)
+    catalogo_recomendaciones.preparar(conn)
+    return [(rut, datos_reporte(p)) for rut, p in perfiles.items() if p.datos is not None]
+
+
+async def _pdf(rut, datos):
+    try:
+        pdf, _ = await generador_reportes.pdf(datos, guardar=False)
+        return rut, pdf, None
+    except Exception as e:
+        return rut, None, e
+
+
+async def zip_cohorte(exportacion):
+    """Genera los bytes del ZIP a medida que se agregan los PDFs."""
+    salida = _Salida()
+    exportacion.estado = "en curso"
+    try:
+        ruts = await con_conexion(_ruts_cohorte, exportacion.carrera, exportacion.anio_ingreso)
+        exportacion.total = len(ruts)
+
+        # PDFs ya comprimidos: se guardan sin volver a comprimir
+        with zipfile.ZipFile(salida, "w", compression=zipfile.ZIP_STORED) as archivo:
+            for inicio in range(0, len(ruts), TAMANO_TRAMO):
+                ruts_tramo = ruts[inicio:inicio + TAMANO_TRAMO]
+                tramo = await con_conexion(_datos_tramo, ruts_tramo)
+                exportacion.listos += len(ruts_tramo) - len(tramo)  # sin datos: nada que renderizar
+                tareas = [asyncio.ensure_future(_pdf(rut, datos)) for rut, datos in tramo]
+                try:
+                    for terminada in asyncio.as_completed(tareas):
+                        rut, pdf, error = await terminada
+                        if error is None:
+                            archivo.writestr(f"reporte_{clave_rut(rut)}.pdf", pdf)
+                        else:
+                            exportacion.errores.append(f"{rut}: {error!r}")
+                        exportacion.listos += 1
+                        datos = salida.retirar()
+                        if datos:
+                            yield datos
+                finally:
+                    for tarea in tareas:
+                        tarea.cancel()
+
+            if exportacion.errores:
+                archivo.writestr("errores.txt", "\n".join(exportacion.errores))
+        yield salida.retirar()
+        exportacion.estado = "terminada"
+    except (asyncio.CancelledError, GeneratorExit):
+        # El cliente cortó la descarga
+        exportacion.estado = "cancelada"
+        raise
+    except Exception:
+        exportacion.estado = "error"
+        raise
+    finally:
+        exportacion.terminada_en = time.time()
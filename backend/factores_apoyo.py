@@ -0,0 +1,165 @@
+"""
+Registro de factores de apoyo (FactoresPsicologicos / FactoresAcademicos)
+en lote: los registros se cargan en una tabla temporal con un solo
+`executemany` (fast_executemany) y se aplican con un único MERGE por tabla,
+que devuelve con OUTPUT qué pasó con cada fila.
+"""
+from dataclasses import dataclass
+
+from backend.perfil_estudiante import clave_rut
+
+# Máximo de registros por llamada a los endpoints de lote
+MAX_REGISTROS_LOTE = 5000
+
+# Campo del JSON -> columna de la tabla
+CAMPOS = {
+    "rut": "rut_estudiante",
+    "nivel_riesgo": "nivel_riesgo",
+    "esta_apoyo": "esta_recibiendo_apoyo",
+    "profesional": "nombre_profesional",
+    "observaciones": "observaciones",
+}
+
+# Campo del JSON -> (tipos aceptados, descripción para el error). Todos
+# pueden venir nulos salvo el RUT; un bool no cuenta como entero.
+# Sin `esta_apoyo` se guarda 0 (ver _valores): la columna se lee como entero.
+TIPOS = {
+    "rut": ((str, int), "texto o número"),
+    "nivel_riesgo": ((str,), "texto"),
+    "esta_apoyo": ((bool, int), "booleano o entero"),
+    "profesional": ((str,), "texto"),
+    "observaciones": ((str,), "texto"),
+}
+
+RESULTADOS = {"INSERT": "insertado", "UPDATE": "actualizado"}
+
+
+@dataclass(frozen=True)
+class TablaFactores:
+    nombre: str
+    actualizar_fecha: bool  # FactoresPsicologicos registra la fecha de cada cambio
+
+
+PSICOLOGICOS = TablaFactores("FactoresPsicologicos", actualizar_fecha=True)
+ACADEMICOS = TablaFactores("FactoresAcademicos", actualizar_fecha=False)
+
+
+def _merge(tabla, origen):
+    """MERGE sobre `tabla` desde `origen` (con columnas fila + CAMPOS) que
+    retorna (fila, $action) por cada registro aplicado."""
+    columnas = ", ".join(CAMPOS.values())
+    asignaciones = [f"{c} = source.{c}" for c in CAMPOS.values() if c != "rut_estudiante"]
+    if tabla.actualizar_fecha:
+        asignaciones.append("fecha_registro = GETDATE()")
+    return f"""
+        MERGE INTO {tabla.nombre} WITH (HOLDLOCK) AS target
+        USING {origen} AS source
+        ON target.rut_estudiante = source.rut_estudiante
+        WHEN MATCHED THEN
+            UPDATE SET {", ".join(asignaciones)}
+        WHEN NOT MATCHED THEN
+            INSERT ({columnas})
+            VALUES ({", ".join("source." + c for c in CAMPOS.values())})
+        OUTPUT source.fila, $action;
+    """
+
+
+def _sentencias(tabla):
+    """(crear temporal, insertar en temporal, MERGE) para `tabla`."""
+    columnas = ", ".join(CAMPOS.values())
+
+    # La temporal hereda los tipos de la tabla real (SELECT INTO sin filas).
+    # Si quedó de una llamada fallida en esta misma conexión, se recrea.
+    crear = f"""
+        SET NOCOUNT ON;
+        IF OBJECT_ID('tempdb..#factores') IS NOT NULL DROP TABLE #factores;
+        SELECT TOP 0 CAST(0 AS INT) AS fila, {columnas}
+        INTO #factores
+        FROM {tabla.nombre};
+    """
+    insertar = f"""
+        INSERT INTO #factores (fila, {columnas})
+        VALUES (?, {", ".join("?" * len(CAMPOS))});
+    """
+    merge = "SET NOCOUNT ON;" + _merge(tabla, "#factores") + "DROP TABLE #factores;"
+    return crear, insertar, merge
+
+
+def validar_registro(registro):
+    """Motivo por el que `registro` no se puede aplicar, o None si es válido.
+    Se revisa antes de escribir: un tipo equivocado haría fallar la sentencia
+    (y en lote, todo el lote)."""
+    if not isinstance(registro, dict):
+        return "El registro debe ser un objeto JSON"
+    if registro.get("rut") in (None, ""):
+        return "Falta el RUT"
+    for campo, (tipos, descripcion) in TIPOS.items():
+        valor = registro.get(campo)
+        if valor is None:
+            continue
+        if not isinstance(valor, tipos) or (isinstance(valor, bool) and bool not in tipos):
+            return f"{campo} debe ser {descripcion}"
+    return None
+
+
+def _valores(registro):
+    """Valores de CAMPOS para un registro ya validado, con el RUT normalizado
+    y `esta_apoyo` en 0 si no vino."""
+    valores = {campo: registro.get(campo) for campo in CAMPOS}
+    valores["rut"] = clave_rut(valores["rut"])
+    if valores["esta_apoyo"] is None:
+        valores["esta_apoyo"] = 0
+    return tuple(valores.values())
+
+
+def registrar_factor(conn, tabla, registro):
+    """Un solo registro (ya validado con `validar_registro`): un MERGE
+    directo, sin tabla temporal. Retorna "insertado" o "actualizado"."""
+    origen = "(SELECT ? AS fila, " + ", ".join(f"? AS {c}" for c in CAMPOS.values()) + ")"
+    cursor = conn.cursor()
+    cursor.execute(_merge(tabla, origen), 0, *_valores(registro))
+    _, accion = cursor.fetchone()
+    conn.commit()
+    cursor.close()
+    return RESULTADOS.get(accion, accion.lower())
+
+
+def registrar_factores(conn, tabla, registros):
+    """
+    Aplica `registros` (dicts con las claves de CAMPOS) sobre `tabla` y
+    retorna un resultado por registro, en el mismo orden:
+    {"fila", "rut", "resultado": insertado | actualizado | duplicado | invalido}.
+    Los que no pasan `validar_registro` quedan como "invalido" con el motivo
+    en "detalle". Si un RUT viene más de una vez (también como texto y como
+    número) gana el último; los anteriores quedan como "duplicado".
+    """
+    resultados = [{"fila": i, "rut": r.get("rut") if isinstance(r, dict) else None} for i, r in enumerate(registros)]
+    ultimo_por_rut = {}
+    for i, registro in enumerate(registros):
+        error = validar_registro(registro)
+        if error is not None:
+            resultados[i]["resultado"] = "invalido"
+            resultados[i]["detalle"] = error
+            continue
+        # El MERGE falla si dos filas de origen caen en la misma fila destino
+        clave = clave_rut(registro["rut"])
+        anterior = ultimo_por_rut.get(clave)
+        if anterior is not None:
+            resultados[anterior]["resultado"] = "duplicado"
+        ultimo_por_rut[clave] = i
+
+    filas = [(i, *_valores(registros[i])) for i in sorted(ultimo_por_rut.values())]
+    if not filas:
+        return resultados
+
+    crear, insertar, merge = _sentencias(tabla)
+    cursor = conn.cursor()
+    cursor.execute(crear)
+    cursor.fast_executemany = True
+    cursor.executemany(insertar, filas)
+    cursor.execute(merge)
+    for fila, accion in cursor.fetchall():
+        resultados[fila]["resultado"] = RESULTADOS.get(accion, accion.lower())
+    conn.commit()
+    cursor.close()
+    return resultados
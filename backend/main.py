@@ -1,23 +1,61 @@
-from fastapi import FastAPI, HTTPException, Request
+from contextlib import aclosing, asynccontextmanager
+from typing import Literal, Optional
+from fastapi import FastAPI, HTTPException, Query, Request, Response
+from fastapi.encoders import jsonable_encoder
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import FileResponse
-import pandas as pd
-from backend.db import get_connection
+from fastapi.responses import StreamingResponse
+from backend.arranque import Precalentamiento
+from backend.db import get_connection, get_pool
+from backend.db_async import en_db, con_conexion, leer_filas, lotes_de_filas, limite
+from backend.paginacion import Listado, ColumnaInvalidaError, CursorInvalidoError, MAX_PAGINA, siguiente, separar_columnas
 from backend.predictor import predecir_riesgo_por_rut
 from backend.predictor_hibrido import predecir_riesgo_hibrido
-from backend.evaluar_riesgo_heuristico import obtener_riesgo_por_rut
+from backend.modelos import registro as registro_modelos
+from backend.evaluar_riesgo_heuristico import obtener_riesgo_por_rut, snapshot as snapshot_heuristico
 from backend.riesgo_academico import calcular_riesgo_academico
 from backend.riesgo_psicologico import calcular_riesgo_psicologico
 from backend.riesgo_interseccional import calcular_riesgo_interseccional
-from backend.riesgo_global import combinar_niveles
-from weasyprint import HTML
-import tempfile
-from datetime import datetime
+from backend.riesgo_global import evaluar_riesgo_global, evaluar_riesgo_global_lote
+from backend.perfil_estudiante import cargar_perfil, cargar_perfiles, SECCIONES_GLOBAL, SECCIONES_REPORTE
+from backend.recomendaciones import catalogo as catalogo_recomendaciones
+from backend.cache_rut import cache as cache_rut
+from backend.factores_apoyo import (
+    registrar_factor, registrar_factores, validar_registro, PSICOLOGICOS, ACADEMICOS, MAX_REGISTROS_LOTE
+)
+from backend.evaluaciones import fila_evaluacion, insertar_evaluaciones, buffer as buffer_evaluaciones
+from backend.reportes import datos_reporte, generador as generador_reportes
+from backend.exportacion import zip_cohorte, registro as registro_exportaciones
+import importlib
+import json
 import os
 
 
+def _conexion_inicial():
+    with get_connection():
+        pass
+
+
+# Lo que se carga al primer uso, hecho en segundo plano al arrancar
+precalentamiento = Precalentamiento([
+    ("pandas", lambda: importlib.import_module("pandas")),
+    ("modelo_riesgo", lambda: registro_modelos.obtener("riesgo")),
+    ("modelo_hibrido", lambda: registro_modelos.obtener("hibrido")),
+    ("reportes", generador_reportes.precalentar),
+    ("db", _conexion_inicial),
+    ("recomendaciones", catalogo_recomendaciones.precargar),
+    ("heuristico", snapshot_heuristico.precargar),
+], activo=os.getenv("PRECALENTAR", "1") == "1")
+
 
-app = FastAPI()
+@asynccontextmanager
+async def ciclo_de_vida(app):
+    precalentamiento.iniciar()
+    yield
+    buffer_evaluaciones.cerrar()
+    generador_reportes.cerrar()
+
+
+app = FastAPI(lifespan=ciclo_de_vida)
 
 # CORS para frontend Vue
 app.add_middleware(
@@ -26,28 +64,102 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Siguiente", "X-Exportacion"],
+)
+
+
+def _consulta_listado(listado, columnas, filtros, despues_de, por_pagina):
+    """Retorna (sql, params, columnas de la clave que no se pidieron)."""
+    pedidas = separar_columnas(columnas)
+    try:
+        sql, params = listado.consulta(pedidas, filtros, despues_de, por_pagina)
+    except (ColumnaInvalidaError, CursorInvalidoError) as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return sql, params, listado.ocultas(pedidas)
+
+
+def _quitar(filas, ocultas):
+    for fila in filas:
+        for columna in ocultas:
+            del fila[columna]
+    return filas
+
+
+async def _ndjson(nombre_limite, sql, params, ocultas):
+    # Una línea JSON por fila, escrita a medida que llegan los lotes del cursor
+    async with limite(nombre_limite):
+        async with aclosing(lotes_de_filas(sql, params)) as lotes:
+            async for lote in lotes:
+                lote = jsonable_encoder(_quitar(lote, ocultas))
+                yield "".join(json.dumps(fila, ensure_ascii=False) + "\n" for fila in lote)
+
+
+async def _responder_listado(nombre_limite, listado, response, formato, sql, params, por_pagina, ocultas):
+    if formato == "ndjson":
+        return StreamingResponse(_ndjson(nombre_limite, sql, params, ocultas), media_type="application/x-ndjson")
+    async with limite(nombre_limite):
+        filas = await leer_filas(sql, params)
+    # El cursor sale de la clave antes de quitar las columnas que no se pidieron
+    cursor = siguiente(listado, filas, por_pagina)
+    if cursor is not None:
+        response.headers["X-Siguiente"] = cursor
+    return _quitar(filas, ocultas)
+
+
+LISTADO_ESTUDIANTES = Listado(
+    origen="dbo.PACE2024_ACTUALIZADO",
+    columnas={c: f"[{c}]" for c in (
+        "RUT", "NOMBRE COMPLETO", "Carrera", "AÑO DE INGRESO", "Ciudad", "Via de Ingreso", "Estado"
+    )},
+    clave=("RUT",),
+    filtros={"carrera": "[Carrera]", "anio_ingreso": "[AÑO DE INGRESO]", "estado": "[Estado]"},
 )
 
-# 📌 Obtener todos los estudiantes
+# 📌 Obtener estudiantes
+# Sin parámetros devuelve todos como antes. Con `por_pagina` pagina por RUT:
+# la cabecera X-Siguiente trae el valor para `despues_de` de la próxima página.
+# `columnas=RUT,Carrera` limita las columnas y `formato=ndjson` transmite
+# una fila por línea directo desde el cursor.
 @app.get("/estudiantes")
-def leer_estudiantes():
-    conn = get_connection()
-    query = """
-        SELECT [RUT], [NOMBRE COMPLETO], [Carrera], [AÑO DE INGRESO],
-               [Ciudad], [Via de Ingreso], [Estado]
-        FROM dbo.PACE2024_ACTUALIZADO
-    """
-    df = pd.read_sql(query, conn)
-    return df.to_dict(orient="records")
+async def leer_estudiantes(
+    response: Response,
+    columnas: Optional[str] = None,
+    carrera: Optional[str] = None,
+    anio_ingreso: Optional[int] = None,
+    estado: Optional[str] = None,
+    despues_de: Optional[str] = None,
+    por_pagina: Optional[int] = Query(None, ge=1, le=MAX_PAGINA),
+    formato: Literal["json", "ndjson"] = "json",
+):
+    filtros = {"carrera": carrera, "anio_ingreso": anio_ingreso, "estado": estado}
+    sql, params, ocultas = _consulta_listado(LISTADO_ESTUDIANTES, columnas, filtros, despues_de, por_pagina)
+    return await _responder_listado("estudiantes", LISTADO_ESTUDIANTES, response, formato, sql, params,
+                                    por_pagina, ocultas)
 
 # 📌 Riesgo basado en predictor simple
 @app.get("/riesgo/{rut}")
-def obtener_riesgo(rut: str):
-    resultado = predecir_riesgo_por_rut(rut)
+async def obtener_riesgo(rut: str):
+    async with limite("riesgo"):
+        resultado = await en_db(predecir_riesgo_por_rut, rut)
     if resultado is None:
         raise HTTPException(status_code=404, detail="Estudiante no encontrado")
     return resultado
 
+# 📌 Versión vigente de cada modelo entrenado
+@app.get("/estado/modelos")
+def estado_modelos():
+    return registro_modelos.versiones()
+
+# 📌 Pasos del precalentamiento al arrancar (duración y errores)
+@app.get("/estado/arranque")
+def estado_arranque():
+    return precalentamiento.estado()
+
+# 📌 Estado de la foto heurística en memoria (edad y tamaño)
+@app.get("/estado/heuristico")
+def estado_heuristico():
+    return snapshot_heuristico.estado()
+
 # 📌 Riesgo heurístico completo
 @app.get("/riesgo_heuristico/{rut}")
 def riesgo_heuristico(rut: str):
@@ -58,96 +170,116 @@ def riesgo_heuristico(rut: str):
 
 # 📌 Riesgo híbrido + historial
 @app.get("/riesgo_hibrido/{rut}")
-def riesgo_hibrido(rut: str):
-    resultado = predecir_riesgo_hibrido(rut)
-    if resultado is None:
-        return {"mensaje": "Estudiante no encontrado"}
+@cache_rut.por_rut("riesgo_hibrido")
+async def riesgo_hibrido(rut: str):
+    async with limite("riesgo_hibrido"):
+        resultado = await en_db(predecir_riesgo_hibrido, rut)
+        if resultado is None:
+            return {"mensaje": "Estudiante no encontrado"}
+
+        query = """
+            SELECT 
+                FORMAT(FechaEvaluacion, 'dd ''de'' MMMM ''de'' yyyy', 'es-ES') AS fecha,
+                NivelRiesgo AS nivel
+            FROM dbo.EvaluacionRiesgo
+            WHERE Run = ?
+            ORDER BY FechaEvaluacion DESC
+        """
+        resultado["historial"] = await leer_filas(query, [rut])
+        return resultado
+
+# EvaluacionRiesgo guarda el historial (una fila por RUT en cada puntuación
+# nocturna, ver /riesgo_hibrido): el listado y los conteos usan solo la
+# evaluación más reciente de cada RUT, así que se pagina por RUT
+LISTADO_RIESGOS = Listado(
+    origen="""(
+            SELECT * FROM (
+                SELECT *, ROW_NUMBER() OVER (PARTITION BY Run ORDER BY FechaEvaluacion DESC) AS rn
+                FROM dbo.EvaluacionRiesgo
+            ) AS ev
+            WHERE rn = 1
+        ) er
+        LEFT JOIN [PBI_Docencia].[dbo].[PACE2024_ACTUALIZADO] p
+            ON er.Run = p.RUT""",
+    columnas={
+        "rut": "er.Run",
+        "nombre": "er.NombreCompleto",
+        "carrera": "er.Carrera",
+        "riesgo": "er.NivelRiesgo",
+        "anio_ingreso": "p.[AÑO DE INGRESO]",
+        "fecha": "er.FechaEvaluacion",
+    },
+    clave=("rut",),
+    filtros={"carrera": "er.Carrera", "anio_ingreso": "p.[AÑO DE INGRESO]", "riesgo": "er.NivelRiesgo"},
+)
+COLUMNAS_RIESGOS = ["rut", "nombre", "carrera", "riesgo", "anio_ingreso"]
+
+
+def _resumen_riesgos(filas):
+    # Las filas ya vienen contadas por (carrera, riesgo) desde SQL
+    por_nivel, por_carrera = {}, {}
+    for fila in filas:
+        nivel, total = fila["riesgo"], fila["total"]
+        por_nivel[nivel] = por_nivel.get(nivel, 0) + total
+        carrera = por_carrera.setdefault(fila["carrera"], {"carrera": fila["carrera"], "total": 0, "niveles": {}})
+        carrera["niveles"][nivel] = total
+        carrera["total"] += total
+    return {
+        "total": sum(por_nivel.values()),
+        "por_nivel": por_nivel,
+        "por_carrera": sorted(por_carrera.values(), key=lambda c: (c["carrera"] is None, c["carrera"] or "")),
+    }
 
-    conn = get_connection()
-    query = """
-        SELECT 
-            FORMAT(FechaEvaluacion, 'dd ''de'' MMMM ''de'' yyyy', 'es-ES') AS fecha,
-            NivelRiesgo AS nivel
-        FROM dbo.EvaluacionRiesgo
-        WHERE Run = ?
-        ORDER BY FechaEvaluacion DESC
-    """
-    df_hist = pd.read_sql(query, conn, params=[rut])
-    resultado["historial"] = df_hist.to_dict(orient="records")
-    return resultado
 
 # 📌 Riesgos ya calculados desde la base
+# Última evaluación de cada RUT. Filtros por carrera, anio_ingreso y riesgo;
+# paginación igual que /estudiantes. Con summary=true devuelve solo los
+# conteos por nivel y por carrera, calculados con GROUP BY en la BD.
 @app.get("/riesgos_calculados")
-def riesgos_calculados():
-    conn = get_connection()
-    query = """
-        SELECT
-            er.Run AS rut,
-            er.NombreCompleto AS nombre,
-            er.Carrera AS carrera,
-            er.NivelRiesgo AS riesgo,
-            p.[AÑO DE INGRESO] AS anio_ingreso
-        FROM dbo.EvaluacionRiesgo er
-        LEFT JOIN [PBI_Docencia].[dbo].[PACE2024_ACTUALIZADO] p
-            ON er.Run = p.RUT
-    """
-    df = pd.read_sql(query, conn)
-    return df.to_dict(orient="records")
+async def riesgos_calculados(
+    response: Response,
+    carrera: Optional[str] = None,
+    anio_ingreso: Optional[int] = None,
+    riesgo: Optional[str] = None,
+    columnas: Optional[str] = None,
+    despues_de: Optional[str] = None,
+    por_pagina: Optional[int] = Query(None, ge=1, le=MAX_PAGINA),
+    formato: Literal["json", "ndjson"] = "json",
+    resumen: bool = Query(False, alias="summary"),
+):
+    filtros = {"carrera": carrera, "anio_ingreso": anio_ingreso, "riesgo": riesgo}
+    if resumen:
+        sql, params = LISTADO_RIESGOS.conteo(["carrera", "riesgo"], filtros)
+        async with limite("riesgos_calculados"):
+            return _resumen_riesgos(await leer_filas(sql, params))
+
+    # Sin `columnas` se responden las del listado original (sin la fecha)
+    columnas = columnas or ",".join(COLUMNAS_RIESGOS)
+    sql, params, ocultas = _consulta_listado(LISTADO_RIESGOS, columnas, filtros, despues_de, por_pagina)
+    return await _responder_listado("riesgos_calculados", LISTADO_RIESGOS, response, formato, sql, params,
+                                    por_pagina, ocultas)
 
 # ✅ Nuevo: Riesgo académico por RUT
 @app.get("/riesgo/academico/{rut}")
-def riesgo_academico(rut: str):
-    conn = get_connection()
-    query = """
-        WITH NotasCriticas AS (
-            SELECT 
-                RUT,
-                COUNT(DISTINCT [Denominación Actividad Curricular]) AS RamosReprobados
-            FROM [dbo].[NotasPace2025]
-            CROSS APPLY (
-                SELECT TRY_CAST(REPLACE([Nota_1], ',', '.') AS FLOAT) UNION ALL
-                SELECT TRY_CAST(REPLACE([Nota_2], ',', '.') AS FLOAT) UNION ALL
-                SELECT TRY_CAST(REPLACE([Nota_3], ',', '.') AS FLOAT) UNION ALL
-                SELECT TRY_CAST(REPLACE([Nota_4], ',', '.') AS FLOAT) UNION ALL
-                SELECT TRY_CAST(REPLACE([Nota_5], ',', '.') AS FLOAT) UNION ALL
-                SELECT TRY_CAST(REPLACE([Nota_6], ',', '.') AS FLOAT)
-            ) AS Notas(nota)
-            WHERE nota < 4.0
-            GROUP BY RUT
-        )
-        SELECT RamosReprobados
-        FROM NotasCriticas
-        WHERE RUT = ?
-    """
-    df = pd.read_sql(query, conn, params=[rut])
-    ramos = int(df["RamosReprobados"].iloc[0]) if not df.empty else 0
-
-    puntaje, nivel, motivo = calcular_riesgo_academico(ramos)
+@cache_rut.por_rut("riesgo_academico")
+async def riesgo_academico(rut: str):
+    async with limite("riesgo_academico"):
+        perfil = await con_conexion(cargar_perfil, rut, secciones=("ramos",))
+
+    puntaje, nivel, motivo = calcular_riesgo_academico(perfil.ramos_reprobados)
     return {"puntaje": puntaje, "riesgo": nivel, "motivo": motivo}
 
 # ✅ Nuevo: Riesgo psicológico por RUT
 @app.get("/riesgo/psicologico/{rut}")
-def riesgo_psicologico(rut: str):
-    conn = get_connection()
-    query = """
-        SELECT 
-            [PROMEDIO AUTOEFICACIA ACADÉMICA],
-            [PROMEDIO MODULACIÓN EMOCIONAL],
-            [PROMEDIO AUTODETERMINACIÓN PERSONAL],
-            [PROMEDIO SOCIABILIDAD],
-            [PROMEDIO PROSPECTIVA ACADÉMICA]
-        FROM dbo.[Epaes$]
-        WHERE RUT = ?
-    """
-    df = pd.read_sql(query, conn, params=[rut])
-
-    if df.empty:
+@cache_rut.por_rut("riesgo_psicologico")
+async def riesgo_psicologico(rut: str):
+    async with limite("riesgo_psicologico"):
+        perfil = await con_conexion(cargar_perfil, rut, secciones=("epaes",))
+
+    if perfil.epaes is None:
         raise HTTPException(status_code=404, detail="Estudiante no tiene datos psicológicos")
 
-    row = df.iloc[0]
-    p, nivel, motivos = calcular_riesgo_psicologico(
-        row[0], row[1], row[2], row[3], row[4]
-    )
+    p, nivel, motivos = calcular_riesgo_psicologico(*perfil.epaes)
     return {"puntaje": p, "riesgo": nivel, "motivos": motivos}
 
 # ✅ Nuevo: Riesgo interseccional (se recibe desde frontend)
@@ -156,490 +288,198 @@ def riesgo_interseccional(vulnerabilidades: list):
     puntaje, nivel, detalle = calcular_riesgo_interseccional(vulnerabilidades)
     return {"puntaje": puntaje, "riesgo": nivel, "detalle": detalle}
 
-@app.get("/riesgo/global/{rut}")
-def riesgo_global(rut: str):
-    conn = get_connection()
+# Máximo de RUTs por llamada a /riesgo/global/batch
+MAX_RUTS_BATCH = 5000
 
-    # Obtener riesgo académico
-    query_ramos = """
-        WITH NotasCriticas AS (
-            SELECT 
-                RUT,
-                COUNT(DISTINCT [Denominación Actividad Curricular]) AS RamosReprobados
-            FROM [dbo].[NotasPace2025]
-            CROSS APPLY (
-                SELECT TRY_CAST(REPLACE([Nota_1], ',' , '.') AS FLOAT) UNION ALL
-                SELECT TRY_CAST(REPLACE([Nota_2], ',' , '.') AS FLOAT) UNION ALL
-                SELECT TRY_CAST(REPLACE([Nota_3], ',' , '.') AS FLOAT) UNION ALL
-                SELECT TRY_CAST(REPLACE([Nota_4], ',' , '.') AS FLOAT) UNION ALL
-                SELECT TRY_CAST(REPLACE([Nota_5], ',' , '.') AS FLOAT) UNION ALL
-                SELECT TRY_CAST(REPLACE([Nota_6], ',' , '.') AS FLOAT)
-            ) AS Notas(nota)
-            WHERE nota < 4.0
-            GROUP BY RUT
-        )
-        SELECT RamosReprobados
-        FROM NotasCriticas
-        WHERE RUT = ?
-    """
-    df_ramos = pd.read_sql(query_ramos, conn, params=[rut])
-    ramos = int(df_ramos["RamosReprobados"].iloc[0]) if not df_ramos.empty else 0
-    puntaje_a, nivel_a, motivo_a = calcular_riesgo_academico(ramos)
-
-    # Obtener riesgo psicológico
-    query_psico = """
-       SELECT
-            [PROMEDIO AUTOEFICACIA ACADÉMICA],
-            [PROMEDIO MODULACIÓN EMOCIONAL],
-            [PROMEDIO AUTODETERMINACIÓN PERSONAL],
-            [PROMEDIO SOCIABILIDAD],
-            [PROMEDIO PROSPECTIVA ACADÉMICA]
-        FROM dbo.[Epaes$]
-        WHERE RUT = ?
-    """
-    df_psico = pd.read_sql(query_psico, conn, params=[rut])
-    if df_psico.empty:
-        nivel_p = "Bajo"
-        puntaje_p = 0
-        motivos_p = "Sin datos"
-    else:
-        row = df_psico.iloc[0]
-        puntaje_p, nivel_p, motivos_p = calcular_riesgo_psicologico(
-            row.iloc[0], row.iloc[1], row.iloc[2], row.iloc[3], row.iloc[4]
-        )
-
-    # Riesgo interseccional dinámico
-    query_inter = """
-        SELECT
-            [Género],
-            [¿Eres padre/madre?],
-            [Durante el año, ¿trabajarás para costear tus estudios y gastos p],
-            [(5) ¿Cuentas con alguna beca?],
-            [¿Cuentas con algún crédito universitario?],
-            [¿Hay algún otro miembro de tu núcleo familiar que haya ingresado],
-            [(3) ¿Tienes algún tipo de discapacidad?],
-            [(4) ¿Presentas alguna condición de salud que ha dificultado tus ],
-            [Fecha de nacimiento]
-        FROM [PBI_Docencia].[dbo].[Caracterizacion_Ingreso$]
-        WHERE [Institución] = ?
-    """
-    df_inter = pd.read_sql(query_inter, conn, params=[rut])
-
-    if df_inter.empty:
-        nivel_i = "Bajo"
-        puntaje_i = 0
-        detalle_i = "Sin datos"
-    else:
-        row = df_inter.iloc[0]
-        vulnerabilidades = []
-        vulnerabilidades.append(1 if row['Género'] in ['Masculino', 'Femenino', 'Prefiero no especificar'] else 0)
-        vulnerabilidades.append(1 if row['¿Hay algún otro miembro de tu núcleo familiar que haya ingresado'] == 'No' else 0)
-        vulnerabilidades.append(1 if row['(5) ¿Cuentas con alguna beca?'] == 'Sí' else 0)
-        vulnerabilidades.append(1 if row['(4) ¿Presentas alguna condición de salud que ha dificultado tus '] == 'Sí' else 0)
-        vulnerabilidades.append(1 if row['(3) ¿Tienes algún tipo de discapacidad?'] == 'Sí' else 0)
-
-        # Corregir parseo de fecha en español
-        fecha = pd.to_datetime(row['Fecha de nacimiento'], format='%d %B %Y', dayfirst=True, errors='coerce')
-        if pd.notna(fecha):
-            edad = pd.Timestamp.now().year - fecha.year
-        else:
-            edad = 0
-        vulnerabilidades.append(1 if edad >= 25 else 0)
-
-        vulnerabilidades.append(1 if row['Durante el año, ¿trabajarás para costear tus estudios y gastos p'] == 'Sí' else 0)
-        vulnerabilidades.append(1 if row['¿Eres padre/madre?'] == 'Sí' else 0)
-
-        #nombres legibles para el detalle
-        factores_nombre = [
-            "Identidad de género",
-            "Primera generación",
-            "Nivel socioeconómico",
-            "Salud mental",
-            "Discapacidad",
-            "Edad >= 25",
-            "Trabajador",
-            "Padre/madre"
-        ]
-        factores_activados = [factores_nombre[i] for i, valor in enumerate(vulnerabilidades) if valor == 1]
-        detalle_i = f"Factores activados: {', '.join(factores_activados)}"
-
-        puntaje_i, nivel_i, _ = calcular_riesgo_interseccional(vulnerabilidades)
-
-    # Riesgo global final
-    riesgo_global = combinar_niveles([nivel_a, nivel_p, nivel_i])
-
-    # Obtener nombre completo y carrera desde la tabla PACE2024_ACTUALIZADO
-    query_datos_basicos = """
-        SELECT
-            [NOMBRE COMPLETO] AS NombreCompleto,
-            [Carrera]
-        FROM [PBI_Docencia].[dbo].[PACE2024_ACTUALIZADO]
-        WHERE [RUT] = ?
-    """
-    df_basico = pd.read_sql(query_datos_basicos, conn, params=[rut])
-
-    if df_basico.empty:
-        nombre_completo = "No encontrado"
-        carrera = "No encontrada"
-    else:
-        nombre_completo = df_basico.iloc[0]['NombreCompleto']
-        carrera = df_basico.iloc[0]['Carrera']
-
-    query_recomendaciones = """
-        SELECT Acciones
-        FROM Recomendaciones
-        WHERE TipoRiesgo = ? AND NivelRiesgo = ?
-    """
-    
-    #Recomendaciones para el riesgo psicologico
-    df_recomendacion_psico = pd.read_sql(query_recomendaciones, conn, params=['Psicológico', nivel_p])
-    recomendacion_psico = df_recomendacion_psico.iloc[0]['Acciones'] if not df_recomendacion_psico.empty else "Sin recomendaciones"
-
-    #seccion riesgos academicos
-    df_recomendacion_academica = pd.read_sql(query_recomendaciones, conn, params=['Académico', nivel_a])
-    recomendacion_academica = df_recomendacion_academica.iloc[0]['Acciones'] if not df_recomendacion_academica.empty else "Sin recomendación"
-
-    # Insertar evaluación en la BD (sin actualizar)
-    cursor = conn.cursor()
-    query_insert = """
-    INSERT INTO [dbo].[EvaluacionDeRut]
-        (Run, NombreCompleto, Carrera, NivelRiesgo, NivelRiesgoAcademico, NivelRiesgoPsicologico, NivelRiesgoInterseccional, FechaEvaluacion)
-    VALUES (?, ?, ?, ?, ?, ?, ?, GETDATE());
-    """
-    cursor.execute(query_insert, (
-        rut, nombre_completo, carrera, riesgo_global, nivel_a, nivel_p, nivel_i
-    ))
-    conn.commit()
-
-    #trae info al modal psicologico
-    query_factores_psico = """
-        SELECT esta_recibiendo_apoyo, nombre_profesional, observaciones
-        FROM FactoresPsicologicos
-        WHERE rut_estudiante = ?
-    """
-    df_factores_psico = pd.read_sql(query_factores_psico, conn, params=[rut])
-
-    #por defecto, campos vacios
-    factores_psico_data = {
-        "esta_recibiendo_apoyo": 0,
-        "nombre_profesional": "",
-        "observaciones": ""
-    }
 
-    #si existe registro, actualiza el objeto
-    if not df_factores_psico.empty:
-        row_factores = df_factores_psico.iloc[0]
-        factores_psico_data = {
-            "esta_recibiendo_apoyo": int(row_factores["esta_recibiendo_apoyo"]),
-            "nombre_profesional": row_factores["nombre_profesional"] or "",
-            "observaciones": row_factores["observaciones"] or ""
-        }
-    
-    query_factores_academicos = """
-        SELECT esta_recibiendo_apoyo, nombre_profesional, observaciones
-        FROM FactoresAcademicos
-        WHERE rut_estudiante = ?
-    """
-    df_factores_academicos = pd.read_sql(query_factores_academicos, conn, params=[rut])
-
-    # por defecto, campos vacíos
-    factores_academicos_data = {
-        "esta_recibiendo_apoyo": 0,
-        "nombre_profesional": "",
-        "observaciones": ""
-    }
+def _riesgo_global_lote(conn, ruts):
+    # Datos de todos los RUTs con consultas por conjunto, en tramos
+    perfiles = cargar_perfiles(conn, ruts, SECCIONES_GLOBAL)
+    catalogo_recomendaciones.preparar(conn)
+    resultados = evaluar_riesgo_global_lote([perfiles[rut] for rut in ruts])
+    insertar_evaluaciones(conn, [fila_evaluacion(r) for r in resultados])
+    return resultados
 
-    # si existe registro, actualiza el objeto
-    if not df_factores_academicos.empty:
-        row_academico = df_factores_academicos.iloc[0]
-        factores_academicos_data = {
-            "esta_recibiendo_apoyo": int(row_academico["esta_recibiendo_apoyo"]),
-            "nombre_profesional": row_academico["nombre_profesional"] or "",
-            "observaciones": row_academico["observaciones"] or ""
-        }
 
+def _riesgo_global(conn, rut):
+    # Todos los datos del estudiante en un solo viaje a la BD
+    perfil = cargar_perfil(conn, rut, SECCIONES_GLOBAL)
+    # Las recomendaciones se cargan (si hace falta) con esta misma conexión
+    catalogo_recomendaciones.preparar(conn)
+    return evaluar_riesgo_global(perfil)
+
+
+@app.get("/riesgo/global/{rut}")
+async def riesgo_global(rut: str):
+    async with limite("riesgo_global"):
+        resultado = await con_conexion(_riesgo_global, rut)
+
+    # La evaluación se guarda en segundo plano, en lote con las demás
+    buffer_evaluaciones.agregar(fila_evaluacion(resultado))
+    return resultado
+
+# 📌 Riesgo global de muchos estudiantes a la vez (cohorte del dashboard)
+@app.post("/riesgo/global/batch")
+async def riesgo_global_batch(ruts: list[str]):
+    ruts = list(dict.fromkeys(ruts))
+    if len(ruts) > MAX_RUTS_BATCH:
+        raise HTTPException(status_code=413, detail=f"Máximo {MAX_RUTS_BATCH} RUTs por llamada")
+    if not ruts:
+        return []
+
+    async with limite("riesgo_global_batch"):
+        return await con_conexion(_riesgo_global_lote, ruts)
 
-    # ✅ Retornar resultados
-    return {
-        "rut": rut,
-        "nombre_completo": nombre_completo,
-        "carrera": carrera,
-        "riesgo_global": riesgo_global,
-        "riesgos": {
-            "academico": {
-                 "nivel": nivel_a, 
-                 "puntaje": puntaje_a, 
-                 "motivo": motivo_a,
-                 "recomendacion": recomendacion_academica
-                 },
-            "psicologico": {
-                "nivel": nivel_p, 
-                "puntaje": puntaje_p, 
-                "motivos": motivos_p,
-                "recomendacion": recomendacion_psico
-                },
-            "interseccional": {
-                "nivel": nivel_i, 
-                "puntaje": puntaje_i, 
-                "detalle": detalle_i
-            }
-        },
-        "factores_psicologicos": factores_psico_data,
-        "factores_academicos": factores_academicos_data
-    }
 
 
 
 @app.get("/notas/{rut}")
-def obtener_notas(rut:str):
-    conn = get_connection()
+@cache_rut.por_rut("notas")
+async def obtener_notas(rut:str):
     query = """
             SELECT [Denominación Actividad Curricular], [Nota_1], [Nota_2], [Nota_3],
             [Nota_4], [Nota_5], [Nota_6]
             FROM [dbo].[NotasPace2025]
             WHERE RUT = ?
         """
-    df = pd.read_sql(query, conn, params=[rut])
-    return df.to_dict(orient="records")
+    async with limite("notas"):
+        return await leer_filas(query, [rut])
     
+def _datos_reporte(conn, rut):
+    # 1️⃣ 2️⃣ 3️⃣ Datos generales, última evaluación y notas en un solo lote
+    perfil = cargar_perfil(conn, rut, SECCIONES_REPORTE)
+    if perfil.datos is None:
+        return None
+    catalogo_recomendaciones.preparar(conn)
+    return datos_reporte(perfil)
+
+
 @app.get("/reporte/{rut}")
-def generar_reporte_pdf(rut: str):
-    conn = get_connection()
-
-    # 1️⃣ Datos generales del estudiante
-    query_estudiante = """
-        SELECT [RUT], [NOMBRE COMPLETO], [Carrera], [AÑO DE INGRESO],
-               [Ciudad], [Via de Ingreso], [Estado]
-        FROM dbo.PACE2024_ACTUALIZADO
-        WHERE RUT = ?
-    """
-    df_est = pd.read_sql(query_estudiante, conn, params=[rut])
-    if df_est.empty:
-        return {"error": "Estudiante no encontrado"}
-    estudiante = df_est.iloc[0]
-
-    # 2️⃣ Datos de riesgo global e individuales
-    query_riesgo = """
-        SELECT NivelRiesgo, NivelRiesgoAcademico, NivelRiesgoPsicologico, NivelRiesgoInterseccional
-        FROM dbo.EvaluacionDeRut
-        WHERE Run = ?
-        ORDER BY FechaEvaluacion DESC
-    """
-    df_riesgo = pd.read_sql(query_riesgo, conn, params=[rut])
-    if df_riesgo.empty:
-        nivel_global = "No evaluado"
-        nivel_academico = "No evaluado"
-        nivel_psicologico = "No evaluado"
-        nivel_interseccional = "No evaluado"
-    else:
-        riesgo = df_riesgo.iloc[0]
-        nivel_global = riesgo["NivelRiesgo"]
-        nivel_academico = riesgo["NivelRiesgoAcademico"]
-        nivel_psicologico = riesgo["NivelRiesgoPsicologico"]
-        nivel_interseccional = riesgo["NivelRiesgoInterseccional"]
-
-    # 🔎 Recomendación psicológica
-    query_recomendacion_psico = """
-        SELECT Acciones
-        FROM Recomendaciones
-        WHERE TipoRiesgo = 'Psicológico' AND NivelRiesgo = ?
-    """
-    df_recomendacion_psico = pd.read_sql(query_recomendacion_psico, conn, params=[nivel_psicologico])
-    recomendacion_psico = df_recomendacion_psico.iloc[0]['Acciones'] if not df_recomendacion_psico.empty else "Sin recomendaciones"
-
-    # Recomendacion Académica
-    query_recomendacion_academica = """
-        SELECT Acciones
-        FROM Recomendaciones
-        WHERE TipoRiesgo = 'Académico' AND NivelRiesgo = ?
-    """
-    df_recomendacion_academica = pd.read_sql(query_recomendacion_academica, conn, params=[nivel_academico])
-    recomendacion_academica = df_recomendacion_academica.iloc[0]['Acciones'] if not df_recomendacion_academica.empty else "Sin recomendacion"
-
-    # 3️⃣ Notas del estudiante
-    query_notas = """
-        SELECT [Denominación Actividad Curricular], [Nota_1], [Nota_2], [Nota_3], [Nota_4], [Nota_5], [Nota_6]
-        FROM dbo.NotasPace2025
-        WHERE RUT = ?
-    """
-    df_notas = pd.read_sql(query_notas, conn, params=[rut])
-
-    # 4️⃣ Preparar el HTML con nuevo diseño y recomendaciones
-    html_content = f"""
-    <html>
-    <head>
-    <style>
-        body {{
-            font-family: Arial, sans-serif;
-            color: #333;
-            margin: 40px;
-        }}
-        h1 {{
-            color: #1a73e8;
-            border-bottom: 2px solid #1a73e8;
-            padding-bottom: 5px;
-        }}
-        .section {{
-            margin-top: 20px;
-        }}
-        .section-title {{
-            color: #1a73e8;
-            font-size: 18px;
-            margin-bottom: 10px;
-        }}
-        table {{
-            width: 100%;
-            border-collapse: collapse;
-            margin-top: 10px;
-        }}
-        th, td {{
-            border: 1px solid #ccc;
-            padding: 8px;
-            text-align: left;
-        }}
-        th {{
-            background-color: #f2f2f2;
-        }}
-        .highlight {{
-            font-weight: bold;
-        }}
-        .recomendacion {{
-            background-color: #f0f4f8;
-            border-left: 4px solid #1a73e8;
-            padding: 10px;
-            margin-top: 10px;
-            font-size: 12px;
-        }}
-    </style>
-    </head>
-    <body>
-        <h1>Reporte del Estudiante</h1>
-
-        <div class="section">
-            <div class="section-title">Datos Generales</div>
-            <p><span class="highlight">RUT:</span> {estudiante['RUT']}</p>
-            <p><span class="highlight">Nombre:</span> {estudiante['NOMBRE COMPLETO']}</p>
-            <p><span class="highlight">Carrera:</span> {estudiante['Carrera']}</p>
-            <p><span class="highlight">Año de Ingreso:</span> {estudiante['AÑO DE INGRESO']}</p>
-            <p><span class="highlight">Estado:</span> {estudiante['Estado']}</p>
-        </div>
-
-        <div class="section">
-            <div class="section-title">Niveles de Riesgo</div>
-            <table>
-                <tr><th>Global</th><th>Académico</th><th>Psicológico</th><th>Interseccional</th></tr>
-                <tr>
-                    <td>{nivel_global}</td>
-                    <td>{nivel_academico}</td>
-                    <td>{nivel_psicologico}</td>
-                    <td>{nivel_interseccional}</td>
-                </tr>
-            </table>
-        </div>
-
-        <div class="section">
-            <div class="section-title">Recomendación Psicológica</div>
-            <div class="recomendacion">{recomendacion_psico}</div>
-        </div>
-        <div class="section">
-            <div class="section-title">Recomendación Académica</div>
-            <div class="recomendacion">{recomendacion_academica}</div>
-        </div>
-
-        <div class="section">
-            <div class="section-title">Notas del Estudiante</div>
-            <table>
-                <tr>
-                    <th>Ramo</th>
-                    <th>Nota 1</th>
-                    <th>Nota 2</th>
-                    <th>Nota 3</th>
-                    <th>Nota 4</th>
-                    <th>Nota 5</th>
-                    <th>Nota 6</th>
-                </tr>
-    """
-
-    for idx, row in df_notas.iterrows():
-        html_content += f"""
-            <tr>
-                <td>{row['Denominación Actividad Curricular']}</td>
-                <td>{row['Nota_1']}</td>
-                <td>{row['Nota_2']}</td>
-                <td>{row['Nota_3']}</td>
-                <td>{row['Nota_4']}</td>
-                <td>{row['Nota_5']}</td>
-                <td>{row['Nota_6']}</td>
-            </tr>
-        """
+async def generar_reporte_pdf(rut: str):
+    async with limite("reporte"):
+        datos = await con_conexion(_datos_reporte, rut)
+        if datos is None:
+            return {"error": "Estudiante no encontrado"}
+
+        # 4️⃣ 5️⃣ HTML y PDF en el pool de procesos (o directo del caché)
+        pdf, clave = await generador_reportes.pdf(datos)
+
+    return Response(
+        content=pdf,
+        media_type="application/pdf",
+        headers={"Content-Disposition": f'attachment; filename="reporte_{rut}.pdf"', "ETag": f'"{clave}"'},
+    )
+
+async def _zip_con_limite(exportacion):
+    async with limite("exportar"):
+        async with aclosing(zip_cohorte(exportacion)) as partes:
+            async for parte in partes:
+                yield parte
+
+
+# 📌 Reportes PDF de toda una cohorte en un ZIP que se transmite a medida que
+# se generan. La cabecera X-Exportacion trae el id para consultar el avance.
+@app.get("/reportes/cohorte")
+async def exportar_reportes_cohorte(carrera: Optional[str] = None, anio_ingreso: Optional[int] = None):
+    if carrera is None and anio_ingreso is None:
+        raise HTTPException(status_code=400, detail="Indique carrera y/o anio_ingreso")
+
+    exportacion = registro_exportaciones.nueva(carrera, anio_ingreso)
+    return StreamingResponse(
+        _zip_con_limite(exportacion),
+        media_type="application/zip",
+        headers={
+            "Content-Disposition": f'attachment; filename="{exportacion.nombre_archivo()}"',
+            "X-Exportacion": exportacion.id,
+        },
+    )
+
+# 📌 Avance de una exportación de cohorte
+@app.get("/reportes/cohorte/{id}")
+def estado_exportacion(id: str):
+    exportacion = registro_exportaciones.obtener(id)
+    if exportacion is None:
+        raise HTTPException(status_code=404, detail="Exportación no encontrada")
+    return exportacion.to_dict()
+
+def _respuesta_lote(resultados):
+    conteo = {}
+    for r in resultados:
+        conteo[r["resultado"]] = conteo.get(r["resultado"], 0) + 1
+    return {"resumen": conteo, "resultados": resultados}
+
 
-    html_content += """
-            </table>
-        </div>
-    </body>
-    </html>
-    """
+async def _registrar_lote(tabla, registros):
+    if len(registros) > MAX_REGISTROS_LOTE:
+        raise HTTPException(status_code=413, detail=f"Máximo {MAX_REGISTROS_LOTE} registros por llamada")
+    async with limite("registrar"):
+        resultados = await con_conexion(registrar_factores, tabla, registros)
+    for r in resultados:
+        if r["resultado"] in ("insertado", "actualizado"):
+            cache_rut.invalidar(r["rut"])
+    return _respuesta_lote(resultados)
 
-    # 5️⃣ Generar el PDF
-    with tempfile.NamedTemporaryFile(delete=False, suffix=".pdf") as pdf_file:
-        HTML(string=html_content).write_pdf(pdf_file.name)
 
-    return FileResponse(pdf_file.name, filename=f"reporte_{rut}.pdf", media_type="application/pdf")
+def _validar_factor(data):
+    # Antes de tomar una conexión: nada se escribe si el registro no sirve
+    error = validar_registro(data)
+    if error is not None:
+        raise HTTPException(status_code=422, detail=error)
+
 
 @app.post("/registrar_factores_psicologicos")
 async def registrar_factores_psicologicos(request: Request):
-    data = await request.json()
-    rut = data.get("rut")
-    nivel_riesgo = data.get("nivel_riesgo")
-    esta_apoyo = data.get("esta_apoyo")
-    profesional = data.get("profesional")
-    observaciones = data.get("observaciones")
-
-    conn = get_connection()
-    cursor = conn.cursor()
-
-    #verifica si ya exsite un registro
-    cursor.execute("SELECT COUNT(*) FROM FactoresPsicologicos WHERE rut_estudiante = ?", rut)
-    existe = cursor.fetchone()[0]
-
-    if existe:
-        #actualizar
-        cursor.execute("""
-            UPDATE FactoresPsicologicos
-            SET nivel_riesgo = ?, esta_recibiendo_apoyo = ?, nombre_profesional = ?, observaciones = ?, fecha_registro = GETDATE()
-            WHERE rut_estudiante = ?
-        """, nivel_riesgo, esta_apoyo, profesional, observaciones, rut)
-    else:
-        #insertar
-        cursor.execute("""
-            INSERT INTO FactoresPsicologicos (rut_estudiante, nivel_riesgo, esta_recibiendo_apoyo, nombre_profesional, observaciones)
-            VALUES (?, ?, ?, ?, ?)
-        """, rut, nivel_riesgo, esta_apoyo, profesional, observaciones)
-
-    conn.commit()
-    conn.close()
-
+    try:
+        data = await request.json()
+    except ValueError:
+        raise HTTPException(status_code=422, detail="El cuerpo debe ser JSON")
+    _validar_factor(data)
+    async with limite("registrar"):
+        # MERGE: una sola sentencia, sin la carrera entre el COUNT y el INSERT
+        await con_conexion(registrar_factor, PSICOLOGICOS, data)
+    cache_rut.invalidar(data["rut"])
     return{"mensaje": "✅ Registro actualizado correctamente"}
 
+# 📌 Varios registros psicológicos en una llamada (un MERGE para todos)
+@app.post("/registrar_factores_psicologicos/lote")
+async def registrar_factores_psicologicos_lote(registros: list[dict]):
+    return await _registrar_lote(PSICOLOGICOS, registros)
+
 @app.post("/registrar_factores_academicos/")
-def registrar_factores_academicos(data: dict):
-    conn = get_connection()
-    cursor = conn.cursor()
-    query = """
-        MERGE INTO FactoresAcademicos AS target
-        USING (SELECT ? AS rut_estudiante) AS source
-        ON target.rut_estudiante = source.rut_estudiante
-        WHEN MATCHED THEN
-            UPDATE SET esta_recibiendo_apoyo = ?, nombre_profesional = ?, observaciones = ?, nivel_riesgo = ?
-        WHEN NOT MATCHED THEN
-            INSERT (rut_estudiante, esta_recibiendo_apoyo, nombre_profesional, observaciones, nivel_riesgo)
-            VALUES (?, ?, ?, ?, ?);
-    """
-
-    cursor.execute(query, (
-        data["rut"], data["esta_apoyo"], data["profesional"], data["observaciones"], data["nivel_riesgo"],
-        data["rut"], data["esta_apoyo"], data["profesional"], data["observaciones"], data["nivel_riesgo"]
-    ))
-    conn.commit()
+async def registrar_factores_academicos(data: dict):
+    _validar_factor(data)
+    async with limite("registrar"):
+        await con_conexion(registrar_factor, ACADEMICOS, data)
+    cache_rut.invalidar(data["rut"])
     return{"message": "✅ Apoyo académico registrado correctamente"}
 
+# 📌 Varios registros académicos en una llamada (un MERGE para todos)
+@app.post("/registrar_factores_academicos/lote")
+async def registrar_factores_academicos_lote(registros: list[dict]):
+    return await _registrar_lote(ACADEMICOS, registros)
+
+# 📌 Estado del pool de render y del caché de reportes PDF
+@app.get("/estado/reportes")
+def estado_reportes():
+    return generador_reportes.stats()
+
+# 📌 Aciertos y fallos del caché de respuestas por RUT
+@app.get("/estado/cache")
+def estado_cache():
+    return cache_rut.stats()
+
+# 📌 Evaluaciones pendientes de escribir en EvaluacionDeRut
+@app.get("/estado/evaluaciones")
+def estado_evaluaciones():
+    return buffer_evaluaciones.stats()
+
+# 📌 Estado del pool de conexiones compartido
+@app.get("/db/pool")
+def estado_pool():
+    return get_pool().stats()
+
+# 📌 Forzar recarga del catálogo de recomendaciones (tras editar la tabla)
+@app.post("/recomendaciones/invalidar")
+def invalidar_recomendaciones():
+    catalogo_recomendaciones.invalidar()
+    return {"mensaje": "✅ Catálogo de recomendaciones invalidado"}
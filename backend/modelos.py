@@ -0,0 +1,160 @@
+import hashlib
+import io
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Any, NamedTuple
+
+# Raíz del repositorio: los .pkl ya no dependen del directorio de trabajo
+RAIZ = Path(__file__).resolve().parent.parent
+
+
+class ModeloCargado(NamedTuple):
+    modelo: Any
+    version: str  # primeros 12 caracteres del SHA-256 del .pkl
+    sha256: str
+    ruta: Path
+    cargado_en: float
+
+
+class HashInvalidoError(RuntimeError):
+    """El .pkl no coincide con el hash publicado en su archivo .sha256."""
+
+
+class _Entrada:
+    def __init__(self, ruta):
+        self.ruta = Path(ruta)
+        self.cargado = None
+        self.firma = None  # (mtime_ns, tamaño) del archivo ya cargado
+        self.verificado_en = 0.0
+        self.lock = threading.Lock()
+
+
+class RegistroModelos:
+    """
+    Registro de modelos entrenados (.pkl de joblib).
+
+    - Cada modelo se carga recién la primera vez que se pide.
+    - Se guarda el SHA-256 del archivo como versión; si existe
+      `<archivo>.sha256` el contenido debe coincidir o no se carga.
+    - Cada `intervalo` segundos, al pedir el modelo, se revisa si el archivo
+      cambió en disco; si cambió se carga el nuevo y se reemplaza de una sola
+      asignación. Si el nuevo falla, se sigue usando el anterior.
+    - Con `mmap=True` los arreglos NumPy de los árboles se mapean desde el
+      archivo en vez de copiarse a memoria (compartidos entre workers). Como
+      joblib vuelve a leer el archivo, después de cargar se hashea otra vez y
+      se exige que sea el mismo archivo: si cambió entre medio no se usa.
+    - Con `compilados=True` los bosques se usan como BosqueCompilado
+      (backend/bosque_compilado.py): se lee `<archivo>.npz` si se exportó
+      desde este mismo .pkl; si no, se compila al cargar y se verifica
+      contra predict_proba. Los modelos que no son bosques quedan como están.
+    """
+
+    def __init__(self, intervalo=5.0, mmap=False, compilados=True):
+        self.intervalo = intervalo
+        self.mmap = mmap
+        self.compilados = compilados
+        self._entradas = {}
+
+    def registrar(self, nombre, ruta):
+        self._entradas[nombre] = _Entrada(ruta)
+
+    def obtener(self, nombre) -> ModeloCargado:
+        entrada = self._entradas[nombre]
+        cargado = entrada.cargado
+        if cargado is not None and time.monotonic() - entrada.verificado_en < self.intervalo:
+            return cargado
+        with entrada.lock:
+            if entrada.cargado is None or time.monotonic() - entrada.verificado_en >= self.intervalo:
+                self._verificar(entrada)
+            return entrada.cargado
+
+    def versiones(self):
+        return {
+            nombre: {
+                "version": e.cargado.version if e.cargado else None,
+                "ruta": str(e.ruta),
+                "cargado": e.cargado is not None,
+                "compilado": e.cargado is not None and type(e.cargado.modelo).__name__ == "BosqueCompilado",
+            }
+            for nombre, e in self._entradas.items()
+        }
+
+    def _verificar(self, entrada):
+        entrada.verificado_en = time.monotonic()
+        try:
+            estado = entrada.ruta.stat()
+            firma = (estado.st_mtime_ns, estado.st_size)
+            if firma == entrada.firma:
+                return
+            entrada.cargado = self._cargar(entrada.ruta)
+            entrada.firma = firma
+        except Exception:
+            if entrada.cargado is None:
+                raise
+            # Archivo ausente (p. ej. durante un despliegue), a medio copiar o
+            # con hash inválido: se mantiene el modelo vigente y se vuelve a
+            # intentar en la próxima verificación.
+
+    @staticmethod
+    def _verificar_hash(ruta, contenido):
+        sha256 = hashlib.sha256(contenido).hexdigest()
+        esperado = ruta.with_name(ruta.name + ".sha256")
+        if esperado.exists():
+            publicado = esperado.read_text().split()[0].lower()
+            if publicado != sha256:
+                raise HashInvalidoError(f"{ruta.name}: sha256 {sha256} no coincide con {publicado}")
+        return sha256
+
+    @staticmethod
+    def _identidad(ruta):
+        estado = ruta.stat()
+        return estado.st_ino, estado.st_mtime_ns, estado.st_size
+
+    def _cargar(self, ruta):
+        identidad = self._identidad(ruta)
+        contenido = ruta.read_bytes()
+        sha256 = self._verificar_hash(ruta, contenido)
+
+        if self.compilados:
+            from backend import bosque_compilado
+
+            bosque = bosque_compilado.cargar(bosque_compilado.ruta_compilada(ruta), sha256)
+            if bosque is not None:
+                return ModeloCargado(bosque, sha256[:12], sha256, ruta, time.time())
+
+        import joblib
+
+        if self.mmap:
+            del contenido
+            modelo = joblib.load(ruta, mmap_mode="r")
+            # joblib leyó el archivo de nuevo: debe ser el mismo que se verificó
+            if self._verificar_hash(ruta, ruta.read_bytes()) != sha256 or self._identidad(ruta) != identidad:
+                raise HashInvalidoError(f"{ruta.name} cambió mientras se cargaba")
+        else:
+            # Se carga desde los mismos bytes que se hashearon
+            modelo = joblib.load(io.BytesIO(contenido))
+        if self.compilados:
+            modelo = self._compilar(modelo)
+        return ModeloCargado(modelo, sha256[:12], sha256, ruta, time.time())
+
+    @staticmethod
+    def _compilar(modelo):
+        from backend import bosque_compilado
+
+        try:
+            bosque = bosque_compilado.compilar(modelo)
+            bosque_compilado.verificar(modelo, bosque)
+        except (bosque_compilado.ModeloNoCompilableError, AssertionError):
+            return modelo
+        return bosque
+
+
+registro = RegistroModelos(
+    intervalo=float(os.getenv("MODELOS_INTERVALO_VERIFICACION", "5")),
+    mmap=os.getenv("MODELOS_MMAP", "0") == "1",
+    compilados=os.getenv("MODELOS_COMPILADOS", "1") == "1",
+)
+registro.registrar("riesgo", os.getenv("MODELO_RIESGO_PATH", RAIZ / "modelo_riesgo.pkl"))
+registro.registrar("hibrido", os.getenv("MODELO_HIBRIDO_PATH", RAIZ / "modelo_hibrido.pkl"))
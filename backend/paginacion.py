@@ -0,0 +1,134 @@
+"""
+Listados grandes con proyección de columnas, filtros y paginación por clave.
+
+En vez de OFFSET, cada página pide las filas con clave mayor a la última
+entregada (`despues_de`), así el costo de la página 100 es el mismo que el
+de la primera y no se saltan ni repiten filas si la tabla cambia entre
+llamadas.
+"""
+import json
+from dataclasses import dataclass
+from datetime import datetime
+
+# Filas máximas por página
+MAX_PAGINA = 5000
+
+
+class ColumnaInvalidaError(ValueError):
+    """Se pidió una columna que el listado no expone."""
+
+
+class CursorInvalidoError(ValueError):
+    """El valor de `despues_de` no corresponde a la clave del listado."""
+
+
+@dataclass(frozen=True)
+class Listado:
+    origen: str     # FROM ... (con sus JOIN)
+    columnas: dict  # nombre expuesto -> expresión SQL
+    clave: tuple    # nombres expuestos por los que se pagina (juntos, únicos)
+    filtros: dict   # parámetro -> expresión SQL comparada por igualdad
+
+    def proyeccion(self, pedidas=None):
+        """Columnas a devolver; la clave va siempre para poder seguir paginando."""
+        if not pedidas:
+            return list(self.columnas)
+        invalidas = [c for c in pedidas if c not in self.columnas]
+        if invalidas:
+            raise ColumnaInvalidaError(f"Columnas no disponibles: {', '.join(invalidas)}")
+        return list(dict.fromkeys([*self.clave, *pedidas]))
+
+    def ocultas(self, pedidas=None):
+        """Columnas de la clave que `proyeccion` agrega sin que se pidieran:
+        sirven para armar el cursor y se quitan antes de responder."""
+        if not pedidas:
+            return []
+        return [c for c in self.clave if c not in pedidas]
+
+    def consulta(self, columnas=None, filtros=None, despues_de=None, limite=None):
+        """Retorna (sql, params). Sin `limite` trae todo y sin ordenar."""
+        params = []
+        top = ""
+        if limite is not None:
+            top = "TOP (?) "
+            params.append(limite)
+
+        condiciones, params_where = self._condiciones(filtros)
+        params += params_where
+        if despues_de is not None:
+            condicion, params_cursor = self._despues_de(leer_cursor(self, despues_de))
+            condiciones.append(condicion)
+            params += params_cursor
+
+        seleccion = ", ".join(f"{self.columnas[c]} AS [{c}]" for c in self.proyeccion(columnas))
+        sql = f"SELECT {top}{seleccion} FROM {self.origen}"
+        if condiciones:
+            sql += " WHERE " + " AND ".join(condiciones)
+        if limite is not None:
+            sql += " ORDER BY " + ", ".join(self.columnas[c] for c in self.clave)
+        return sql, params
+
+    def conteo(self, grupos, filtros=None):
+        """COUNT(*) agrupado por las columnas expuestas `grupos`, como [total]."""
+        condiciones, params = self._condiciones(filtros)
+        expresiones = [self.columnas[g] for g in grupos]
+        seleccion = ", ".join(f"{e} AS [{g}]" for g, e in zip(grupos, expresiones))
+        sql = f"SELECT {seleccion}, COUNT(*) AS [total] FROM {self.origen}"
+        if condiciones:
+            sql += " WHERE " + " AND ".join(condiciones)
+        sql += " GROUP BY " + ", ".join(expresiones)
+        return sql, params
+
+    def _condiciones(self, filtros):
+        condiciones, params = [], []
+        for nombre, valor in (filtros or {}).items():
+            if valor is not None:
+                condiciones.append(f"{self.filtros[nombre]} = ?")
+                params.append(valor)
+        return condiciones, params
+
+    def _despues_de(self, valores):
+        # (a, b) > (x, y)  ==  a > x OR (a = x AND b > y)
+        alternativas, params = [], []
+        for i, columna in enumerate(self.clave):
+            iguales = [f"{self.columnas[c]} = ?" for c in self.clave[:i]]
+            alternativas.append("(" + " AND ".join(iguales + [f"{self.columnas[columna]} > ?"]) + ")")
+            params += list(valores[:i]) + [valores[i]]
+        return "(" + " OR ".join(alternativas) + ")", params
+
+
+def _valor_cursor(valor):
+    # DATETIME de SQL Server guarda milisegundos; el texto ISO se convierte solo
+    if isinstance(valor, datetime):
+        return valor.isoformat(timespec="milliseconds")
+    return valor if valor is None or isinstance(valor, (int, float)) else str(valor)
+
+
+def siguiente(listado, filas, limite):
+    """Cursor para la próxima página, o None si esta fue la última.
+    Con clave simple es el valor tal cual; con clave compuesta, un arreglo JSON."""
+    if limite is None or len(filas) < limite:
+        return None
+    ultima = filas[-1]
+    if len(listado.clave) == 1:
+        return str(_valor_cursor(ultima[listado.clave[0]]))
+    return json.dumps([_valor_cursor(ultima[c]) for c in listado.clave], ensure_ascii=False)
+
+
+def leer_cursor(listado, texto):
+    if len(listado.clave) == 1:
+        return [texto]
+    try:
+        valores = json.loads(texto)
+    except ValueError:
+        valores = None
+    if not isinstance(valores, list) or len(valores) != len(listado.clave):
+        raise CursorInvalidoError(f"despues_de debe ser un arreglo JSON con {', '.join(listado.clave)}")
+    return valores
+
+
+def separar_columnas(texto):
+    """Ej.: "RUT,Carrera" -> ["RUT", "Carrera"]."""
+    if not texto:
+        return None
+    return [c.strip() for c in texto.split(",") if c.strip()]
@@ -0,0 +1,235 @@
+from dataclasses import dataclass, field
+from typing import NamedTuple, Optional
+
+
+class Epaes(NamedTuple):
+    autoeficacia: Optional[float]
+    emocional: Optional[float]
+    autodeterminacion: Optional[float]
+    sociabilidad: Optional[float]
+    prospectiva: Optional[float]
+
+
+@dataclass
+class FactoresApoyo:
+    esta_recibiendo_apoyo: int = 0
+    nombre_profesional: str = ""
+    observaciones: str = ""
+
+    def to_dict(self):
+        return {
+            "esta_recibiendo_apoyo": self.esta_recibiendo_apoyo,
+            "nombre_profesional": self.nombre_profesional,
+            "observaciones": self.observaciones,
+        }
+
+
+@dataclass
+class PerfilEstudiante:
+    """Todo lo que los endpoints por RUT necesitan de un estudiante.
+    Solo vienen pobladas las secciones que se pidieron al cargarlo."""
+    rut: str
+    datos: Optional[dict] = None
+    ramos_reprobados: int = 0
+    epaes: Optional[Epaes] = None
+    caracterizacion: Optional[dict] = None
+    factores_psicologicos: FactoresApoyo = field(default_factory=FactoresApoyo)
+    factores_academicos: FactoresApoyo = field(default_factory=FactoresApoyo)
+    ultima_evaluacion: Optional[dict] = None
+    notas: list = field(default_factory=list)
+
+    @property
+    def nombre_completo(self):
+        return self.datos["NOMBRE COMPLETO"] if self.datos else "No encontrado"
+
+    @property
+    def carrera(self):
+        return self.datos["Carrera"] if self.datos else "No encontrada"
+
+
+# Cada sección es un SELECT del lote: (sql con {ruts}, columna con el RUT, parser).
+# El parser recibe solo las filas de un estudiante.
+
+def _filas(cursor):
+    columnas = [c[0] for c in cursor.description]
+    return [dict(zip(columnas, fila)) for fila in cursor.fetchall()]
+
+
+def clave_rut(rut):
+    """Normaliza el RUT para cruzar tablas donde viene como texto, entero o float."""
+    if isinstance(rut, float) and rut.is_integer():
+        rut = int(rut)
+    return str(rut).strip()
+
+
+def _parse_datos(perfil, filas):
+    perfil.datos = filas[0] if filas else None
+
+
+def _parse_ramos(perfil, filas):
+    perfil.ramos_reprobados = int(filas[0]["RamosReprobados"] or 0) if filas else 0
+
+
+def _parse_epaes(perfil, filas):
+    if filas:
+        fila = filas[0]
+        perfil.epaes = Epaes(
+            fila["PROMEDIO AUTOEFICACIA ACADÉMICA"],
+            fila["PROMEDIO MODULACIÓN EMOCIONAL"],
+            fila["PROMEDIO AUTODETERMINACIÓN PERSONAL"],
+            fila["PROMEDIO SOCIABILIDAD"],
+            fila["PROMEDIO PROSPECTIVA ACADÉMICA"],
+        )
+
+
+def _parse_caracterizacion(perfil, filas):
+    perfil.caracterizacion = filas[0] if filas else None
+
+
+def _parse_factores(atributo):
+    def parse(perfil, filas):
+        if filas:
+            fila = filas[0]
+            # La columna admite NULL: se toma como "sin apoyo"
+            setattr(perfil, atributo, FactoresApoyo(
+                esta_recibiendo_apoyo=int(fila["esta_recibiendo_apoyo"] or 0),
+                nombre_profesional=fila["nombre_profesional"] or "",
+                observaciones=fila["observaciones"] or "",
+            ))
+    return parse
+
+
+def _parse_ultima_evaluacion(perfil, filas):
+    if filas:
+        fila = filas[0]
+        perfil.ultima_evaluacion = {
+            "NivelRiesgo": fila["NivelRiesgo"],
+            "NivelRiesgoAcademico": fila["NivelRiesgoAcademico"],
+            "NivelRiesgoPsicologico": fila["NivelRiesgoPsicologico"],
+            "NivelRiesgoInterseccional": fila["NivelRiesgoInterseccional"],
+        }
+
+
+def _parse_notas(perfil, filas):
+    perfil.notas = [
+        {k: v for k, v in fila.items() if k != "RUT"}
+        for fila in filas
+    ]
+
+
+SECCIONES = {
+    "datos": ("""
+        SELECT [RUT], [NOMBRE COMPLETO], [Carrera], [AÑO DE INGRESO],
+               [Ciudad], [Via de Ingreso], [Estado]
+        FROM dbo.PACE2024_ACTUALIZADO
+        WHERE RUT IN ({ruts});
+    """, "RUT", _parse_datos),
+    "ramos": ("""
+        SELECT RUT, RamosReprobados
+        FROM [dbo].[RamosReprobados]
+        WHERE RUT IN ({ruts});
+    """, "RUT", _parse_ramos),
+    "epaes": ("""
+        SELECT
+            RUT,
+            [PROMEDIO AUTOEFICACIA ACADÉMICA],
+            [PROMEDIO MODULACIÓN EMOCIONAL],
+            [PROMEDIO AUTODETERMINACIÓN PERSONAL],
+            [PROMEDIO SOCIABILIDAD],
+            [PROMEDIO PROSPECTIVA ACADÉMICA]
+        FROM dbo.[Epaes$]
+        WHERE RUT IN ({ruts});
+    """, "RUT", _parse_epaes),
+    "caracterizacion": ("""
+        SELECT
+            [Institución],
+            [Género],
+            [¿Eres padre/madre?],
+            [Durante el año, ¿trabajarás para costear tus estudios y gastos p],
+            [(5) ¿Cuentas con alguna beca?],
+            [¿Cuentas con algún crédito universitario?],
+            [¿Hay algún otro miembro de tu núcleo familiar que haya ingresado],
+            [(3) ¿Tienes algún tipo de discapacidad?],
+            [(4) ¿Presentas alguna condición de salud que ha dificultado tus ],
+            [Fecha de nacimiento]
+        FROM dbo.[Caracterizacion_Ingreso$]
+        WHERE [Institución] IN ({ruts});
+    """, "Institución", _parse_caracterizacion),
+    "factores_psicologicos": ("""
+        SELECT rut_estudiante, esta_recibiendo_apoyo, nombre_profesional, observaciones
+        FROM FactoresPsicologicos
+        WHERE rut_estudiante IN ({ruts});
+    """, "rut_estudiante", _parse_factores("factores_psicologicos")),
+    "factores_academicos": ("""
+        SELECT rut_estudiante, esta_recibiendo_apoyo, nombre_profesional, observaciones
+        FROM FactoresAcademicos
+        WHERE rut_estudiante IN ({ruts});
+    """, "rut_estudiante", _parse_factores("factores_academicos")),
+    "ultima_evaluacion": ("""
+        SELECT Run, NivelRiesgo, NivelRiesgoAcademico, NivelRiesgoPsicologico, NivelRiesgoInterseccional
+        FROM (
+            SELECT *, ROW_NUMBER() OVER (PARTITION BY Run ORDER BY FechaEvaluacion DESC) AS rn
+            FROM dbo.EvaluacionDeRut
+            WHERE Run IN ({ruts})
+        ) AS ev
+        WHERE rn = 1;
+    """, "Run", _parse_ultima_evaluacion),
+    "notas": ("""
+        SELECT RUT, [Denominación Actividad Curricular], [Nota_1], [Nota_2], [Nota_3],
+               [Nota_4], [Nota_5], [Nota_6]
+        FROM dbo.NotasPace2025
+        WHERE RUT IN ({ruts});
+    """, "RUT", _parse_notas),
+}
+
+# Secciones que usa cada endpoint
+SECCIONES_GLOBAL = (
+    "datos", "ramos", "epaes", "caracterizacion",
+    "factores_psicologicos", "factores_academicos",
+)
+SECCIONES_REPORTE = ("datos", "ultima_evaluacion", "notas")
+
+# SQL Server acepta hasta 2100 parámetros por lote
+MAX_PARAMETROS = 2000
+
+
+def cargar_perfiles(conn, ruts, secciones=SECCIONES_GLOBAL) -> dict:
+    """
+    Trae las secciones pedidas para varios estudiantes con consultas por
+    conjunto (`IN (...)`), en un solo lote SQL por tramo de RUTs, y recorre
+    los result sets con `nextset()`. Retorna {rut: PerfilEstudiante} con un
+    perfil por cada RUT pedido (vacío si no hay datos).
+    Las recomendaciones no van aquí: salen de backend.recomendaciones.catalogo.
+    """
+    secciones = [s for s in SECCIONES if s in secciones]
+    ruts = list(dict.fromkeys(ruts))
+    perfiles = {rut: PerfilEstudiante(rut=rut) for rut in ruts}
+    por_clave = {clave_rut(rut): perfil for rut, perfil in perfiles.items()}
+
+    tramo = max(1, MAX_PARAMETROS // max(1, len(secciones)))
+    cursor = conn.cursor()
+    for inicio in range(0, len(ruts), tramo):
+        ruts_tramo = ruts[inicio:inicio + tramo]
+        marcadores = ", ".join("?" * len(ruts_tramo))
+        sql = "SET NOCOUNT ON;\n" + "".join(
+            SECCIONES[s][0].format(ruts=marcadores) for s in secciones
+        )
+        cursor.execute(sql, ruts_tramo * len(secciones))
+        for i, seccion in enumerate(secciones):
+            if i > 0:
+                cursor.nextset()
+            _, columna_rut, parser = SECCIONES[seccion]
+            agrupadas = {}
+            for fila in _filas(cursor):
+                agrupadas.setdefault(clave_rut(fila[columna_rut]), []).append(fila)
+            for clave, filas in agrupadas.items():
+                perfil = por_clave.get(clave)
+                if perfil is not None:
+                    parser(perfil, filas)
+    cursor.close()
+    return perfiles
+
+
+def cargar_perfil(conn, rut: str, secciones=SECCIONES_GLOBAL) -> PerfilEstudiante:
+    """Perfil de un solo estudiante: un único viaje al servidor."""
+    return cargar_perfiles(conn, [rut], secciones)[rut]
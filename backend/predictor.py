@@ -1,14 +1,43 @@
-import joblib
-import pandas as pd
+from typing import NamedTuple, Optional
+
+import numpy as np
+
+from backend import consultas
+from backend.bosque_compilado import entrada
 from backend.db import get_connection
+from backend.modelos import registro
 
-# Cargar modelo entrenado
-modelo = joblib.load("modelo_riesgo.pkl")
 
-def predecir_riesgo_por_rut(rut: str):
-    conn = get_connection()
+class FilaNotasEpaes(NamedTuple):
+    nota_1: Optional[float]
+    nota_2: Optional[float]
+    nota_3: Optional[float]
+    nota_4: Optional[float]
+    nota_5: Optional[float]
+    nota_6: Optional[float]
+    autoeficacia: Optional[float]
+    autodeterminacion: Optional[float]
+    emocional: Optional[float]
+    sociabilidad: Optional[float]
+    anticipacion: Optional[float]
+    prospectiva: Optional[float]
+    comunicacion: Optional[float]
+
+
+# Columnas exactamente como durante el entrenamiento
+COLUMNAS_MODELO = [
+    "Nota_1", "Nota_2", "Nota_3", "Nota_4", "Nota_5", "Nota_6",
+    "PROMEDIO AUTOEFICACIA ACADÉMICA",
+    "PROMEDIO AUTODETERMINACIÓN PERSONAL",
+    "PROMEDIO MODULACIÓN EMOCIONAL",
+    "PROMEDIO SOCIABILIDAD",
+    "PROMEDIO ANTICIPACIÓN ANALÍTICA",
+    "PROMEDIO PROSPECTIVA ACADÉMICA",
+    "PROMEDIO COMUNICACIÓN EFECTIVA",
+    "promedio_notas"
+]
 
-    query = f"""
+QUERY_NOTAS_EPAES = """
     SELECT 
         AVG(TRY_CAST(n.Nota_1 AS FLOAT)) AS Nota_1,
         AVG(TRY_CAST(n.Nota_2 AS FLOAT)) AS Nota_2,
@@ -37,40 +66,32 @@ def predecir_riesgo_por_rut(rut: str):
         e.[PROMEDIO ANTICIPACIÓN ANALÍTICA],
         e.[PROMEDIO PROSPECTIVA ACADÉMICA],
         e.[PROMEDIO COMUNICACIÓN EFECTIVA]
-    """
+"""
 
-    df = pd.read_sql(query, conn, params=[rut])
 
-    if df.empty:
-        return None
-
-    # Calcular promedio solo de las notas disponibles
-    nota_cols = ["Nota_1", "Nota_2", "Nota_3", "Nota_4", "Nota_5", "Nota_6"]
-    df["promedio_notas"] = df[nota_cols].apply(lambda row: row.dropna().mean(), axis=1)
+def predecir_riesgo_por_rut(rut: str):
+    with get_connection() as conn:
+        row = consultas.uno(conn, FilaNotasEpaes, QUERY_NOTAS_EPAES, [rut])
 
-    # Reordenar columnas exactamente como durante el entrenamiento
-    columnas_modelo = [
-        "Nota_1", "Nota_2", "Nota_3", "Nota_4", "Nota_5", "Nota_6",
-        "PROMEDIO AUTOEFICACIA ACADÉMICA",
-        "PROMEDIO AUTODETERMINACIÓN PERSONAL",
-        "PROMEDIO MODULACIÓN EMOCIONAL",
-        "PROMEDIO SOCIABILIDAD",
-        "PROMEDIO ANTICIPACIÓN ANALÍTICA",
-        "PROMEDIO PROSPECTIVA ACADÉMICA",
-        "PROMEDIO COMUNICACIÓN EFECTIVA",
-        "promedio_notas"
-    ]
+    if row is None:
+        return None
 
-    df = df[columnas_modelo]  # Asegura que el orden y nombres coincidan
+    # Calcular promedio solo de las notas disponibles (NaN si no hay ninguna)
+    fila = np.array(row, dtype=float)
+    notas = fila[:6]
+    promedio_notas = notas[~np.isnan(notas)].mean() if not np.isnan(notas).all() else np.nan
 
-    # Predecir
-    prob = modelo.predict_proba(df)[0][1]
-    clase = modelo.predict(df)[0]
+    # Predecir (el modelo se carga/recarga desde el registro)
+    modelo, version = registro.obtener("riesgo")[:2]
+    probabilidades = modelo.predict_proba(entrada(modelo, [[*fila, promedio_notas]], COLUMNAS_MODELO))[0]
+    prob = probabilidades[1]
+    clase = modelo.classes_[np.argmax(probabilidades)]
     nivel = "Alto" if prob >= 0.75 else "Medio" if prob >= 0.5 else "Bajo"
 
     return {
         "rut": rut,
         "riesgo": nivel,
         "probabilidad": round(prob, 2),
-        "clase": int(clase)
+        "clase": int(clase),
+        "version_modelo": version
     }
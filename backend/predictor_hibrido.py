@@ -1,47 +1,48 @@
-import pandas as pd
-import pyodbc
-import joblib
 import os
-from dotenv import load_dotenv
+from typing import NamedTuple, Optional
 
-# Cargar variables .env
-load_dotenv()
+from backend import consultas
+from backend.db import get_connection
+from backend.modelos import registro
+from backend.reglas_riesgo import evaluar_heuristico
+from backend.cola_inferencia import ColaInferencia
 
-# Cargar modelo entrenado
-modelo = joblib.load("modelo_hibrido.pkl")
+# Columnas en el mismo orden que durante el entrenamiento
+COLUMNAS_MODELO = [
+    "RamosReprobados",
+    "Autoeficacia",
+    "Emocional",
+    "Autodeterminacion",
+    "Sociabilidad",
+    "Prospectiva",
+    "PuntajeHeuristico"
+]
 
-# Conexión a SQL Server
-def get_connection():
-    return pyodbc.connect(
-        f"DRIVER={{ODBC Driver 17 for SQL Server}};"
-        f"SERVER={os.getenv('DB_SERVER')};"
-        f"DATABASE={os.getenv('DB_NAME')};"
-        f"UID={os.getenv('DB_USER')};"
-        f"PWD={os.getenv('DB_PASSWORD')}"
-    )
+cola = ColaInferencia(
+    lambda: registro.obtener("hibrido")[:2],
+    COLUMNAS_MODELO,
+    ventana_ms=float(os.getenv("HIBRIDO_VENTANA_MS", "2")),
+    max_lote=int(os.getenv("HIBRIDO_MAX_LOTE", "64")),
+)
 
-# Predicción por RUT
-def predecir_riesgo_hibrido(rut):
-    conn = get_connection()
 
-    query = """
-    WITH RamosConNotasCriticas AS (
-        SELECT 
-            RUT,
-            COUNT(DISTINCT [Denominación Actividad Curricular]) AS RamosReprobados
-        FROM [dbo].[NotasPace2025]
-        CROSS APPLY (
-            SELECT 
-                CASE WHEN ISNUMERIC(REPLACE([Nota_1], ',', '.')) = 1 THEN CAST(REPLACE([Nota_1], ',', '.') AS FLOAT) ELSE NULL END UNION ALL
-                SELECT CASE WHEN ISNUMERIC(REPLACE([Nota_2], ',', '.')) = 1 THEN CAST(REPLACE([Nota_2], ',', '.') AS FLOAT) ELSE NULL END UNION ALL
-                SELECT CASE WHEN ISNUMERIC(REPLACE([Nota_3], ',', '.')) = 1 THEN CAST(REPLACE([Nota_3], ',', '.') AS FLOAT) ELSE NULL END UNION ALL
-                SELECT CASE WHEN ISNUMERIC(REPLACE([Nota_4], ',', '.')) = 1 THEN CAST(REPLACE([Nota_4], ',', '.') AS FLOAT) ELSE NULL END UNION ALL
-                SELECT CASE WHEN ISNUMERIC(REPLACE([Nota_5], ',', '.')) = 1 THEN CAST(REPLACE([Nota_5], ',', '.') AS FLOAT) ELSE NULL END UNION ALL
-                SELECT CASE WHEN ISNUMERIC(REPLACE([Nota_6], ',', '.')) = 1 THEN CAST(REPLACE([Nota_6], ',', '.') AS FLOAT) ELSE NULL END
-        ) AS Notas(nota)
-        WHERE nota IS NOT NULL AND nota < 4.0
-        GROUP BY RUT
-    )
+class FilaHibrido(NamedTuple):
+    rut: str
+    nombre_completo: Optional[str]
+    carrera: Optional[str]
+    ramos_reprobados: int
+    autoeficacia: Optional[float]
+    emocional: Optional[float]
+    autodeterminacion: Optional[float]
+    sociabilidad: Optional[float]
+    prospectiva: Optional[float]
+
+    @property
+    def epaes(self):
+        return self[4:9]
+
+
+QUERY_HIBRIDO = """
     SELECT 
         p.RUT,
         p.[NOMBRE COMPLETO],
@@ -53,46 +54,28 @@ def predecir_riesgo_hibrido(rut):
         e.[PROMEDIO SOCIABILIDAD] AS Sociabilidad,
         e.[PROMEDIO PROSPECTIVA ACADÉMICA] AS Prospectiva
     FROM [dbo].[PACE2024_ACTUALIZADO] p
-    LEFT JOIN RamosConNotasCriticas r ON p.RUT = r.RUT
+    LEFT JOIN [dbo].[RamosReprobados] r ON p.RUT = r.RUT
     LEFT JOIN [dbo].[Epaes$] e ON CAST(p.RUT AS VARCHAR) = CAST(e.RUT AS VARCHAR)
     WHERE p.RUT = ?
-    """
+"""
+
 
-    df = pd.read_sql(query, conn, params=[rut])
-    if df.empty:
+# Predicción por RUT
+def predecir_riesgo_hibrido(rut):
+    with get_connection() as conn:
+        row = consultas.uno(conn, FilaHibrido, QUERY_HIBRIDO, [rut])
+    if row is None:
         return None
 
-    row = df.iloc[0]
-    
     # Calcular puntaje heurístico
-    puntaje = 0
-    if row["RamosReprobados"] == 1:
-        puntaje += 1
-    elif row["RamosReprobados"] >= 2:
-        puntaje += 2
-    if pd.notna(row["Autoeficacia"]) and row["Autoeficacia"] < 3.0:
-        puntaje += 1
-    if pd.notna(row["Emocional"]) and row["Emocional"] < 3.0:
-        puntaje += 1
-    if pd.notna(row["Autodeterminacion"]) and row["Autodeterminacion"] < 3.0:
-        puntaje += 1
-    if pd.notna(row["Sociabilidad"]) and row["Sociabilidad"] < 3.0:
-        puntaje += 1
-    if pd.notna(row["Prospectiva"]) and row["Prospectiva"] < 3.0:
-        puntaje += 1
+    puntaje, _, _ = evaluar_heuristico([row.ramos_reprobados], [row.epaes])
+    puntaje = int(puntaje[0])
 
-    X = pd.DataFrame([{
-        "RamosReprobados": row["RamosReprobados"],
-        "Autoeficacia": row["Autoeficacia"],
-        "Emocional": row["Emocional"],
-        "Autodeterminacion": row["Autodeterminacion"],
-        "Sociabilidad": row["Sociabilidad"],
-        "Prospectiva": row["Prospectiva"],
-        "PuntajeHeuristico": puntaje
-    }])
+    # Mismo orden que COLUMNAS_MODELO
+    fila = [row.ramos_reprobados, *row.epaes, puntaje]
 
-    pred = modelo.predict(X)[0]
-    proba = modelo.predict_proba(X)[0]
+    # Se resuelve junto con las demás peticiones concurrentes en un solo predict_proba
+    proba, pred, version = cola.predecir(fila)
 
     riesgo_str = ["Bajo", "Medio", "Alto"][pred]
     probabilidades = {
@@ -103,9 +86,10 @@ def predecir_riesgo_hibrido(rut):
 
     return {
         "rut": rut,
-        "nombre": row["NOMBRE COMPLETO"],
-        "carrera": row["Carrera"],
+        "nombre": row.nombre_completo,
+        "carrera": row.carrera,
         "riesgo": riesgo_str,
         "clase": int(pred),
-        "probabilidades": probabilidades
+        "probabilidades": probabilidades,
+        "version_modelo": version
     }
@@ -0,0 +1,143 @@
+"""
+Ramos reprobados materializados por RUT.
+
+Antes cada consulta recalculaba el CROSS APPLY sobre Nota_1..Nota_6 de toda
+NotasPace2025. Ahora se mantienen dos tablas:
+
+- dbo.RamosReprobadosDetalle: un registro por (RUT, ramo) con alguna nota < 4.0
+- dbo.RamosReprobados: cantidad de ramos reprobados por RUT (sin fila = 0)
+
+Un trigger sobre NotasPace2025 recalcula solo los RUTs tocados por cada
+INSERT/UPDATE/DELETE, venga de donde venga la carga de notas.
+
+Instalación (crea tablas y trigger, y hace la carga inicial):
+    python -m backend.ramos_reprobados --instalar
+Reconstrucción completa (p. ej. si el trigger estuvo deshabilitado):
+    python -m backend.ramos_reprobados --reconstruir
+"""
+import argparse
+
+from backend.db import get_connection
+
+# Notas con coma decimal -> FLOAT; lo no numérico queda en NULL
+NOTAS_EXPANDIDAS = """
+    CROSS APPLY (
+        SELECT TRY_CAST(REPLACE(n.[Nota_1], ',', '.') AS FLOAT) UNION ALL
+        SELECT TRY_CAST(REPLACE(n.[Nota_2], ',', '.') AS FLOAT) UNION ALL
+        SELECT TRY_CAST(REPLACE(n.[Nota_3], ',', '.') AS FLOAT) UNION ALL
+        SELECT TRY_CAST(REPLACE(n.[Nota_4], ',', '.') AS FLOAT) UNION ALL
+        SELECT TRY_CAST(REPLACE(n.[Nota_5], ',', '.') AS FLOAT) UNION ALL
+        SELECT TRY_CAST(REPLACE(n.[Nota_6], ',', '.') AS FLOAT)
+    ) AS Notas(nota)
+"""
+
+# Las tablas heredan los tipos de NotasPace2025 vía SELECT INTO
+SQL_CREAR_TABLAS = """
+IF OBJECT_ID('dbo.RamosReprobadosDetalle') IS NULL
+BEGIN
+    SELECT n.RUT, n.[Denominación Actividad Curricular]
+    INTO dbo.RamosReprobadosDetalle
+    FROM dbo.NotasPace2025 n
+    WHERE 1 = 0;
+    CREATE CLUSTERED INDEX IX_RamosReprobadosDetalle_RUT
+        ON dbo.RamosReprobadosDetalle (RUT);
+END;
+
+IF OBJECT_ID('dbo.RamosReprobados') IS NULL
+BEGIN
+    SELECT n.RUT, CAST(0 AS INT) AS RamosReprobados
+    INTO dbo.RamosReprobados
+    FROM dbo.NotasPace2025 n
+    WHERE 1 = 0;
+    CREATE UNIQUE CLUSTERED INDEX IX_RamosReprobados_RUT
+        ON dbo.RamosReprobados (RUT);
+END;
+"""
+
+# Recalcula los RUTs de #ruts (tabla temporal con una columna RUT)
+SQL_RECALCULAR_RUTS = f"""
+    DELETE d FROM dbo.RamosReprobadosDetalle d
+    WHERE d.RUT IN (SELECT RUT FROM #ruts);
+
+    INSERT INTO dbo.RamosReprobadosDetalle (RUT, [Denominación Actividad Curricular])
+    SELECT DISTINCT n.RUT, n.[Denominación Actividad Curricular]
+    FROM dbo.NotasPace2025 n
+    {NOTAS_EXPANDIDAS}
+    WHERE n.RUT IN (SELECT RUT FROM #ruts)
+      AND n.[Denominación Actividad Curricular] IS NOT NULL
+      AND nota < 4.0;
+
+    DELETE c FROM dbo.RamosReprobados c
+    WHERE c.RUT IN (SELECT RUT FROM #ruts);
+
+    INSERT INTO dbo.RamosReprobados (RUT, RamosReprobados)
+    SELECT d.RUT, COUNT(*)
+    FROM dbo.RamosReprobadosDetalle d
+    WHERE d.RUT IN (SELECT RUT FROM #ruts)
+    GROUP BY d.RUT;
+"""
+
+SQL_TRIGGER = f"""
+CREATE OR ALTER TRIGGER dbo.trg_NotasPace2025_RamosReprobados
+ON dbo.NotasPace2025
+AFTER INSERT, UPDATE, DELETE
+AS
+BEGIN
+    SET NOCOUNT ON;
+
+    SELECT RUT INTO #ruts FROM inserted
+    UNION
+    SELECT RUT FROM deleted;
+
+    {SQL_RECALCULAR_RUTS}
+END;
+"""
+
+SQL_RECONSTRUIR = f"""
+SET NOCOUNT ON;
+
+TRUNCATE TABLE dbo.RamosReprobadosDetalle;
+TRUNCATE TABLE dbo.RamosReprobados;
+
+INSERT INTO dbo.RamosReprobadosDetalle (RUT, [Denominación Actividad Curricular])
+SELECT DISTINCT n.RUT, n.[Denominación Actividad Curricular]
+FROM dbo.NotasPace2025 n
+{NOTAS_EXPANDIDAS}
+WHERE n.[Denominación Actividad Curricular] IS NOT NULL
+  AND nota < 4.0;
+
+INSERT INTO dbo.RamosReprobados (RUT, RamosReprobados)
+SELECT RUT, COUNT(*)
+FROM dbo.RamosReprobadosDetalle
+GROUP BY RUT;
+"""
+
+
+def instalar(conn):
+    cursor = conn.cursor()
+    cursor.execute(SQL_CREAR_TABLAS)
+    # CREATE TRIGGER tiene que ir solo en su propio lote
+    cursor.execute(SQL_TRIGGER)
+    conn.commit()
+    reconstruir(conn)
+
+
+def reconstruir(conn):
+    cursor = conn.cursor()
+    cursor.execute(SQL_RECONSTRUIR)
+    conn.commit()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Mantención de ramos reprobados materializados")
+    accion = parser.add_mutually_exclusive_group(required=True)
+    accion.add_argument("--instalar", action="store_true", help="crea tablas y trigger y hace la carga inicial")
+    accion.add_argument("--reconstruir", action="store_true", help="recalcula todas las filas desde NotasPace2025")
+    args = parser.parse_args()
+
+    with get_connection() as conn:
+        if args.instalar:
+            instalar(conn)
+        else:
+            reconstruir(conn)
+    print("✅ RamosReprobados actualizado")
@@ -0,0 +1,114 @@
+import os
+import threading
+import time
+
+from backend.db import get_connection
+
+
+def _cargar_desde_bd(conn):
+    cursor = conn.cursor()
+    cursor.execute("SELECT TipoRiesgo, NivelRiesgo, Acciones FROM Recomendaciones")
+    filas = cursor.fetchall()
+    cursor.close()
+
+    catalogo = {}
+    for tipo, nivel, acciones in filas:
+        # Igual que antes con iloc[0]: si hay duplicados gana la primera fila
+        catalogo.setdefault((tipo, nivel), acciones)
+    return catalogo
+
+
+class CatalogoRecomendaciones:
+    """
+    Copia en memoria de la tabla Recomendaciones indexada por (tipo, nivel).
+
+    Quien ya tiene una conexión del pool llama `preparar(conn)` antes de
+    consultar: si hace falta cargar (primera vez o tras `invalidar()`) se
+    usa esa misma conexión, nunca se pide otra mientras se tiene una. Pasado
+    `ttl` segundos se sigue respondiendo con la copia vigente mientras un
+    hilo en segundo plano la recarga con su propia conexión.
+    """
+
+    def __init__(self, cargador=_cargar_desde_bd, ttl=600.0):
+        self._cargador = cargador  # cargador(conn) -> {(tipo, nivel): acciones}
+        self.ttl = ttl
+        self._datos = None
+        self._cargado_en = 0.0
+        self._lock = threading.Lock()
+        self._refrescando = False
+        # Sube con cada invalidar(): una recarga iniciada antes no debe
+        # pisar los datos con una copia leída antes del cambio.
+        self._generacion = 0
+        self._generacion_cargada = -1
+
+    def obtener(self, tipo, nivel, defecto):
+        datos = self._datos
+        if datos is None:
+            # Sin preparar(conn) previo: solo fuera de una conexión tomada
+            datos = self._vigente(None)
+        return datos.get((tipo, nivel), defecto)
+
+    def preparar(self, conn):
+        """Deja el catálogo listo para `obtener` cargando con `conn` si hace falta."""
+        self._vigente(conn)
+
+    def precargar(self):
+        """Carga la tabla ya (si aún no se cargó) en el hilo que llama."""
+        self._vigente(None)
+
+    def invalidar(self):
+        """La próxima consulta recarga la tabla; hasta entonces se sirve la copia actual."""
+        with self._lock:
+            self._generacion += 1
+
+    def edad(self):
+        """Segundos desde la última carga exitosa (None si nunca se cargó)."""
+        if self._datos is None:
+            return None
+        return time.monotonic() - self._cargado_en
+
+    def _cargar(self, conn):
+        if conn is not None:
+            return self._cargador(conn)
+        with get_connection() as propia:
+            return self._cargador(propia)
+
+    def _vigente(self, conn):
+        if self._datos is None or self._generacion_cargada != self._generacion:
+            with self._lock:
+                if self._datos is None or self._generacion_cargada != self._generacion:
+                    generacion = self._generacion
+                    self._datos = self._cargar(conn)
+                    self._cargado_en = time.monotonic()
+                    self._generacion_cargada = generacion
+                return self._datos
+        if time.monotonic() - self._cargado_en > self.ttl:
+            self._refrescar_en_segundo_plano()
+        return self._datos
+
+    def _refrescar_en_segundo_plano(self):
+        with self._lock:
+            if self._refrescando:
+                return
+            self._refrescando = True
+            generacion = self._generacion
+        threading.Thread(target=self._refrescar, args=(generacion,), daemon=True).start()
+
+    def _refrescar(self, generacion):
+        try:
+            datos = self._cargar(None)
+        except Exception:
+            # Si la BD falla se sigue sirviendo la copia anterior y se
+            # reintenta cuando vuelva a vencer el TTL.
+            datos = None
+        with self._lock:
+            self._refrescando = False
+            if generacion != self._generacion:
+                return
+            if datos is not None:
+                self._datos = datos
+                self._generacion_cargada = generacion
+            self._cargado_en = time.monotonic()
+
+
+catalogo = CatalogoRecomendaciones(ttl=float(os.getenv("RECOMENDACIONES_TTL", "600")))
@@ -0,0 +1,149 @@
+"""
+Reglas heurísticas de riesgo declaradas una sola vez y evaluadas de forma
+vectorizada con NumPy sobre cohortes completas.
+
+Las funciones `calcular_riesgo_*` de los módulos riesgo_* son envoltorios
+escalares de estas mismas reglas.
+"""
+from dataclasses import dataclass
+
+import numpy as np
+
+NIVELES = np.array(["Bajo", "Medio", "Alto"], dtype=object)
+
+
+@dataclass(frozen=True)
+class Escala:
+    """Puntaje mínimo para llegar a Medio y a Alto."""
+    medio: float
+    alto: float
+
+    def codigos(self, puntaje):
+        """0 = Bajo, 1 = Medio, 2 = Alto."""
+        return np.searchsorted(np.array([self.medio, self.alto]), puntaje, side="right")
+
+
+# --- Reglas ------------------------------------------------------------------
+
+NOTA_REPROBACION = 4.0
+
+# Ramos reprobados: 1 ramo suma 1 punto, 2 o más suman 2
+PUNTOS_UN_RAMO = 1
+PUNTOS_VARIOS_RAMOS = 2
+ESCALA_ACADEMICA = Escala(medio=1, alto=2)
+
+# Cada dimensión Epaes bajo el umbral suma 1 punto (NULL no suma)
+UMBRAL_PSICOLOGICO = 3.0
+REGLAS_PSICOLOGICAS = (
+    ("autoeficacia", "Autoeficacia baja"),
+    ("emocional", "Modulación emocional baja"),
+    ("autodeterminacion", "Autodeterminación baja"),
+    ("sociabilidad", "Sociabilidad baja"),
+    ("prospectiva", "Prospectiva académica baja"),
+)
+ESCALA_PSICOLOGICA = Escala(medio=2, alto=3)
+
+# Heurística combinada (ramos + Epaes) del modelo híbrido
+ESCALA_HEURISTICA = Escala(medio=2, alto=3)
+
+# Interseccional: ponderación por factor, en el orden de FACTORES_NOMBRE
+PONDERACIONES_INTERSECCIONALES = np.array([1, 2, 3, 2, 3, 1, 2, 2])
+ESCALA_INTERSECCIONAL = Escala(medio=5, alto=8)
+
+# Global: cada nivel aporta 1/2/3 puntos y se suman las tres dimensiones
+PUNTOS_POR_NIVEL = {"Bajo": 1, "Medio": 2, "Alto": 3}
+ESCALA_GLOBAL = Escala(medio=5, alto=7)
+
+
+# --- Evaluadores vectorizados -----------------------------------------------
+
+def evaluar_academico(ramos):
+    """ramos: vector de ramos reprobados (NaN cuenta como 0).
+    Retorna (puntaje, codigo_nivel)."""
+    ramos = np.asarray(ramos, dtype=float)
+    puntaje = np.where(
+        ramos >= 2, PUNTOS_VARIOS_RAMOS, np.where(ramos == 1, PUNTOS_UN_RAMO, 0)
+    )
+    return puntaje, ESCALA_ACADEMICA.codigos(puntaje)
+
+
+def evaluar_psicologico(epaes):
+    """epaes: matriz (n, 5) en el orden de REGLAS_PSICOLOGICAS, NaN = sin dato.
+    Retorna (puntaje, codigo_nivel, mascara de reglas activadas)."""
+    epaes = np.asarray(epaes, dtype=float).reshape(-1, len(REGLAS_PSICOLOGICAS))
+    mascara = epaes < UMBRAL_PSICOLOGICO  # NaN < x es False
+    puntaje = mascara.sum(axis=1)
+    return puntaje, ESCALA_PSICOLOGICA.codigos(puntaje), mascara
+
+
+def evaluar_heuristico(ramos, epaes):
+    """Puntaje combinado ramos + Epaes.
+    Retorna (puntaje, codigo_nivel, mascara psicológica)."""
+    puntaje_a, _ = evaluar_academico(ramos)
+    puntaje_p, _, mascara = evaluar_psicologico(epaes)
+    puntaje = puntaje_a + puntaje_p
+    return puntaje, ESCALA_HEURISTICA.codigos(puntaje), mascara
+
+
+def evaluar_interseccional(vulnerabilidades):
+    """vulnerabilidades: matriz (n, 8) de 0/1.
+    Retorna (puntaje, codigo_nivel)."""
+    vulnerabilidades = np.asarray(vulnerabilidades).reshape(-1, len(PONDERACIONES_INTERSECCIONALES))
+    puntaje = vulnerabilidades @ PONDERACIONES_INTERSECCIONALES
+    return puntaje, ESCALA_INTERSECCIONAL.codigos(puntaje)
+
+
+def evaluar_global(*codigos):
+    """Combina códigos de nivel (0/1/2) de varias dimensiones.
+    Retorna codigo_nivel global."""
+    puntaje = sum(np.asarray(c) + 1 for c in codigos)
+    return ESCALA_GLOBAL.codigos(puntaje)
+
+
+# --- Textos ------------------------------------------------------------------
+
+def niveles(codigos):
+    return NIVELES[np.asarray(codigos)]
+
+
+def _tabla_motivos():
+    # Un texto por cada combinación de reglas (2^5 = 32), indexado por bits
+    tabla = []
+    for bits in range(2 ** len(REGLAS_PSICOLOGICAS)):
+        tabla.append(", ".join(
+            texto for i, (_, texto) in enumerate(REGLAS_PSICOLOGICAS) if bits & (1 << i)
+        ))
+    return np.array(tabla, dtype=object)
+
+
+_MOTIVOS_PSICOLOGICOS = _tabla_motivos()
+_PESOS_BITS = 1 << np.arange(len(REGLAS_PSICOLOGICAS))
+
+
+def motivos_psicologicos(mascara):
+    return _MOTIVOS_PSICOLOGICOS[np.asarray(mascara) @ _PESOS_BITS]
+
+
+def motivo_academico(ramos):
+    if ramos == 1:
+        return f"1 ramo con nota menor a {NOTA_REPROBACION}"
+    if ramos >= 2:
+        return f"{ramos} ramos con nota menor a {NOTA_REPROBACION}"
+    return ""
+
+
+def motivos_academicos(ramos):
+    ramos = np.asarray(ramos, dtype=float)
+    motivos = np.full(ramos.shape, "", dtype=object)
+    motivos[ramos == 1] = motivo_academico(1)
+    varios = ramos >= 2
+    motivos[varios] = [motivo_academico(int(r)) for r in ramos[varios]]
+    return motivos
+
+
+def motivos_heuristicos(ramos, mascara):
+    """Motivos académicos y psicológicos unidos con ", " (como evaluar_riesgo)."""
+    academicos = motivos_academicos(ramos)
+    psicologicos = motivos_psicologicos(mascara)
+    separador = np.where((academicos != "") & (psicologicos != ""), ", ", "").astype(object)
+    return academicos + separador + psicologicos
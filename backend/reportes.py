@@ -0,0 +1,339 @@
+"""
+Reportes PDF por estudiante.
+
+WeasyPrint ocupa cientos de ms de CPU por reporte y retiene el GIL, así que
+el render corre en un pool de procesos y el PDF vuelve como bytes, sin
+archivos temporales. Cada PDF queda en un caché indexado por el SHA-256 de
+los datos que lo generan (estudiante, niveles, recomendaciones y notas): si
+nada cambió, se sirve el mismo PDF sin volver a renderizar.
+"""
+import asyncio
+import hashlib
+import json
+import multiprocessing
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from backend.recomendaciones import catalogo as catalogo_recomendaciones
+
+CAMPOS_ESTUDIANTE = ("RUT", "NOMBRE COMPLETO", "Carrera", "AÑO DE INGRESO", "Estado")
+CAMPOS_NOTAS = ("Denominación Actividad Curricular", "Nota_1", "Nota_2", "Nota_3", "Nota_4", "Nota_5", "Nota_6")
+
+
+def datos_reporte(perfil):
+    """Todo lo que se imprime en el reporte, y nada más (es lo que se hashea).
+    `perfil` debe venir cargado con SECCIONES_REPORTE."""
+    estudiante = {c: perfil.datos[c] for c in CAMPOS_ESTUDIANTE}
+
+    if perfil.ultima_evaluacion is None:
+        niveles = dict.fromkeys(("global", "academico", "psicologico", "interseccional"), "No evaluado")
+    else:
+        riesgo = perfil.ultima_evaluacion
+        niveles = {
+            "global": riesgo["NivelRiesgo"],
+            "academico": riesgo["NivelRiesgoAcademico"],
+            "psicologico": riesgo["NivelRiesgoPsicologico"],
+            "interseccional": riesgo["NivelRiesgoInterseccional"],
+        }
+
+    # 🔎 Recomendaciones psicológica y académica
+    recomendaciones = {
+        "psicologica": catalogo_recomendaciones.obtener("Psicológico", niveles["psicologico"], "Sin recomendaciones"),
+        "academica": catalogo_recomendaciones.obtener("Académico", niveles["academico"], "Sin recomendacion"),
+    }
+
+    # Notas por columna: {"Nota_1": [...], ...}
+    notas = {c: [fila[c] for fila in perfil.notas] for c in CAMPOS_NOTAS}
+    return {"estudiante": estudiante, "niveles": niveles, "recomendaciones": recomendaciones, "notas": notas}
+
+
+def clave_reporte(datos):
+    contenido = json.dumps(datos, sort_keys=True, default=str, ensure_ascii=False)
+    return hashlib.sha256(contenido.encode("utf-8")).hexdigest()
+
+
+# Hoja de estilos del reporte: WeasyPrint la parsea una vez por proceso
+CSS_REPORTE = """
+body {
+    font-family: Arial, sans-serif;
+    color: #333;
+    margin: 40px;
+}
+h1 {
+    color: #1a73e8;
+    border-bottom: 2px solid #1a73e8;
+    padding-bottom: 5px;
+}
+.section {
+    margin-top: 20px;
+}
+.section-title {
+    color: #1a73e8;
+    font-size: 18px;
+    margin-bottom: 10px;
+}
+table {
+    width: 100%;
+    border-collapse: collapse;
+    margin-top: 10px;
+}
+th, td {
+    border: 1px solid #ccc;
+    padding: 8px;
+    text-align: left;
+}
+th {
+    background-color: #f2f2f2;
+}
+.highlight {
+    font-weight: bold;
+}
+.recomendacion {
+    background-color: #f0f4f8;
+    border-left: 4px solid #1a73e8;
+    padding: 10px;
+    margin-top: 10px;
+    font-size: 12px;
+}
+"""
+
+PLANTILLA_REPORTE = """
+<html>
+<body>
+    <h1>Reporte del Estudiante</h1>
+
+    <div class="section">
+        <div class="section-title">Datos Generales</div>
+        <p><span class="highlight">RUT:</span> {{ estudiante['RUT'] }}</p>
+        <p><span class="highlight">Nombre:</span> {{ estudiante['NOMBRE COMPLETO'] }}</p>
+        <p><span class="highlight">Carrera:</span> {{ estudiante['Carrera'] }}</p>
+        <p><span class="highlight">Año de Ingreso:</span> {{ estudiante['AÑO DE INGRESO'] }}</p>
+        <p><span class="highlight">Estado:</span> {{ estudiante['Estado'] }}</p>
+    </div>
+
+    <div class="section">
+        <div class="section-title">Niveles de Riesgo</div>
+        <table>
+            <tr><th>Global</th><th>Académico</th><th>Psicológico</th><th>Interseccional</th></tr>
+            <tr>
+                <td>{{ niveles.global }}</td>
+                <td>{{ niveles.academico }}</td>
+                <td>{{ niveles.psicologico }}</td>
+                <td>{{ niveles.interseccional }}</td>
+            </tr>
+        </table>
+    </div>
+
+    <div class="section">
+        <div class="section-title">Recomendación Psicológica</div>
+        <div class="recomendacion">{{ recomendaciones.psicologica }}</div>
+    </div>
+    <div class="section">
+        <div class="section-title">Recomendación Académica</div>
+        <div class="recomendacion">{{ recomendaciones.academica }}</div>
+    </div>
+
+    <div class="section">
+        <div class="section-title">Notas del Estudiante</div>
+        <table>
+            <tr>
+                <th>Ramo</th>
+                <th>Nota 1</th>
+                <th>Nota 2</th>
+                <th>Nota 3</th>
+                <th>Nota 4</th>
+                <th>Nota 5</th>
+                <th>Nota 6</th>
+            </tr>
+            {%- for ramo, n1, n2, n3, n4, n5, n6 in notas %}
+            <tr><td>{{ ramo }}</td><td>{{ n1 }}</td><td>{{ n2 }}</td><td>{{ n3 }}</td><td>{{ n4 }}</td><td>{{ n5 }}</td><td>{{ n6 }}</td></tr>
+            {%- endfor %}
+        </table>
+    </div>
+</body>
+</html>
+"""
+
+# Compilados una sola vez por proceso (el servidor y cada hijo del pool)
+_plantilla = None
+_estilos = None
+
+
+def _get_plantilla():
+    global _plantilla
+    if _plantilla is None:
+        from jinja2 import Environment
+
+        _plantilla = Environment(autoescape=True).from_string(PLANTILLA_REPORTE)
+    return _plantilla
+
+
+def _get_estilos():
+    """(hoja de estilos, configuración de fuentes) de WeasyPrint."""
+    global _estilos
+    if _estilos is None:
+        from weasyprint import CSS
+        from weasyprint.text.fonts import FontConfiguration
+
+        fuentes = FontConfiguration()
+        _estilos = (CSS(string=CSS_REPORTE, font_config=fuentes), fuentes)
+    return _estilos
+
+
+def armar_html(datos):
+    """HTML del reporte (sin estilos: van aparte en CSS_REPORTE).
+    Las notas vienen por columnas y se recorren como filas con zip."""
+    return _get_plantilla().render(
+        estudiante=datos["estudiante"],
+        niveles=datos["niveles"],
+        recomendaciones=datos["recomendaciones"],
+        notas=zip(*(datos["notas"][c] for c in CAMPOS_NOTAS)),
+    )
+
+
+def precalentar_proceso():
+    """Corre en cada hijo al arrancar: compila la plantilla y carga WeasyPrint
+    con sus estilos y fuentes, para que el primer reporte no lo pague."""
+    _get_plantilla()
+    _get_estilos()
+
+
+def renderizar_pdf(datos):
+    """Corre en el proceso hijo: arma el HTML y retorna el PDF como bytes."""
+    from weasyprint import HTML
+
+    estilos, fuentes = _get_estilos()
+    return HTML(string=armar_html(datos)).write_pdf(stylesheets=[estilos], font_config=fuentes)
+
+
+class CacheReportes:
+    """LRU de PDFs acotado por tamaño total en bytes."""
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self._pdfs = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.aciertos = 0
+        self.fallos = 0
+
+    def obtener(self, clave):
+        with self._lock:
+            pdf = self._pdfs.get(clave)
+            if pdf is None:
+                self.fallos += 1
+                return None
+            self._pdfs.move_to_end(clave)
+            self.aciertos += 1
+            return pdf
+
+    def guardar(self, clave, pdf):
+        if len(pdf) > self.max_bytes:
+            return
+        with self._lock:
+            anterior = self._pdfs.pop(clave, None)
+            if anterior is not None:
+                self._bytes -= len(anterior)
+            self._pdfs[clave] = pdf
+            self._bytes += len(pdf)
+            while self._bytes > self.max_bytes:
+                _, descartado = self._pdfs.popitem(last=False)
+                self._bytes -= len(descartado)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "reportes": len(self._pdfs),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "aciertos": self.aciertos,
+                "fallos": self.fallos,
+            }
+
+
+class GeneradorReportes:
+    """
+    Renderiza en un pool de procesos (creado al primer uso) y guarda el
+    resultado en el caché. Si llegan varios pedidos del mismo reporte
+    mientras se renderiza, todos esperan el mismo render.
+    """
+
+    def __init__(self, procesos=2, cache_bytes=64 * 1024 * 1024):
+        self.procesos = procesos
+        self.cache = CacheReportes(cache_bytes)
+        self._pool = None
+        self._lock = threading.Lock()
+        self._en_curso = {}
+
+    async def pdf(self, datos, guardar=True):
+        """Retorna (pdf, clave). La clave sirve como ETag.
+        Con `guardar=False` se usa el caché pero no se llena (exportaciones
+        masivas, para no desplazar los reportes consultados a diario)."""
+        clave = clave_reporte(datos)
+        pdf = self.cache.obtener(clave)
+        if pdf is not None:
+            return pdf, clave
+
+        pendiente = self._en_curso.get(clave)
+        if pendiente is None:
+            pendiente = asyncio.ensure_future(self._renderizar(clave, datos, guardar))
+            self._en_curso[clave] = pendiente
+            pendiente.add_done_callback(lambda _: self._en_curso.pop(clave, None))
+        return await asyncio.shield(pendiente), clave
+
+    async def _renderizar(self, clave, datos, guardar):
+        loop = asyncio.get_running_loop()
+        try:
+            pdf = await loop.run_in_executor(self._get_pool(), renderizar_pdf, datos)
+        except BrokenProcessPool:
+            # Un hijo murió (p. ej. por memoria): el próximo pedido crea un pool nuevo
+            self._descartar_pool()
+            raise
+        if guardar:
+            self.cache.guardar(clave, pdf)
+        return pdf
+
+    def precalentar(self):
+        """Crea el pool y precalienta cada proceso. Bloquea hasta que terminan;
+        si WeasyPrint no carga, lanza el error (se reintenta al primer reporte)."""
+        pool = self._get_pool()
+        tareas = [pool.submit(precalentar_proceso) for _ in range(self.procesos)]
+        try:
+            for tarea in tareas:
+                tarea.result()
+        except BrokenProcessPool:
+            self._descartar_pool()
+            raise
+
+    def _get_pool(self):
+        if self._pool is None:
+            with self._lock:
+                if self._pool is None:
+                    # spawn: los hijos no heredan los hilos ni las conexiones del servidor
+                    contexto = multiprocessing.get_context("spawn")
+                    self._pool = ProcessPoolExecutor(max_workers=self.procesos, mp_context=contexto)
+        return self._pool
+
+    def _descartar_pool(self):
+        with self._lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=False, cancel_futures=True)
+
+    def stats(self):
+        return {"procesos": self.procesos, "en_curso": len(self._en_curso), **self.cache.stats()}
+
+    def cerrar(self):
+        with self._lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=True, cancel_futures=True)
+
+
+generador = GeneradorReportes(
+    procesos=int(os.getenv("REPORTES_PROCESOS", min(4, os.cpu_count() or 1))),
+    cache_bytes=int(float(os.getenv("REPORTES_CACHE_MB", "64")) * 1024 * 1024),
+)
@@ -1,15 +1,95 @@
+import numpy as np
+
+from backend.recomendaciones import catalogo
+from backend.reglas_riesgo import (
+    ESCALA_GLOBAL,
+    NIVELES,
+    PUNTOS_POR_NIVEL,
+    REGLAS_PSICOLOGICAS,
+    PONDERACIONES_INTERSECCIONALES,
+    evaluar_academico,
+    evaluar_global,
+    evaluar_interseccional,
+    evaluar_psicologico,
+    motivo_academico,
+    motivos_psicologicos,
+)
+from backend.riesgo_interseccional import vulnerabilidades_desde_caracterizacion
+
+
 def combinar_niveles(riesgos: list[str]) -> str:
-    puntaje_total = 0
-    for r in riesgos:
-        puntaje_total += {
-            "Bajo": 1,
-            "Medio": 2,
-            "Alto": 3
-        }.get(r, 0)
-
-    if puntaje_total <= 4:
-        return "Bajo"
-    elif puntaje_total <= 6:
-        return "Medio"
-    else:
-        return "Alto"
+    puntaje_total = sum(PUNTOS_POR_NIVEL.get(r, 0) for r in riesgos)
+    return NIVELES[ESCALA_GLOBAL.codigos(puntaje_total)]
+
+
+def evaluar_riesgo_global_lote(perfiles):
+    """
+    Calcula los tres riesgos y el global de varios PerfilEstudiante (cargados
+    con SECCIONES_GLOBAL) en una sola pasada vectorizada y arma, para cada
+    uno, la respuesta de /riesgo/global/{rut}.
+    """
+    n = len(perfiles)
+    sin_dato = [float("nan")] * len(REGLAS_PSICOLOGICAS)
+
+    # Riesgo académico
+    ramos = np.array([p.ramos_reprobados for p in perfiles], dtype=float)
+    puntaje_a, codigo_a = evaluar_academico(ramos)
+
+    # Riesgo psicológico (sin Epaes: todas las reglas en NaN → 0 puntos, Bajo)
+    epaes = np.array([
+        [float("nan") if v is None else v for v in p.epaes] if p.epaes is not None else sin_dato
+        for p in perfiles
+    ], dtype=float).reshape(n, len(REGLAS_PSICOLOGICAS))
+    puntaje_p, codigo_p, mascara_p = evaluar_psicologico(epaes)
+    motivos_p = motivos_psicologicos(mascara_p)
+
+    # Riesgo interseccional dinámico (sin caracterización: vector en 0 → Bajo)
+    vulnerabilidades = np.zeros((n, len(PONDERACIONES_INTERSECCIONALES)), dtype=int)
+    detalles_i = []
+    for i, perfil in enumerate(perfiles):
+        if perfil.caracterizacion is None:
+            detalles_i.append("Sin datos")
+        else:
+            vulnerabilidades[i], detalle = vulnerabilidades_desde_caracterizacion(perfil.caracterizacion)
+            detalles_i.append(detalle)
+    puntaje_i, codigo_i = evaluar_interseccional(vulnerabilidades)
+
+    codigo_global = evaluar_global(codigo_a, codigo_p, codigo_i)
+
+    resultados = []
+    for i, perfil in enumerate(perfiles):
+        nivel_a = NIVELES[codigo_a[i]]
+        nivel_p = NIVELES[codigo_p[i]]
+        resultados.append({
+            "rut": perfil.rut,
+            "nombre_completo": perfil.nombre_completo,
+            "carrera": perfil.carrera,
+            "riesgo_global": NIVELES[codigo_global[i]],
+            "riesgos": {
+                "academico": {
+                    "nivel": nivel_a,
+                    "puntaje": int(puntaje_a[i]),
+                    "motivo": motivo_academico(perfil.ramos_reprobados),
+                    "recomendacion": catalogo.obtener("Académico", nivel_a, "Sin recomendación")
+                },
+                "psicologico": {
+                    "nivel": nivel_p,
+                    "puntaje": int(puntaje_p[i]),
+                    "motivos": motivos_p[i] if perfil.epaes is not None else "Sin datos",
+                    "recomendacion": catalogo.obtener("Psicológico", nivel_p, "Sin recomendaciones")
+                },
+                "interseccional": {
+                    "nivel": NIVELES[codigo_i[i]],
+                    "puntaje": int(puntaje_i[i]),
+                    "detalle": detalles_i[i]
+                }
+            },
+            "factores_psicologicos": perfil.factores_psicologicos.to_dict(),
+            "factores_academicos": perfil.factores_academicos.to_dict()
+        })
+    return resultados
+
+
+def evaluar_riesgo_global(perfil):
+    """Respuesta de /riesgo/global/{rut} para un solo PerfilEstudiante."""
+    return evaluar_riesgo_global_lote([perfil])[0]
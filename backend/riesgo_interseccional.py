@@ -1,3 +1,6 @@
+from backend.reglas_riesgo import evaluar_interseccional, NIVELES, PONDERACIONES_INTERSECCIONALES
+
+
 def calcular_riesgo_interseccional(vulnerabilidades: list[int]):
     """
     Calcula el riesgo dado un listado de factores
@@ -12,21 +15,57 @@ def calcular_riesgo_interseccional(vulnerabilidades: list[int]):
     6: Trabajador (2)
     7: Padre/madre (2)
     """
-    ponderaciones = [1, 2, 3, 2, 3, 1, 2, 2]
-    puntaje = sum(v * p for v, p in zip(vulnerabilidades, ponderaciones))
-
-    #Nivel de riesgo
-
-    if puntaje >= 8:
-        nivel= "Alto"
-    elif puntaje >= 5:
-        nivel = "Medio"
-    else:
-        nivel = "Bajo"
+    # Igual que zip(): solo cuentan las primeras 8 posiciones; si faltan, valen 0
+    n = len(PONDERACIONES_INTERSECCIONALES)
+    fila = list(vulnerabilidades[:n]) + [0] * (n - len(vulnerabilidades[:n]))
+    puntaje, codigo = evaluar_interseccional([fila])
 
-    
     # Detalle (opcional: lista de qué factores aportaron)
     factores_activados = [i for i, v in enumerate(vulnerabilidades) if v == 1]
     detalle = f"Factores activados: {factores_activados}"
 
-    return puntaje, nivel, detalle
\ No newline at end of file
+    return puntaje[0].item(), NIVELES[codigo[0]], detalle
+
+
+FACTORES_NOMBRE = [
+    "Identidad de género",
+    "Primera generación",
+    "Nivel socioeconómico",
+    "Salud mental",
+    "Discapacidad",
+    "Edad >= 25",
+    "Trabajador",
+    "Padre/madre"
+]
+
+
+def vulnerabilidades_desde_caracterizacion(row):
+    """
+    Arma el vector de vulnerabilidades (mismo orden que las ponderaciones)
+    a partir de una fila de Caracterizacion_Ingreso$.
+    Retorna (vulnerabilidades, detalle legible).
+    """
+    import pandas as pd
+
+    vulnerabilidades = []
+    vulnerabilidades.append(1 if row['Género'] in ['Masculino', 'Femenino', 'Prefiero no especificar'] else 0)
+    vulnerabilidades.append(1 if row['¿Hay algún otro miembro de tu núcleo familiar que haya ingresado'] == 'No' else 0)
+    vulnerabilidades.append(1 if row['(5) ¿Cuentas con alguna beca?'] == 'Sí' else 0)
+    vulnerabilidades.append(1 if row['(4) ¿Presentas alguna condición de salud que ha dificultado tus '] == 'Sí' else 0)
+    vulnerabilidades.append(1 if row['(3) ¿Tienes algún tipo de discapacidad?'] == 'Sí' else 0)
+
+    # Corregir parseo de fecha en español
+    fecha = pd.to_datetime(row['Fecha de nacimiento'], format='%d %B %Y', dayfirst=True, errors='coerce')
+    if pd.notna(fecha):
+        edad = pd.Timestamp.now().year - fecha.year
+    else:
+        edad = 0
+    vulnerabilidades.append(1 if edad >= 25 else 0)
+
+    vulnerabilidades.append(1 if row['Durante el año, ¿trabajarás para costear tus estudios y gastos p'] == 'Sí' else 0)
+    vulnerabilidades.append(1 if row['¿Eres padre/madre?'] == 'Sí' else 0)
+
+    factores_activados = [FACTORES_NOMBRE[i] for i, valor in enumerate(vulnerabilidades) if valor == 1]
+    detalle = f"Factores activados: {', '.join(factores_activados)}"
+
+    return vulnerabilidades, detalle
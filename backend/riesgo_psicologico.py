@@ -1,22 +1,9 @@
-def calcular_riesgo_psicologico(autoeficacia, emocional, autodeterminacion, sociabilidad, prospectiva):
-    puntaje = 0
-    motivos = []
+from backend.reglas_riesgo import evaluar_psicologico, motivos_psicologicos, NIVELES
 
-    if autoeficacia is not None and autoeficacia < 3.0:
-        puntaje += 1
-        motivos.append("Autoeficacia baja")
-    if emocional is not None and emocional < 3.0:
-        puntaje += 1
-        motivos.append("Modulación emocional baja")
-    if autodeterminacion is not None and autodeterminacion < 3.0:
-        puntaje += 1
-        motivos.append("Autodeterminación baja")
-    if sociabilidad is not None and sociabilidad < 3.0:
-        puntaje += 1
-        motivos.append("Sociabilidad baja")
-    if prospectiva is not None and prospectiva < 3.0:
-        puntaje += 1
-        motivos.append("Prospectiva académica baja")
 
-    nivel = "Bajo" if puntaje <= 1 else "Medio" if puntaje == 2 else "Alto"
-    return puntaje, nivel, ", ".join(motivos)
+def calcular_riesgo_psicologico(autoeficacia, emocional, autodeterminacion, sociabilidad, prospectiva):
+    valores = [autoeficacia, emocional, autodeterminacion, sociabilidad, prospectiva]
+    # None (NULL en la BD) no suma puntos
+    fila = [float("nan") if v is None else v for v in valores]
+    puntaje, codigo, mascara = evaluar_psicologico([fila])
+    return int(puntaje[0]), NIVELES[codigo[0]], motivos_psicologicos(mascara)[0]
@@ -0,0 +1,181 @@
+"""
+Arranque en frío de backend.main, con presupuesto de regresión.
+
+    python -m benchmarks.bench_arranque [--repeticiones 3]
+
+Cada repetición corre en un proceso nuevo (sin precalentamiento) y mide:
+
+- tiempo de importar backend.main, desglosado por paquete (`-X importtime`,
+  suma del tiempo propio de cada módulo del paquete);
+- que al importar no se carguen módulos pesados (pandas, sklearn, joblib,
+  WeasyPrint, pyodbc, pyarrow, jinja2);
+- tiempo hasta la primera respuesta HTTP (/estado/modelos, con el ciclo de
+  vida de la app incluido);
+- costo del primer uso de cada componente diferido: pandas, cada modelo y
+  su primera predicción, la plantilla del reporte, WeasyPrint y la conexión
+  a la BD (los dos últimos se marcan "no disponible" si faltan sus
+  bibliotecas o la BD).
+
+Se informa la mediana de las repeticiones y se compara con PRESUPUESTO_MS;
+el proceso termina con código 1 si algo lo excede, para usarlo en CI.
+"""
+import argparse
+import json
+import os
+import re
+import statistics
+import subprocess
+import sys
+import time
+
+# Presupuesto (ms, mediana) por medición; holgado respecto de una máquina de desarrollo
+PRESUPUESTO_MS = {
+    "import backend.main": 600,
+    "primera respuesta": 250,
+    "primer uso: pandas": 400,
+    "primer uso: modelo_riesgo": 100,
+    "primer uso: modelo_hibrido": 100,
+    "primera predicción híbrida": 50,
+    "primer uso: plantilla reporte": 150,
+}
+
+PESADOS = ("pandas", "sklearn", "joblib", "weasyprint", "pyodbc", "pyarrow", "jinja2")
+
+MARCA = "--- bench_arranque: backend.main ---"
+LINEA_IMPORTTIME = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)")
+
+
+def _ms(inicio):
+    return (time.perf_counter() - inicio) * 1e3
+
+
+def _medir(mediciones, nombre, funcion):
+    inicio = time.perf_counter()
+    try:
+        funcion()
+    except Exception as e:
+        mediciones[nombre] = f"no disponible ({type(e).__name__})"
+        return
+    mediciones[nombre] = _ms(inicio)
+
+
+def hijo():
+    """Corre en el proceso medido; escribe un JSON en stdout."""
+    import warnings
+
+    warnings.filterwarnings("ignore")
+    os.environ["PRECALENTAR"] = "0"
+    mediciones = {}
+
+    print(MARCA, file=sys.stderr, flush=True)
+    inicio = time.perf_counter()
+    import backend.main as main
+
+    mediciones["import backend.main"] = _ms(inicio)
+    cargados = [m for m in PESADOS if m in sys.modules]
+
+    from fastapi.testclient import TestClient
+
+    inicio = time.perf_counter()
+    with TestClient(main.app) as cliente:
+        cliente.get("/estado/modelos").raise_for_status()
+        mediciones["primera respuesta"] = _ms(inicio)
+
+        from backend import reportes
+        from backend.predictor_hibrido import cola
+
+        _medir(mediciones, "primer uso: pandas", lambda: __import__("pandas"))
+        _medir(mediciones, "primer uso: modelo_riesgo", lambda: main.registro_modelos.obtener("riesgo"))
+        _medir(mediciones, "primer uso: modelo_hibrido", lambda: main.registro_modelos.obtener("hibrido"))
+        _medir(mediciones, "primera predicción híbrida", lambda: cola.predecir([1, 3.0, 3.0, 3.0, 3.0, 3.0, 2]))
+        _medir(mediciones, "primer uso: plantilla reporte", reportes._get_plantilla)
+        _medir(mediciones, "primer uso: WeasyPrint", reportes._get_estilos)
+        _medir(mediciones, "primer uso: conexión BD", main._conexion_inicial)
+
+    print(json.dumps({"mediciones": mediciones, "pesados": cargados}))
+
+
+def importtime_por_paquete(stderr):
+    """{paquete: ms de tiempo propio} de los módulos importados por backend.main."""
+    por_paquete = {}
+    lineas = stderr.split(MARCA, 1)[-1].splitlines()
+    for linea in lineas:
+        coincidencia = LINEA_IMPORTTIME.match(linea)
+        if not coincidencia:
+            continue
+        propio, _, _, modulo = coincidencia.groups()
+        paquete = modulo if modulo.startswith("backend") else modulo.split(".")[0]
+        if paquete.startswith("backend"):
+            paquete = "backend (propio)"
+        por_paquete[paquete] = por_paquete.get(paquete, 0) + int(propio) / 1e3
+        if modulo == "backend.main":
+            break
+    return por_paquete
+
+
+def correr_hijo():
+    proceso = subprocess.run(
+        [sys.executable, "-X", "importtime", "-m", "benchmarks.bench_arranque", "--hijo"],
+        capture_output=True, text=True, check=True,
+        cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+    )
+    resultado = json.loads(proceso.stdout.strip().splitlines()[-1])
+    resultado["paquetes"] = importtime_por_paquete(proceso.stderr)
+    return resultado
+
+
+def mediana(valores):
+    numeros = [v for v in valores if isinstance(v, (int, float))]
+    return statistics.median(numeros) if len(numeros) == len(valores) else valores[0]
+
+
+def main(repeticiones, paquetes):
+    corridas = [correr_hijo() for _ in range(repeticiones)]
+
+    print(f"Arranque en frío de backend.main (mediana de {repeticiones} procesos)\n")
+    print("Importación por paquete (ms, tiempo propio):")
+    totales = {}
+    for corrida in corridas:
+        for paquete, ms in corrida["paquetes"].items():
+            totales.setdefault(paquete, []).append(ms)
+    for paquete, valores in sorted(totales.items(), key=lambda p: -statistics.median(p[1]))[:paquetes]:
+        print(f"  {paquete:<28} {statistics.median(valores):8.1f}")
+
+    excedidos = []
+    print(f"\n{'':<34} {'ms':>9} {'presupuesto':>12}")
+    for nombre in corridas[0]["mediciones"]:
+        valor = mediana([c["mediciones"][nombre] for c in corridas])
+        presupuesto = PRESUPUESTO_MS.get(nombre)
+        if isinstance(valor, str):
+            print(f"  {nombre:<32} {valor}")
+            continue
+        estado = ""
+        if presupuesto is not None:
+            estado = f"{presupuesto:>9} ms" + ("  ❌ EXCEDIDO" if valor > presupuesto else "  ✅")
+            if valor > presupuesto:
+                excedidos.append(nombre)
+        print(f"  {nombre:<32} {valor:9.1f} {estado}")
+
+    pesados = sorted({m for c in corridas for m in c["pesados"]})
+    if pesados:
+        excedidos.append("módulos pesados al importar")
+        print(f"\n❌ Importar backend.main cargó: {', '.join(pesados)}")
+    else:
+        print(f"\n✅ Importar backend.main no cargó ninguno de: {', '.join(PESADOS)}")
+
+    if excedidos:
+        print(f"\n❌ Fuera de presupuesto: {', '.join(excedidos)}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark de arranque en frío")
+    parser.add_argument("--repeticiones", type=int, default=3)
+    parser.add_argument("--paquetes", type=int, default=12, help="paquetes a mostrar en el desglose")
+    parser.add_argument("--hijo", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.hijo:
+        hijo()
+    else:
+        sys.exit(main(args.repeticiones, args.paquetes))
@@ -0,0 +1,82 @@
+"""
+Latencia y memoria de los modelos: RandomForestClassifier de sklearn (.pkl)
+contra el bosque compilado (.npz, backend/bosque_compilado.py).
+
+    python -m benchmarks.bench_bosque [--repeticiones 500] [--lote 64]
+
+Para cada modelo mide `predict_proba` de una fila (DataFrame en sklearn,
+vector en el compilado, como los usa el backend) y de un lote, la memoria
+de los árboles y comprueba que las probabilidades sean
+idénticas. La memoria es la de los arreglos de los árboles (nodos de 64
+bytes + `value` en sklearn; tracemalloc no ve lo que asigna el código C de
+sklearn).
+"""
+import argparse
+import time
+import warnings
+
+import numpy as np
+import pandas as pd
+
+from backend import bosque_compilado
+from backend.modelos import RAIZ
+
+MODELOS = ("modelo_riesgo.pkl", "modelo_hibrido.pkl")
+
+
+def medir(funcion, repeticiones):
+    funcion()
+    tiempos = []
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        funcion()
+        tiempos.append(time.perf_counter() - inicio)
+    return float(np.median(tiempos)) * 1e3
+
+
+def memoria_sklearn(modelo):
+    total = 0
+    for arbol in modelo.estimators_:
+        total += arbol.tree_.__getstate__()["nodes"].nbytes + arbol.tree_.value.nbytes
+    return total
+
+
+def main(repeticiones, lote):
+    import joblib
+
+    warnings.filterwarnings("ignore")  # InconsistentVersionWarning de los .pkl
+    for nombre in MODELOS:
+        ruta = RAIZ / nombre
+        compilado = bosque_compilado.ruta_compilada(ruta)
+        if not compilado.exists():
+            bosque_compilado.exportar(ruta)
+
+        modelo = joblib.load(ruta)
+        bosque = bosque_compilado.cargar(compilado)
+
+        rng = np.random.default_rng(0)
+        X = pd.DataFrame(rng.random((lote, modelo.n_features_in_)) * 6, columns=modelo.feature_names_in_)
+        fila_df = X.iloc[:1]
+        fila = X.to_numpy()[0]
+        matriz = X.to_numpy()
+
+        iguales = np.array_equal(modelo.predict_proba(X), bosque.predict_proba(matriz))
+        print(f"\n{nombre}: {bosque.n_estimators} árboles, {len(bosque.umbral)} nodos, "
+              f"profundidad {bosque.profundidad}, probabilidades idénticas: {iguales}")
+        print(f"{'':>24} {'sklearn':>10} {'compilado':>10}")
+        print(f"{'1 fila (ms)':>24} {medir(lambda: modelo.predict_proba(fila_df), repeticiones):10.3f} "
+              f"{medir(lambda: bosque.predict_proba(fila), repeticiones):10.3f}")
+        print(f"{f'lote de {lote} (ms)':>24} {medir(lambda: modelo.predict_proba(X), repeticiones // 5):10.3f} "
+              f"{medir(lambda: bosque.predict_proba(matriz), repeticiones // 5):10.3f}")
+        print(f"{'archivo (KB)':>24} {ruta.stat().st_size / 1024:10.0f} {compilado.stat().st_size / 1024:10.0f}")
+        print(f"{'árboles en memoria (KB)':>24} {memoria_sklearn(modelo) / 1024:10.0f} {bosque.nbytes / 1024:10.0f}")
+        print(f"{'carga (ms)':>24} {medir(lambda: joblib.load(ruta), 5):10.1f} "
+              f"{medir(lambda: bosque_compilado.cargar(compilado), 5):10.1f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark de inferencia con bosques compilados")
+    parser.add_argument("--repeticiones", type=int, default=500)
+    parser.add_argument("--lote", type=int, default=64)
+    args = parser.parse_args()
+    main(args.repeticiones, args.lote)
@@ -0,0 +1,114 @@
+"""
+Costo por petición de leer la fila de un estudiante: `pd.read_sql` +
+`df.iloc[0]` (como lo hacían predictor.py y predictor_hibrido.py) contra
+`consultas.uno` (cursor + fetchone a un NamedTuple).
+
+    python -m benchmarks.bench_consultas [--estudiantes 20000] [--repeticiones 2000]
+
+Corre sobre SQLite en memoria con las mismas columnas que la consulta del
+modelo híbrido, así que mide solo el lado cliente (lo que cambia entre las
+dos variantes); la latencia de red de SQL Server se suma igual a ambas.
+"""
+import argparse
+import random
+import sqlite3
+import time
+import warnings
+
+import numpy as np
+import pandas as pd
+
+from backend import consultas
+from backend.predictor_hibrido import FilaHibrido
+
+QUERY = """
+    SELECT
+        p.RUT,
+        p.[NOMBRE COMPLETO],
+        p.Carrera,
+        IFNULL(r.RamosReprobados, 0) AS RamosReprobados,
+        e.[PROMEDIO AUTOEFICACIA ACADÉMICA] AS Autoeficacia,
+        e.[PROMEDIO MODULACIÓN EMOCIONAL] AS Emocional,
+        e.[PROMEDIO AUTODETERMINACIÓN PERSONAL] AS Autodeterminacion,
+        e.[PROMEDIO SOCIABILIDAD] AS Sociabilidad,
+        e.[PROMEDIO PROSPECTIVA ACADÉMICA] AS Prospectiva
+    FROM PACE2024_ACTUALIZADO p
+    LEFT JOIN RamosReprobados r ON p.RUT = r.RUT
+    LEFT JOIN Epaes e ON p.RUT = e.RUT
+    WHERE p.RUT = ?
+"""
+
+
+def base_de_prueba(estudiantes):
+    conn = sqlite3.connect(":memory:")
+    conn.executescript("""
+        CREATE TABLE PACE2024_ACTUALIZADO (RUT TEXT PRIMARY KEY, [NOMBRE COMPLETO] TEXT, Carrera TEXT);
+        CREATE TABLE RamosReprobados (RUT TEXT PRIMARY KEY, RamosReprobados INTEGER);
+        CREATE TABLE Epaes (
+            RUT TEXT PRIMARY KEY,
+            [PROMEDIO AUTOEFICACIA ACADÉMICA] REAL, [PROMEDIO MODULACIÓN EMOCIONAL] REAL,
+            [PROMEDIO AUTODETERMINACIÓN PERSONAL] REAL, [PROMEDIO SOCIABILIDAD] REAL,
+            [PROMEDIO PROSPECTIVA ACADÉMICA] REAL
+        );
+    """)
+    rng = random.Random(0)
+    ruts = [str(20000000 + i) for i in range(estudiantes)]
+    conn.executemany("INSERT INTO PACE2024_ACTUALIZADO VALUES (?, ?, ?)",
+                     [(r, f"Estudiante {r}", "Ingeniería") for r in ruts])
+    conn.executemany("INSERT INTO RamosReprobados VALUES (?, ?)", [(r, rng.randint(0, 4)) for r in ruts])
+    conn.executemany("INSERT INTO Epaes VALUES (?, ?, ?, ?, ?, ?)",
+                     [(r, *(rng.uniform(1, 5) for _ in range(5))) for r in ruts if rng.random() < 0.9])
+    return conn, ruts
+
+
+def con_pandas(conn, rut):
+    df = pd.read_sql(QUERY, conn, params=[rut])
+    if df.empty:
+        return None
+    row = df.iloc[0]
+    return [row["RamosReprobados"], *(row[c] for c in ("Autoeficacia", "Emocional", "Autodeterminacion",
+                                                        "Sociabilidad", "Prospectiva"))]
+
+
+def con_cursor(conn, rut):
+    row = consultas.uno(conn, FilaHibrido, QUERY, [rut])
+    if row is None:
+        return None
+    return [row.ramos_reprobados, *row.epaes]
+
+
+def medir(funcion, conn, ruts):
+    tiempos = []
+    for rut in ruts:
+        inicio = time.perf_counter()
+        funcion(conn, rut)
+        tiempos.append(time.perf_counter() - inicio)
+    tiempos = np.array(tiempos) * 1e6
+    return np.median(tiempos), np.percentile(tiempos, 99)
+
+
+def main(estudiantes, repeticiones):
+    warnings.filterwarnings("ignore")  # advertencia de pandas por conexión DBAPI sin SQLAlchemy
+    conn, ruts = base_de_prueba(estudiantes)
+    muestra = random.Random(1).choices(ruts, k=repeticiones)
+
+    for rut in muestra[:50]:
+        a, b = con_pandas(conn, rut), con_cursor(conn, rut)
+        assert np.allclose(np.array(a, dtype=float), np.array(b, dtype=float), equal_nan=True)
+
+    print(f"{repeticiones} lecturas por RUT sobre {estudiantes} estudiantes (µs por petición)")
+    print(f"{'':>26} {'mediana':>9} {'p99':>9}")
+    resultados = {}
+    for nombre, funcion in (("pd.read_sql + iloc[0]", con_pandas), ("cursor + fetchone", con_cursor)):
+        resultados[nombre] = medir(funcion, conn, muestra)
+        print(f"{nombre:>26} {resultados[nombre][0]:9.1f} {resultados[nombre][1]:9.1f}")
+    antes, despues = resultados["pd.read_sql + iloc[0]"][0], resultados["cursor + fetchone"][0]
+    print(f"{'ahorro':>26} {antes - despues:9.1f} µs ({antes / despues:.1f}x)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark de lectura de una fila por RUT")
+    parser.add_argument("--estudiantes", type=int, default=20000)
+    parser.add_argument("--repeticiones", type=int, default=2000)
+    args = parser.parse_args()
+    main(args.estudiantes, args.repeticiones)
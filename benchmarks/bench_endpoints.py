@@ -0,0 +1,180 @@
+"""
+Latencia de cada endpoint y costo de cada función de puntuación contra la
+base falsa (backend/bd_falsa.py) con una cohorte sintética.
+
+    python -m benchmarks.bench_endpoints [--estudiantes 10000] [--repeticiones 200]
+                                         [--base cohorte.db] [--regenerar]
+
+La cohorte se genera con backend/cohorte_sintetica.py la primera vez (o si
+cambia `--estudiantes`) y se reutiliza. Los endpoints se llaman con el
+TestClient de FastAPI sobre la app completa (pool de conexiones, límites de
+concurrencia, serialización JSON), con RUTs al azar y el caché por RUT
+apagado (CACHE_RUT_TTL=0), así cada llamada llega a la BD. Se informa la
+mediana y el p95 en ms; los endpoints de escritura modifican la base.
+
+Las funciones de puntuación se miden directo, sin HTTP: carga de perfiles y
+riesgo global por lotes, la foto heurística de toda la cohorte y la
+puntuación nocturna (`puntuar_cohorte --simular`), en estudiantes/s.
+
+SQLite no tiene la latencia de red ni el plan de ejecución de SQL Server:
+los números sirven para comparar versiones del backend entre sí, no para
+estimar tiempos de producción. /reporte/{rut} se marca "no disponible" si
+WeasyPrint (Pango) no está instalado.
+"""
+import argparse
+import contextlib
+import io
+import os
+import tempfile
+import time
+import warnings
+from pathlib import Path
+
+import numpy as np
+
+from backend import cohorte_sintetica
+
+# RUTs por llamada en los endpoints y funciones de lote
+LOTE = 500
+
+
+def medir(funcion, repeticiones):
+    funcion()
+    tiempos = []
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        funcion()
+        tiempos.append(time.perf_counter() - inicio)
+    tiempos = np.array(tiempos) * 1e3
+    return float(np.median(tiempos)), float(np.percentile(tiempos, 95))
+
+
+def _ok(respuesta):
+    # 404 es la respuesta normal para quien no tiene notas o Epaes
+    if respuesta.status_code != 404:
+        respuesta.raise_for_status()
+    return respuesta
+
+
+def endpoints(cliente, ruts, rng):
+    """(nombre, llamada, fracción de las repeticiones) por endpoint."""
+    def rut():
+        return ruts[rng.integers(len(ruts))]
+
+    def lote():
+        return [ruts[i] for i in rng.choice(len(ruts), min(LOTE, len(ruts)), replace=False)]
+
+    def factor():
+        return {"rut": rut(), "nivel_riesgo": "Medio", "esta_apoyo": 1,
+                "profesional": "Ps. Benchmark", "observaciones": "Registro de benchmark"}
+
+    def get(ruta, **params):
+        return lambda: _ok(cliente.get(ruta.format(rut=rut()), params=params))
+
+    return [
+        ("GET /estudiantes (todos)", get("/estudiantes"), 0.02),
+        ("GET /estudiantes (ndjson)", get("/estudiantes", formato="ndjson"), 0.02),
+        ("GET /estudiantes?por_pagina=100", lambda: _ok(cliente.get(
+            "/estudiantes", params={"por_pagina": 100, "despues_de": rut()})), 1),
+        ("GET /estudiantes?carrera=...", get("/estudiantes", carrera=cohorte_sintetica.CARRERAS[0],
+                                             columnas="RUT,Estado", por_pagina=1000), 0.2),
+        ("GET /riesgo/{rut}", get("/riesgo/{rut}"), 1),
+        ("GET /riesgo_hibrido/{rut}", get("/riesgo_hibrido/{rut}"), 1),
+        ("GET /riesgo/academico/{rut}", get("/riesgo/academico/{rut}"), 1),
+        ("GET /riesgo/psicologico/{rut}", get("/riesgo/psicologico/{rut}"), 1),
+        ("GET /riesgo/global/{rut}", get("/riesgo/global/{rut}"), 1),
+        (f"POST /riesgo/global/batch ({LOTE})", lambda: _ok(cliente.post("/riesgo/global/batch", json=lote())), 0.05),
+        ("GET /riesgo_heuristico/{rut}", get("/riesgo_heuristico/{rut}"), 1),
+        ("GET /notas/{rut}", get("/notas/{rut}"), 1),
+        ("GET /riesgos_calculados?por_pagina=100", get("/riesgos_calculados", por_pagina=100), 0.5),
+        ("GET /riesgos_calculados?summary", get("/riesgos_calculados", summary="true"), 0.1),
+        ("POST /registrar_factores_psicologicos", lambda: _ok(cliente.post(
+            "/registrar_factores_psicologicos", json=factor())), 0.5),
+        ("POST /registrar_factores_academicos/", lambda: _ok(cliente.post(
+            "/registrar_factores_academicos/", json=factor())), 0.5),
+        (f"POST /registrar_factores_*/lote ({LOTE})", lambda: _ok(cliente.post(
+            "/registrar_factores_psicologicos/lote", json=[factor() for _ in range(LOTE)])), 0.05),
+        ("GET /reporte/{rut}", get("/reporte/{rut}"), 0.1),
+    ]
+
+
+def funciones(ruts, rng):
+    """(nombre, función, estudiantes por llamada, repeticiones fijas) de puntuación."""
+    from backend.db import get_connection
+    from backend.evaluar_riesgo_heuristico import cargar_indice
+    from backend.perfil_estudiante import SECCIONES_GLOBAL, cargar_perfiles
+    from backend.riesgo_global import evaluar_riesgo_global_lote
+    from puntuar_cohorte import puntuar_cohorte
+
+    muestra = [ruts[i] for i in rng.choice(len(ruts), min(LOTE, len(ruts)), replace=False)]
+    with get_connection() as conn:
+        perfiles = cargar_perfiles(conn, muestra, SECCIONES_GLOBAL)
+    lista = [perfiles[r] for r in muestra]
+
+    def cargar():
+        with get_connection() as conn:
+            cargar_perfiles(conn, muestra, SECCIONES_GLOBAL)
+
+    def puntuar():
+        with contextlib.redirect_stdout(io.StringIO()):
+            puntuar_cohorte(simular=True)
+
+    return [
+        (f"cargar_perfiles ({LOTE})", cargar, len(muestra), None),
+        (f"evaluar_riesgo_global_lote ({LOTE})", lambda: evaluar_riesgo_global_lote(lista), len(muestra), None),
+        ("heurístico: cargar_indice (cohorte)", cargar_indice, len(ruts), 3),
+        ("puntuar_cohorte --simular (cohorte)", puntuar, len(ruts), 3),
+    ]
+
+
+def main(ruta, estudiantes, repeticiones, regenerar, semilla):
+    if regenerar or cohorte_sintetica.contar_estudiantes(ruta) != estudiantes:
+        print(f"Generando cohorte sintética de {estudiantes} estudiantes en {ruta}")
+        cohorte_sintetica.generar(ruta, estudiantes, semilla)
+
+    # Antes de importar la app: base falsa, sin precalentamiento ni caché por RUT
+    os.environ["DB_FALSA"] = str(ruta)
+    os.environ["PRECALENTAR"] = "0"
+    os.environ["CACHE_RUT_TTL"] = "0"
+    warnings.filterwarnings("ignore")  # pandas con conexión DBAPI y .pkl de otra versión de sklearn
+    from fastapi.testclient import TestClient
+
+    import backend.main as app_main
+    from backend import reportes
+
+    ruts = [str(cohorte_sintetica.RUT_INICIAL + i) for i in range(estudiantes)]
+    rng = np.random.default_rng(semilla)
+
+    print(f"\nEndpoints, {estudiantes} estudiantes (ms por llamada)")
+    print(f"{'':<42} {'llamadas':>9} {'mediana':>9} {'p95':>9}")
+    with TestClient(app_main.app) as cliente:
+        for nombre, llamada, fraccion in endpoints(cliente, ruts, rng):
+            if nombre.startswith("GET /reporte"):
+                try:
+                    reportes._get_estilos()
+                except Exception as e:
+                    print(f"  {nombre:<40} no disponible ({type(e).__name__})")
+                    continue
+            veces = max(3, int(repeticiones * fraccion))
+            mediana, p95 = medir(llamada, veces)
+            print(f"  {nombre:<40} {veces:9d} {mediana:9.2f} {p95:9.2f}")
+
+        print("\nFunciones de puntuación")
+        print(f"{'':<42} {'llamadas':>9} {'mediana ms':>11} {'est/s':>11}")
+        for nombre, funcion, por_llamada, veces in funciones(ruts, rng):
+            veces = veces or max(3, repeticiones // 10)
+            mediana, _ = medir(funcion, veces)
+            print(f"  {nombre:<40} {veces:9d} {mediana:11.1f} {por_llamada / mediana * 1e3:11,.0f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark de endpoints y puntuación sobre la base falsa")
+    parser.add_argument("--estudiantes", type=int, default=10000)
+    parser.add_argument("--repeticiones", type=int, default=200)
+    parser.add_argument("--semilla", type=int, default=0)
+    parser.add_argument("--base", type=Path, default=None,
+                        help="archivo SQLite de la cohorte (por defecto en el directorio temporal)")
+    parser.add_argument("--regenerar", action="store_true", help="vuelve a generar la cohorte aunque exista")
+    args = parser.parse_args()
+    base = args.base or Path(tempfile.gettempdir()) / f"cohorte_sintetica_{args.estudiantes}_{args.semilla}.db"
+    main(base, args.estudiantes, args.repeticiones, args.regenerar, args.semilla)
@@ -0,0 +1,209 @@
+"""
+Costo por reporte del armado de HTML y del render PDF: versión anterior
+(f-string con `+=` por ramo y CSS embebido que WeasyPrint parsea en cada
+llamada) contra la plantilla Jinja precompilada con hoja de estilos y
+fuentes compartidas.
+
+    python -m benchmarks.bench_reporte [--ramos 40] [--repeticiones 200]
+
+El render PDF se mide solo si WeasyPrint y sus bibliotecas (Pango) están
+instaladas; el armado de HTML se mide siempre. Los tiempos son de CPU del
+proceso (time.process_time).
+"""
+import argparse
+import time
+
+from backend.reportes import CAMPOS_NOTAS, armar_html, renderizar_pdf
+
+
+def datos_de_prueba(ramos):
+    filas = [
+        {
+            "Denominación Actividad Curricular": f"Ramo {i} & <Laboratorio>",
+            "Nota_1": "4,5", "Nota_2": "3,9", "Nota_3": None,
+            "Nota_4": "6,1", "Nota_5": "", "Nota_6": "5,0",
+        }
+        for i in range(ramos)
+    ]
+    base = {
+        "estudiante": {
+            "RUT": "12345678", "NOMBRE COMPLETO": "Estudiante de Prueba", "Carrera": "Ingeniería Civil",
+            "AÑO DE INGRESO": 2024, "Estado": "Regular",
+        },
+        "niveles": {"global": "Alto", "academico": "Medio", "psicologico": "Alto", "interseccional": "Bajo"},
+        "recomendaciones": {"psicologica": "Derivar a acompañamiento.", "academica": "Tutoría de pares."},
+    }
+    anterior = {**base, "notas": filas}
+    nuevo = {**base, "notas": {c: [f[c] for f in filas] for c in CAMPOS_NOTAS}}
+    return anterior, nuevo
+
+
+def html_anterior(datos):
+    """Armado anterior: f-string con <style> embebido y += por cada ramo."""
+    estudiante = datos["estudiante"]
+    nivel_global = datos["niveles"]["global"]
+    nivel_academico = datos["niveles"]["academico"]
+    nivel_psicologico = datos["niveles"]["psicologico"]
+    nivel_interseccional = datos["niveles"]["interseccional"]
+    recomendacion_psico = datos["recomendaciones"]["psicologica"]
+    recomendacion_academica = datos["recomendaciones"]["academica"]
+
+    html_content = f"""
+    <html>
+    <head>
+    <style>
+        body {{
+            font-family: Arial, sans-serif;
+            color: #333;
+            margin: 40px;
+        }}
+        h1 {{
+            color: #1a73e8;
+            border-bottom: 2px solid #1a73e8;
+            padding-bottom: 5px;
+        }}
+        .section {{
+            margin-top: 20px;
+        }}
+        .section-title {{
+            color: #1a73e8;
+            font-size: 18px;
+            margin-bottom: 10px;
+        }}
+        table {{
+            width: 100%;
+            border-collapse: collapse;
+            margin-top: 10px;
+        }}
+        th, td {{
+            border: 1px solid #ccc;
+            padding: 8px;
+            text-align: left;
+        }}
+        th {{
+            background-color: #f2f2f2;
+        }}
+        .highlight {{
+            font-weight: bold;
+        }}
+        .recomendacion {{
+            background-color: #f0f4f8;
+            border-left: 4px solid #1a73e8;
+            padding: 10px;
+            margin-top: 10px;
+            font-size: 12px;
+        }}
+    </style>
+    </head>
+    <body>
+        <h1>Reporte del Estudiante</h1>
+
+        <div class="section">
+            <div class="section-title">Datos Generales</div>
+            <p><span class="highlight">RUT:</span> {estudiante['RUT']}</p>
+            <p><span class="highlight">Nombre:</span> {estudiante['NOMBRE COMPLETO']}</p>
+            <p><span class="highlight">Carrera:</span> {estudiante['Carrera']}</p>
+            <p><span class="highlight">Año de Ingreso:</span> {estudiante['AÑO DE INGRESO']}</p>
+            <p><span class="highlight">Estado:</span> {estudiante['Estado']}</p>
+        </div>
+
+        <div class="section">
+            <div class="section-title">Niveles de Riesgo</div>
+            <table>
+                <tr><th>Global</th><th>Académico</th><th>Psicológico</th><th>Interseccional</th></tr>
+                <tr>
+                    <td>{nivel_global}</td>
+                    <td>{nivel_academico}</td>
+                    <td>{nivel_psicologico}</td>
+                    <td>{nivel_interseccional}</td>
+                </tr>
+            </table>
+        </div>
+
+        <div class="section">
+            <div class="section-title">Recomendación Psicológica</div>
+            <div class="recomendacion">{recomendacion_psico}</div>
+        </div>
+        <div class="section">
+            <div class="section-title">Recomendación Académica</div>
+            <div class="recomendacion">{recomendacion_academica}</div>
+        </div>
+
+        <div class="section">
+            <div class="section-title">Notas del Estudiante</div>
+            <table>
+                <tr>
+                    <th>Ramo</th>
+                    <th>Nota 1</th>
+                    <th>Nota 2</th>
+                    <th>Nota 3</th>
+                    <th>Nota 4</th>
+                    <th>Nota 5</th>
+                    <th>Nota 6</th>
+                </tr>
+    """
+
+    for row in datos["notas"]:
+        html_content += f"""
+            <tr>
+                <td>{row['Denominación Actividad Curricular']}</td>
+                <td>{row['Nota_1']}</td>
+                <td>{row['Nota_2']}</td>
+                <td>{row['Nota_3']}</td>
+                <td>{row['Nota_4']}</td>
+                <td>{row['Nota_5']}</td>
+                <td>{row['Nota_6']}</td>
+            </tr>
+        """
+
+    html_content += """
+            </table>
+        </div>
+    </body>
+    </html>
+    """
+
+
+    return html_content
+
+
+def _pdf_anterior(datos):
+    from weasyprint import HTML
+
+    return HTML(string=html_anterior(datos)).write_pdf()
+
+
+def medir(funcion, datos, repeticiones):
+    funcion(datos)  # calentamiento: compilación de plantilla, CSS y fuentes
+    inicio = time.process_time()
+    for _ in range(repeticiones):
+        funcion(datos)
+    return (time.process_time() - inicio) / repeticiones * 1000
+
+
+def imprimir(titulo, ms_anterior, ms_nuevo):
+    ahorro = (1 - ms_nuevo / ms_anterior) * 100 if ms_anterior else 0.0
+    print(f"{titulo:<12} anterior {ms_anterior:9.3f} ms   nuevo {ms_nuevo:9.3f} ms   ahorro {ahorro:5.1f}%")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark de armado y render de /reporte")
+    parser.add_argument("--ramos", type=int, default=40, help="filas de la tabla de notas")
+    parser.add_argument("--repeticiones", type=int, default=200, help="repeticiones del armado de HTML")
+    parser.add_argument("--repeticiones-pdf", type=int, default=10, help="repeticiones del render PDF")
+    args = parser.parse_args()
+
+    anterior, nuevo = datos_de_prueba(args.ramos)
+    print(f"{args.ramos} ramos por reporte, CPU por reporte:")
+    imprimir("HTML", medir(html_anterior, anterior, args.repeticiones), medir(armar_html, nuevo, args.repeticiones))
+
+    try:
+        import weasyprint  # noqa: F401
+    except (ImportError, OSError) as e:
+        print(f"PDF          omitido: WeasyPrint no disponible ({type(e).__name__})")
+    else:
+        imprimir(
+            "HTML + PDF",
+            medir(_pdf_anterior, anterior, args.repeticiones_pdf),
+            medir(renderizar_pdf, nuevo, args.repeticiones_pdf),
+        )
@@ -1,23 +1,16 @@
+"""
+Entrena modelo_riesgo.pkl con el arnés de backend/entrenamiento.py
+(características en caché, búsqueda con validación cruzada en paralelo,
+metadatos en modelo_riesgo.pkl.json).
+
+    python entrenar_modelo.py [--refrescar] [--pliegues 5] [--procesos N]
+"""
+import argparse
+
 import pandas as pd
-import pyodbc
-from dotenv import load_dotenv
-import os
-from sklearn.ensemble import RandomForestClassifier
-from sklearn.model_selection import train_test_split
-from sklearn.metrics import classification_report
-import joblib
-
-# Cargar variables .env
-load_dotenv()
-
-# Conexión a SQL Server
-conn = pyodbc.connect(
-    f"DRIVER={{ODBC Driver 17 for SQL Server}};"
-    f"SERVER={os.getenv('DB_SERVER')};"
-    f"DATABASE={os.getenv('DB_NAME')};"
-    f"UID={os.getenv('DB_USER')};"
-    f"PWD={os.getenv('DB_PASSWORD')}"
-)
+from backend.db import get_connection
+from backend.entrenamiento import caracteristicas, clave_origen, entrenar
+from backend.modelos import RAIZ
 
 # Consulta SQL
 query = """
@@ -51,40 +44,65 @@ GROUP BY
     e.[PROMEDIO COMUNICACIÓN EFECTIVA]
 """
 
-# Leer datos
-df = pd.read_sql(query, conn)
+# Sondeo barato de las tablas de origen: si cambia la cantidad de filas la
+# caché de características ya no sirve (las ediciones sin altas ni bajas las
+# cubre la antigüedad máxima de la caché)
+QUERY_SONDEO = """
+SELECT
+    (SELECT COUNT(*) FROM dbo.NotasPace2025) AS notas,
+    (SELECT COUNT(*) FROM dbo.[Epaes$]) AS epaes
+"""
 
-# Calcular promedio parcial de notas
 nota_cols = ["Nota_1", "Nota_2", "Nota_3", "Nota_4", "Nota_5", "Nota_6"]
-df["promedio_notas"] = df[nota_cols].apply(lambda row: row.dropna().mean(), axis=1)
-
-# Forzar riesgo a los peores 10% promedios
-df = df.sort_values("promedio_notas", ascending=True).reset_index(drop=True)
-top_n = max(int(len(df) * 0.10), 1)  # al menos 1 estudiante en riesgo
-df["riesgo"] = 0
-df.loc[:top_n - 1, "riesgo"] = 1
-
-# Mostrar distribución
-print("📊 Distribución de clases:")
-print(df["riesgo"].value_counts())
-
-# Prevenir entrenamiento si solo hay una clase
-if df["riesgo"].nunique() < 2:
-    print("⚠️ No hay suficientes clases distintas para entrenar el modelo.")
-    exit()
-
-# Entrenamiento
-X = df.drop(columns=["RUT", "riesgo"])
-y = df["riesgo"]
-X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
-
-modelo = RandomForestClassifier(n_estimators=100, random_state=42)
-modelo.fit(X_train, y_train)
-
-# Evaluación
-print("\n🧪 Evaluación del modelo:")
-print(classification_report(y_test, modelo.predict(X_test)))
-
-# Guardar modelo
-joblib.dump(modelo, "modelo_riesgo.pkl")
-print("\n✅ Modelo guardado como modelo_riesgo.pkl")
+
+
+def extraer():
+    # Leer datos
+    with get_connection() as conn:
+        df = pd.read_sql(query, conn)
+
+    # Calcular promedio parcial de notas
+    df["promedio_notas"] = df[nota_cols].mean(axis=1)
+    return df
+
+
+def sondear_origen():
+    with get_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute(QUERY_SONDEO)
+        fila = cursor.fetchone()
+        cursor.close()
+    return {"notas": fila[0], "epaes": fila[1]}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Entrena el modelo de riesgo académico")
+    parser.add_argument("--refrescar", action="store_true", help="vuelve a leer la BD aunque haya caché")
+    parser.add_argument("--pliegues", type=int, default=5)
+    parser.add_argument("--procesos", type=int, default=None, help="por defecto, todos los núcleos")
+    args = parser.parse_args()
+
+    # La BD no avisa cambios: la caché se invalida si cambia la consulta o la
+    # cantidad de filas de origen, si tiene más de CACHE_MAX_HORAS o con --refrescar
+    df = caracteristicas("riesgo", clave_origen(query, sondear_origen()), extraer, args.refrescar)
+
+    # Forzar riesgo a los peores 10% promedios
+    df = df.sort_values("promedio_notas", ascending=True).reset_index(drop=True)
+    top_n = max(int(len(df) * 0.10), 1)  # al menos 1 estudiante en riesgo
+    df["riesgo"] = 0
+    df.loc[:top_n - 1, "riesgo"] = 1
+
+    # Mostrar distribución
+    print("📊 Distribución de clases:")
+    print(df["riesgo"].value_counts())
+
+    # Prevenir entrenamiento si solo hay una clase
+    if df["riesgo"].nunique() < 2:
+        print("⚠️ No hay suficientes clases distintas para entrenar el modelo.")
+        exit()
+
+    # Entrenamiento, evaluación y guardado
+    X = df.drop(columns=["RUT", "riesgo"])
+    y = df["riesgo"]
+    entrenar("riesgo", X, y, RAIZ / "modelo_riesgo.pkl", pliegues=args.pliegues, procesos=args.procesos,
+             origen={"consulta": clave_origen(query)})
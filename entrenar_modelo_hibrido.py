@@ -1,11 +1,19 @@
+"""
+Entrena modelo_hibrido.pkl con el arnés de backend/entrenamiento.py
+(características en caché, búsqueda con validación cruzada en paralelo,
+metadatos en modelo_hibrido.pkl.json).
+
+    python entrenar_modelo_hibrido.py [--refrescar] [--pliegues 5] [--procesos N]
+"""
+import argparse
+from pathlib import Path
+
 import pandas as pd
-from sklearn.ensemble import RandomForestClassifier
-from sklearn.model_selection import train_test_split
-from sklearn.metrics import classification_report
-import joblib
 
-# Cargar el dataset
-df = pd.read_csv("dataset_hibrido.csv")
+from backend.dataset_hibrido import leer_dataset, particiones
+from backend.entrenamiento import caracteristicas, clave_origen, entrenar, firma_archivos
+from backend.modelos import RAIZ
+from backend.predictor_hibrido import COLUMNAS_MODELO
 
 # Validar columnas necesarias
 columnas_obligatorias = [
@@ -13,39 +21,40 @@ columnas_obligatorias = [
     "Autodeterminacion", "Sociabilidad", "Prospectiva",
     "PuntajeHeuristico", "NivelHeuristico"
 ]
-if not all(col in df.columns for col in columnas_obligatorias):
-    print("❌ Faltan columnas necesarias en el dataset. Revisa el archivo CSV.")
-    exit()
-
-# Limpiar filas con valores nulos
-df = df.dropna(subset=columnas_obligatorias)
-
-# Separar variables
-X = df[[
-    "RamosReprobados",
-    "Autoeficacia",
-    "Emocional",
-    "Autodeterminacion",
-    "Sociabilidad",
-    "Prospectiva",
-    "PuntajeHeuristico"
-]]
-y = df["NivelHeuristico"]  # 0 = Bajo, 1 = Medio, 2 = Alto
-
-# Dividir en entrenamiento y prueba
-X_train, X_test, y_train, y_test = train_test_split(
-    X, y, test_size=0.2, random_state=42, stratify=y
-)
-
-# Entrenar modelo
-modelo = RandomForestClassifier(n_estimators=100, random_state=42)
-modelo.fit(X_train, y_train)
-
-# Evaluar
-y_pred = modelo.predict(X_test)
-print("🧪 Evaluación del modelo:")
-print(classification_report(y_test, y_pred, digits=3))
-
-# Guardar modelo
-joblib.dump(modelo, "modelo_hibrido.pkl")
-print("✅ Modelo guardado como modelo_hibrido.pkl")
+CSV = Path(__file__).resolve().parent / "dataset_hibrido.csv"
+
+
+def extraer():
+    # Cargar el dataset: las particiones Arrow de generar_dataset_hibrido.py
+    # (solo las columnas que se usan, sin parsear texto) o el CSV antiguo si no hay
+    try:
+        df = leer_dataset(columnas_obligatorias).to_pandas()
+    except FileNotFoundError:
+        df = pd.read_csv(CSV)
+
+    if not all(col in df.columns for col in columnas_obligatorias):
+        print("❌ Faltan columnas necesarias en el dataset. Revisa el archivo CSV.")
+        exit()
+
+    # Limpiar filas con valores nulos
+    return df[columnas_obligatorias].dropna()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Entrena el modelo híbrido")
+    parser.add_argument("--refrescar", action="store_true", help="vuelve a leer el dataset aunque haya caché")
+    parser.add_argument("--pliegues", type=int, default=5)
+    parser.add_argument("--procesos", type=int, default=None, help="por defecto, todos los núcleos")
+    args = parser.parse_args()
+
+    # La caché cambia sola si generar_dataset_hibrido.py reescribe alguna partición
+    archivos = list(particiones().values()) or [CSV]
+    origen = {"archivos": firma_archivos(archivos)}
+    df = caracteristicas("hibrido", clave_origen(origen), extraer, args.refrescar)
+
+    # Separar variables
+    X = df[COLUMNAS_MODELO]
+    y = df["NivelHeuristico"]  # 0 = Bajo, 1 = Medio, 2 = Alto
+
+    entrenar("hibrido", X, y, RAIZ / "modelo_hibrido.pkl", pliegues=args.pliegues, procesos=args.procesos,
+             origen=origen)
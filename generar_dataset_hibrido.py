@@ -1,90 +1,136 @@
+"""
+Extrae el dataset del modelo híbrido a dataset_hibrido/ (Arrow particionado
+por año de ingreso, ver backend/dataset_hibrido.py).
+
+La consulta se lee por tramos; cada fila se hashea y solo se guardan las de
+estudiantes nuevos o modificados. Al final se reescriben únicamente las
+particiones de años con cambios (o con estudiantes que ya no existen), una
+a la vez, así que la memoria no depende del tamaño de la cohorte.
+
+    python generar_dataset_hibrido.py [--tramo 20000] [--completo] [--csv]
+"""
+import argparse
+import shutil
+
+import numpy as np
 import pandas as pd
-import pyodbc
-import os
-from dotenv import load_dotenv
-
-# Cargar variables de entorno (.env)
-load_dotenv()
-
-# Conexión a SQL Server
-conn = pyodbc.connect(
-    f"DRIVER={{ODBC Driver 17 for SQL Server}};"
-    f"SERVER={os.getenv('DB_SERVER')};"
-    f"DATABASE={os.getenv('DB_NAME')};"
-    f"UID={os.getenv('DB_USER')};"
-    f"PWD={os.getenv('DB_PASSWORD')}"
-)
+import pyarrow as pa
+import pyarrow.compute as pc
 
-# Consulta SQL con lógica de ramos reprobados
-query = """
-WITH RamosConNotasCriticas AS (
-    SELECT 
-        RUT,
-        COUNT(DISTINCT [Denominación Actividad Curricular]) AS RamosReprobados
-    FROM [dbo].[NotasPace2025]
-    CROSS APPLY (
-        SELECT 
-            CASE WHEN ISNUMERIC(REPLACE([Nota_1], ',', '.')) = 1 THEN CAST(REPLACE([Nota_1], ',', '.') AS FLOAT) ELSE NULL END UNION ALL
-            SELECT CASE WHEN ISNUMERIC(REPLACE([Nota_2], ',', '.')) = 1 THEN CAST(REPLACE([Nota_2], ',', '.') AS FLOAT) ELSE NULL END UNION ALL
-            SELECT CASE WHEN ISNUMERIC(REPLACE([Nota_3], ',', '.')) = 1 THEN CAST(REPLACE([Nota_3], ',', '.') AS FLOAT) ELSE NULL END UNION ALL
-            SELECT CASE WHEN ISNUMERIC(REPLACE([Nota_4], ',', '.')) = 1 THEN CAST(REPLACE([Nota_4], ',', '.') AS FLOAT) ELSE NULL END UNION ALL
-            SELECT CASE WHEN ISNUMERIC(REPLACE([Nota_5], ',', '.')) = 1 THEN CAST(REPLACE([Nota_5], ',', '.') AS FLOAT) ELSE NULL END UNION ALL
-            SELECT CASE WHEN ISNUMERIC(REPLACE([Nota_6], ',', '.')) = 1 THEN CAST(REPLACE([Nota_6], ',', '.') AS FLOAT) ELSE NULL END
-    ) AS Notas(nota)
-    WHERE nota IS NOT NULL AND nota < 4.0
-    GROUP BY RUT
+from backend.dataset_hibrido import (
+    COLUMNAS_EPAES, CONSULTA, ESQUEMA, ORIGEN, RUTA,
+    escribir_archivo, escribir_particion, leer_dataset, leer_particion, particiones,
 )
-SELECT 
-    p.RUT,
-    p.[NOMBRE COMPLETO],
-    p.Carrera,
-    ISNULL(r.RamosReprobados, 0) AS RamosReprobados,
-    e.[PROMEDIO AUTOEFICACIA ACADÉMICA] AS Autoeficacia,
-    e.[PROMEDIO MODULACIÓN EMOCIONAL] AS Emocional,
-    e.[PROMEDIO AUTODETERMINACIÓN PERSONAL] AS Autodeterminacion,
-    e.[PROMEDIO SOCIABILIDAD] AS Sociabilidad,
-    e.[PROMEDIO PROSPECTIVA ACADÉMICA] AS Prospectiva
-FROM [dbo].[PACE2024_ACTUALIZADO] p
-LEFT JOIN RamosConNotasCriticas r ON p.RUT = r.RUT
-LEFT JOIN [dbo].[Epaes$] e ON CAST(p.RUT AS VARCHAR) = CAST(e.RUT AS VARCHAR)
-"""
+from backend.db import get_connection
+from backend.perfil_estudiante import clave_rut
+from backend.reglas_riesgo import evaluar_heuristico
+
+STAGING = RUTA / "_staging"
+
+
+# Aplicar lógica heurística (vectorizada; NivelHeuristico: 0 = Bajo, 1 = Medio, 2 = Alto)
+def evaluar_heuristica(df):
+    puntaje, nivel, _ = evaluar_heuristico(
+        df["RamosReprobados"].to_numpy(dtype=float),
+        df[COLUMNAS_EPAES].to_numpy(dtype=float),
+    )
+    df["PuntajeHeuristico"] = puntaje
+    df["NivelHeuristico"] = nivel
+    return df
+
+
+def preparar_tramo(df):
+    """Tipos del esquema, heurística y hash de las columnas de origen."""
+    df = df.assign(RUT=df["RUT"].map(clave_rut)).drop_duplicates("RUT")
+    df["AnioIngreso"] = pd.to_numeric(df["AnioIngreso"], errors="coerce").astype("Int32")
+    df["RamosReprobados"] = df["RamosReprobados"].fillna(0).astype("int32")
+    df[COLUMNAS_EPAES] = df[COLUMNAS_EPAES].astype("float64")
+    df["_hash"] = pd.util.hash_pandas_object(df[ORIGEN.names], index=False).to_numpy(dtype=np.uint64)
+    return evaluar_heuristica(df)
+
+
+def indice_actual():
+    """{rut: (anio, hash)} de lo ya extraído; solo lee dos columnas."""
+    indice = {}
+    for anio, ruta in particiones().items():
+        tabla = leer_particion(ruta, ["RUT", "_hash"])
+        indice.update(zip(tabla["RUT"].to_pylist(), ((anio, h) for h in tabla["_hash"].to_pylist())))
+    return indice
+
+
+def _anio(valor):
+    return None if pd.isna(valor) else int(valor)
+
+
+def extraer(tramo=20000, completo=False):
+    # Con `completo` se ignora lo ya extraído, pero no se borra antes de leer:
+    # las particiones se reemplazan al final, igual que en la incremental, así
+    # que una extracción fallida deja el dataset anterior intacto
+    existentes = particiones()
+    indice = {} if completo else indice_actual()
+    STAGING.mkdir(parents=True, exist_ok=True)
+
+    vistos = set()
+    cambiados = {}  # rut -> año nuevo
+    anios_tocados = set()
+    leidos = 0
+    archivos = []
+
+    # 1️⃣ Leer por tramos y guardar aparte solo las filas nuevas o modificadas
+    with get_connection() as conn:
+        for n, df in enumerate(pd.read_sql(CONSULTA, conn, chunksize=tramo)):
+            df = preparar_tramo(df)
+            df = df[~df["RUT"].isin(vistos)]  # repetido en un tramo anterior
+            leidos += len(df)
+            vistos.update(df["RUT"])
+            anteriores = df["RUT"].map(lambda r: indice.get(r, (None, None))[1])
+            df = df[anteriores.to_numpy() != df["_hash"].to_numpy()]
+            if df.empty:
+                continue
+            for rut, anio in zip(df["RUT"], df["AnioIngreso"]):
+                cambiados[rut] = _anio(anio)
+                anios_tocados.add(_anio(anio))
+                if rut in indice:
+                    anios_tocados.add(indice[rut][0])  # cambió de año o de datos
+            archivo = STAGING / f"tramo-{n:05d}.arrow"
+            escribir_archivo(pa.Table.from_pandas(df[ESQUEMA.names], schema=ESQUEMA, preserve_index=False), archivo)
+            archivos.append(archivo)
+
+    # 2️⃣ Estudiantes que ya no vienen en la consulta
+    eliminados = {rut for rut in indice if rut not in vistos}
+    anios_tocados.update(indice[rut][0] for rut in eliminados)
+    if completo:
+        anios_tocados.update(existentes)  # se reescriben todas, solo con lo recién leído
+
+    # 3️⃣ Reescribir solo las particiones con cambios, una a la vez
+    quitar = pa.array(list(cambiados) + list(eliminados), type=pa.string())
+    for anio in anios_tocados:
+        partes = []
+        if anio in existentes and not completo:
+            actual = leer_particion(existentes[anio], mapear=False)
+            partes.append(actual.filter(pc.invert(pc.is_in(actual["RUT"], value_set=quitar))))
+        for archivo in archivos:
+            staged = leer_particion(archivo)
+            mascara = pc.is_null(staged["AnioIngreso"]) if anio is None else pc.equal(staged["AnioIngreso"], anio)
+            partes.append(staged.filter(pc.fill_null(mascara, False)))
+        tabla = pa.concat_tables(partes) if partes else ESQUEMA.empty_table()
+        if tabla.num_rows or anio in existentes:
+            escribir_particion(tabla, anio)
+
+    shutil.rmtree(STAGING, ignore_errors=True)
+    print(f"✅ {leidos} estudiantes leídos: {len(cambiados)} nuevos o modificados, "
+          f"{len(eliminados)} eliminados, {len(anios_tocados)} particiones reescritas en {RUTA}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Extrae el dataset del modelo híbrido")
+    parser.add_argument("--tramo", type=int, default=20000, help="filas por tramo de lectura")
+    parser.add_argument("--completo", action="store_true", help="descarta lo extraído y vuelve a generar todo")
+    parser.add_argument("--csv", action="store_true", help="además exporta dataset_hibrido.csv")
+    args = parser.parse_args()
 
-# Cargar los datos
-df = pd.read_sql(query, conn)
-
-# Aplicar lógica heurística
-def evaluar_heuristica(row):
-    puntaje = 0
-
-    ramos = row["RamosReprobados"] if not pd.isna(row["RamosReprobados"]) else 0
-    if ramos == 1:
-        puntaje += 1
-    elif ramos >= 2:
-        puntaje += 2
-
-    if pd.notna(row["Autoeficacia"]) and row["Autoeficacia"] < 3.0:
-        puntaje += 1
-    if pd.notna(row["Emocional"]) and row["Emocional"] < 3.0:
-        puntaje += 1
-    if pd.notna(row["Autodeterminacion"]) and row["Autodeterminacion"] < 3.0:
-        puntaje += 1
-    if pd.notna(row["Sociabilidad"]) and row["Sociabilidad"] < 3.0:
-        puntaje += 1
-    if pd.notna(row["Prospectiva"]) and row["Prospectiva"] < 3.0:
-        puntaje += 1
-
-    if puntaje <= 1:
-        nivel = 0  # Bajo
-    elif puntaje == 2:
-        nivel = 1  # Medio
-    else:
-        nivel = 2  # Alto
-
-    return pd.Series([puntaje, nivel])
-
-# Agregar columnas al DataFrame
-df[["PuntajeHeuristico", "NivelHeuristico"]] = df.apply(evaluar_heuristica, axis=1)
-
-# Guardar CSV
-df.to_csv("dataset_hibrido.csv", index=False, encoding="utf-8-sig")
-print("✅ Dataset guardado como dataset_hibrido.csv")
+    extraer(args.tramo, args.completo)
+    if args.csv:
+        columnas = [c for c in ESQUEMA.names if c not in ("AnioIngreso", "_hash")]
+        leer_dataset(columnas).to_pandas().to_csv("dataset_hibrido.csv", index=False, encoding="utf-8-sig")
+        print("✅ Dataset guardado como dataset_hibrido.csv")
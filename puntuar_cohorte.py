@@ -0,0 +1,135 @@
+"""
+Puntuación nocturna de toda la cohorte.
+
+Recorre PACE2024_ACTUALIZADO por tramos (`read_sql(chunksize=...)`) y para
+cada tramo:
+- calcula el riesgo académico, psicológico, interseccional y global con las
+  reglas vectorizadas: ramos y Epaes vienen en la misma consulta del tramo
+  (backend/dataset_hibrido.CONSULTA, la del dataset híbrido) y el resto se
+  carga por conjunto,
+- predice el riesgo híbrido con un solo `predict_proba` para todo el tramo,
+- escribe con fast_executemany el nivel híbrido en EvaluacionRiesgo (lo que
+  lee /riesgos_calculados) y las tres dimensiones + global en EvaluacionDeRut.
+
+Ambas tablas son historiales: cada corrida agrega una fila por estudiante,
+todas con la misma FechaEvaluacion (el inicio de la corrida), y quienes las
+leen (/riesgos_calculados, /riesgo_hibrido, la última evaluación del perfil)
+toman la más reciente de cada RUT.
+
+La memoria depende del tamaño del tramo, no de la cohorte.
+
+    python puntuar_cohorte.py [--tramo 5000] [--simular]
+"""
+import argparse
+import time
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from backend.dataset_hibrido import COLUMNAS_EPAES, CONSULTA
+from backend.db import get_connection
+from backend.evaluaciones import fila_evaluacion, insertar_evaluaciones
+from backend.modelos import registro
+from backend.perfil_estudiante import Epaes, cargar_perfiles, clave_rut, SECCIONES_GLOBAL
+from backend.predictor_hibrido import COLUMNAS_MODELO
+from backend.recomendaciones import catalogo
+from backend.reglas_riesgo import NIVELES, evaluar_heuristico
+from backend.riesgo_global import evaluar_riesgo_global_lote
+
+# Datos, ramos y Epaes ya vienen en cada tramo de CONSULTA: a la BD solo se
+# le pide el resto de lo que usa el riesgo global
+SECCIONES_TRAMO = tuple(s for s in SECCIONES_GLOBAL if s not in ("datos", "ramos", "epaes"))
+
+QUERY_INSERT_RIESGO = """
+    INSERT INTO [dbo].[EvaluacionRiesgo] (Run, NombreCompleto, Carrera, NivelRiesgo, FechaEvaluacion)
+    VALUES (?, ?, ?, ?, ?);
+"""
+
+
+def predecir_hibrido(modelo, df):
+    """Nivel híbrido de todo el tramo con un solo predict_proba."""
+    puntaje, _, _ = evaluar_heuristico(
+        df["RamosReprobados"].to_numpy(dtype=float),
+        df[COLUMNAS_EPAES].to_numpy(dtype=float),
+    )
+    X = df[COLUMNAS_MODELO[:-1]].assign(PuntajeHeuristico=puntaje)[COLUMNAS_MODELO]
+    probabilidades = modelo.predict_proba(X)
+    clases = modelo.classes_[np.argmax(probabilidades, axis=1)]
+    return NIVELES[clases]
+
+
+def completar_perfiles(perfiles, df):
+    """Llena datos, ramos y Epaes de cada perfil con las columnas del tramo.
+    Sin fila en Epaes$ las cinco columnas vienen NULL y el perfil queda sin
+    Epaes, igual que si se cargara con cargar_perfiles."""
+    epaes = df[COLUMNAS_EPAES].astype(float)
+    con_epaes = epaes.notna().any(axis=1).tolist()
+    epaes = epaes.astype(object).where(epaes.notna(), None).itertuples(index=False, name=None)
+    for rut, nombre, carrera, ramos, hay_epaes, valores in zip(
+        df["RUT"], df["NOMBRE COMPLETO"], df["Carrera"], df["RamosReprobados"], con_epaes, epaes
+    ):
+        perfil = perfiles[rut]
+        perfil.datos = {"RUT": rut, "NOMBRE COMPLETO": nombre, "Carrera": carrera}
+        perfil.ramos_reprobados = int(ramos or 0)
+        perfil.epaes = Epaes(*valores) if hay_epaes else None
+
+
+def puntuar_tramo(conn, modelo, df, fecha, simular=False):
+    ruts = df["RUT"].tolist()
+    niveles_hibridos = predecir_hibrido(modelo, df)
+
+    perfiles = cargar_perfiles(conn, ruts, SECCIONES_TRAMO)
+    completar_perfiles(perfiles, df)
+    catalogo.preparar(conn)
+    resultados = evaluar_riesgo_global_lote([perfiles[rut] for rut in ruts])
+
+    if simular:
+        return
+    cursor = conn.cursor()
+    cursor.fast_executemany = True
+    cursor.executemany(QUERY_INSERT_RIESGO, [
+        (*fila, fecha) for fila in zip(
+            ruts, df["NOMBRE COMPLETO"].tolist(), df["Carrera"].tolist(), niveles_hibridos.tolist()
+        )
+    ])
+    cursor.close()
+    # insertar_evaluaciones hace el commit de ambas tablas
+    insertar_evaluaciones(conn, [fila_evaluacion(r, fecha) for r in resultados])
+
+
+def puntuar_cohorte(tramo=5000, simular=False):
+    modelo = registro.obtener("hibrido").modelo
+    total = 0
+    inicio = time.perf_counter()
+    fecha = datetime.now()
+    vistos = set()
+
+    # Una conexión lee el cursor por tramos y otra carga perfiles y escribe
+    with get_connection() as lectura, get_connection() as escritura:
+        for df in pd.read_sql(CONSULTA, lectura, chunksize=tramo):
+            # Un RUT repetido (p. ej. por el JOIN con Epaes$) puede caer en
+            # otro tramo: se puntúa una sola vez por corrida
+            claves = df["RUT"].map(clave_rut)
+            nuevos = ~claves.isin(vistos) & ~claves.duplicated()
+            df = df[nuevos.to_numpy()]
+            vistos.update(claves[nuevos])
+            if df.empty:
+                continue
+            inicio_tramo = time.perf_counter()
+            puntuar_tramo(escritura, modelo, df, fecha, simular)
+            total += len(df)
+            segundos = time.perf_counter() - inicio_tramo
+            print(f"  {total:>9} estudiantes   tramo: {len(df) / segundos:,.0f} est/s")
+
+    segundos = time.perf_counter() - inicio
+    print(f"✅ {total} estudiantes puntuados en {segundos:.1f} s ({total / max(segundos, 1e-9):,.0f} est/s)")
+    return total
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Puntúa toda la cohorte y guarda los niveles de riesgo")
+    parser.add_argument("--tramo", type=int, default=5000, help="estudiantes por tramo")
+    parser.add_argument("--simular", action="store_true", help="calcula todo pero no escribe en la BD")
+    args = parser.parse_args()
+    puntuar_cohorte(args.tramo, args.simular)
@@ -0,0 +1,22 @@
+import shutil
+
+import pytest
+
+from backend import bd_falsa, cohorte_sintetica
+
+
+@pytest.fixture(scope="session")
+def cohorte(tmp_path_factory):
+    """Base falsa con una cohorte sintética chica, generada una vez por sesión."""
+    ruta = tmp_path_factory.mktemp("cohorte") / "cohorte.db"
+    return cohorte_sintetica.generar(ruta, 300, informar=lambda *_: None)
+
+
+@pytest.fixture
+def conn(cohorte, tmp_path):
+    """Conexión a una copia propia de la cohorte: cada prueba puede escribir."""
+    ruta = tmp_path / "cohorte.db"
+    shutil.copyfile(cohorte, ruta)
+    conexion = bd_falsa.conectar(ruta)
+    yield conexion
+    conexion.close()
@@ -0,0 +1,51 @@
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.ensemble import ExtraTreesClassifier, RandomForestClassifier
+from sklearn.linear_model import LogisticRegression
+
+from backend import bosque_compilado
+from backend.bosque_compilado import ModeloNoCompilableError, compilar
+
+
+def datos(filas=600, semilla=0):
+    """Tres clases, columnas con nombre y algunos NaN (van por missing_go_to_left)."""
+    rng = np.random.default_rng(semilla)
+    X = pd.DataFrame(rng.normal(size=(filas, 6)), columns=[f"c{i}" for i in range(6)])
+    y = np.array(["Bajo", "Medio", "Alto"])[(X["c0"] + X["c1"] > 0).to_numpy(int) + (X["c2"] > 1).to_numpy(int)]
+    X = X.mask(rng.random(X.shape) < 0.05)
+    return X, y
+
+
+@pytest.mark.parametrize("clase", [RandomForestClassifier, ExtraTreesClassifier])
+def test_predict_proba_identico(clase):
+    X, y = datos()
+    modelo = clase(n_estimators=25, max_depth=8, random_state=0).fit(X, y)
+    bosque = compilar(modelo)
+
+    X_nuevo, _ = datos(filas=400, semilla=1)
+    assert np.array_equal(bosque.predict_proba(X_nuevo), modelo.predict_proba(X_nuevo))
+    assert np.array_equal(bosque.predict(X_nuevo), modelo.predict(X_nuevo))
+    # Una sola fila como arreglo, igual que en los endpoints
+    fila = X_nuevo.iloc[[0]]
+    assert np.array_equal(bosque.predict_proba(fila.to_numpy()[0]), modelo.predict_proba(fila))
+    bosque_compilado.verificar(modelo, bosque)
+
+
+def test_guardar_y_cargar(tmp_path):
+    X, y = datos()
+    modelo = RandomForestClassifier(n_estimators=10, random_state=0).fit(X, y)
+    ruta = tmp_path / "modelo.npz"
+    bosque_compilado.guardar(compilar(modelo), ruta, "abc")
+
+    cargado = bosque_compilado.cargar(ruta, "abc")
+    assert cargado.columnas == list(X.columns)
+    assert np.array_equal(cargado.predict_proba(X), modelo.predict_proba(X))
+    # Compilado desde otro .pkl: no se usa
+    assert bosque_compilado.cargar(ruta, "otro") is None
+
+
+def test_no_compilable():
+    X, y = datos()
+    with pytest.raises(ModeloNoCompilableError):
+        compilar(LogisticRegression().fit(X.fillna(0), y))
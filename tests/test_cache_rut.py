@@ -0,0 +1,43 @@
+import asyncio
+
+from backend.cache_rut import CacheRut
+
+
+def test_guardar_tras_invalidar_no_pisa():
+    cache = CacheRut()
+    generacion = cache.generacion("12345678")
+    # Una escritura invalida el RUT mientras se calculaba la respuesta
+    cache.invalidar(12345678)
+    cache.guardar("global", "12345678", {"riesgo": "viejo"}, generacion)
+    assert cache.obtener("global", "12345678") is None
+
+    cache.guardar("global", "12345678", {"riesgo": "nuevo"}, cache.generacion("12345678"))
+    assert cache.obtener("global", 12345678) == {"riesgo": "nuevo"}
+
+
+def test_invalidar_borra_todos_los_endpoints_del_rut():
+    cache = CacheRut()
+    cache.guardar("global", "1", {"a": 1})
+    cache.guardar("academico", "1", {"b": 2})
+    cache.guardar("global", "2", {"c": 3})
+    cache.invalidar("1")
+    assert cache.obtener("global", "1") is None
+    assert cache.obtener("academico", "1") is None
+    assert cache.obtener("global", "2") == {"c": 3}
+
+
+def test_decorador_no_guarda_lo_calculado_antes_de_invalidar():
+    cache = CacheRut()
+    llamadas = []
+
+    @cache.por_rut("global")
+    async def endpoint(rut):
+        llamadas.append(rut)
+        if len(llamadas) == 1:
+            cache.invalidar(rut)  # p. ej. un POST de factores en paralelo
+        return {"llamada": len(llamadas)}
+
+    assert asyncio.run(endpoint("7")) == {"llamada": 1}
+    assert asyncio.run(endpoint("7")) == {"llamada": 2}
+    assert asyncio.run(endpoint("7")) == {"llamada": 2}
+    assert len(llamadas) == 2
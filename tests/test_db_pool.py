@@ -0,0 +1,111 @@
+import sqlite3
+import time
+
+import pytest
+
+from backend.db import ConnectionPool, PoolTimeoutError
+
+
+def fabrica(ruta):
+    """Conexiones sqlite3 a un mismo archivo, con la tabla de prueba creada."""
+    def crear():
+        conn = sqlite3.connect(ruta, check_same_thread=False)
+        conn.execute("CREATE TABLE IF NOT EXISTS t (x INTEGER)")
+        conn.commit()
+        return conn
+    return crear
+
+
+@pytest.fixture
+def ruta(tmp_path):
+    return str(tmp_path / "pool.db")
+
+
+def cerrada(conn):
+    try:
+        conn.execute("SELECT 1")
+    except sqlite3.ProgrammingError:
+        return True
+    return False
+
+
+def test_reutiliza_la_ultima_devuelta(ruta):
+    pool = ConnectionPool(fabrica(ruta), max_size=3)
+    with pool.connection() as a, pool.connection() as b:
+        pass
+    # Al salir se devuelve b y después a: a es la primera en volver a salir (LIFO)
+    with pool.connection() as c:
+        assert c is a
+    with pool.connection() as primera, pool.connection() as segunda:
+        assert (primera, segunda) == (a, b)
+    assert pool.stats()["creadas"] == 2
+    assert pool.stats()["reutilizadas"] == 3
+
+
+def test_expira_las_libres_por_max_idle(ruta):
+    pool = ConnectionPool(fabrica(ruta), max_size=2, max_idle=0.05)
+    with pool.connection() as vieja:
+        pass
+    time.sleep(0.1)
+    with pool.connection() as nueva:
+        assert nueva is not vieja
+    assert cerrada(vieja)
+    assert pool.stats()["expiradas"] == 1
+
+
+def test_ping_solo_tras_ping_after(ruta):
+    pool = ConnectionPool(fabrica(ruta), max_size=1, ping_after=60.0)
+    with pool.connection() as conn:
+        pass
+    conn.close()
+    # Libre hace menos de ping_after: se entrega sin verificar
+    with pool.connection() as mismo:
+        assert mismo is conn
+
+    pool = ConnectionPool(fabrica(ruta), max_size=1, ping_after=0.0)
+    with pool.connection() as conn:
+        pass
+    conn.close()
+    # El ping falla: se descarta y se abre otra
+    with pool.connection() as otra:
+        assert otra is not conn
+        assert otra.execute("SELECT 1").fetchone() == (1,)
+    assert pool.stats()["descartadas"] == 1
+    assert pool.stats()["creadas"] == 2
+
+
+def test_rollback_al_devolver(ruta):
+    pool = ConnectionPool(fabrica(ruta), max_size=1)
+    with pool.connection() as conn:
+        conn.execute("INSERT INTO t VALUES (1)")
+    with pool.connection() as mismo:
+        assert mismo is conn
+        assert mismo.execute("SELECT COUNT(*) FROM t").fetchone() == (0,)
+
+
+def test_timeout_con_el_pool_agotado(ruta):
+    pool = ConnectionPool(fabrica(ruta), max_size=1, timeout=0.05)
+    with pool.connection():
+        inicio = time.monotonic()
+        with pytest.raises(PoolTimeoutError):
+            with pool.connection():
+                pass
+        assert time.monotonic() - inicio >= 0.05
+    assert pool.stats()["timeouts"] == 1
+    assert pool.stats()["en_uso"] == 0
+
+
+def test_close(ruta):
+    pool = ConnectionPool(fabrica(ruta), max_size=2)
+    with pool.connection() as en_uso, pool.connection() as libre:
+        pass
+    with pool.connection() as en_uso:
+        assert en_uso is not libre
+        pool.close()
+        assert cerrada(libre)
+        assert not cerrada(en_uso)
+    # La que estaba en uso se cierra al devolverla
+    assert cerrada(en_uso)
+    with pytest.raises(RuntimeError):
+        with pool.connection():
+            pass
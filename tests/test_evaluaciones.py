@@ -0,0 +1,80 @@
+from datetime import datetime
+
+import pytest
+
+from backend.evaluaciones import BufferEvaluaciones, insertar_evaluaciones
+
+
+def fila(rut, nivel="Bajo", fecha=None):
+    return (rut, f"Estudiante {rut}", "Derecho", nivel, nivel, "Bajo", "Bajo", fecha or datetime.now())
+
+
+def filas_en_bd(conn):
+    return conn.execute("SELECT Run, NivelRiesgo FROM dbo.EvaluacionDeRut WHERE Run LIKE 'T%' ORDER BY Id").fetchall()
+
+
+@pytest.fixture
+def buffers():
+    # Intervalo largo: el hilo no escribe solo, las pruebas llaman vaciar()
+    creados = []
+
+    def crear(escribir, **opciones):
+        buffer = BufferEvaluaciones(escribir, intervalo_ms=60000.0, **opciones)
+        creados.append(buffer)
+        return buffer
+
+    yield crear
+    for buffer in creados:
+        buffer.cerrar()
+
+
+def test_colapsa_evaluaciones_repetidas(conn, buffers):
+    buffer = buffers(lambda filas: insertar_evaluaciones(conn, filas))
+    buffer.agregar(fila("T1"))
+    buffer.agregar(fila("T1"))               # mismos niveles, otra fecha
+    buffer.agregar(fila("T1", nivel="Alto"))  # cambió un nivel
+    buffer.agregar(fila("T2"))
+    assert buffer.vaciar() == 0
+    assert filas_en_bd(conn) == [("T1", "Bajo"), ("T1", "Alto"), ("T2", "Bajo")]
+    assert buffer.stats()["colapsadas"] == 1
+
+
+def test_sin_colapso_fuera_de_la_ventana(conn, buffers):
+    buffer = buffers(lambda filas: insertar_evaluaciones(conn, filas), colapso=0.0)
+    buffer.agregar(fila("T1"))
+    buffer.agregar(fila("T1"))
+    buffer.vaciar()
+    assert len(filas_en_bd(conn)) == 2
+
+
+def test_reencola_si_falla_la_escritura(conn, buffers):
+    caida = True
+
+    def escribir(filas):
+        if caida:
+            raise ConnectionError("BD caída")
+        insertar_evaluaciones(conn, filas)
+
+    buffer = buffers(escribir, max_filas=2)
+    for rut in ("T1", "T2", "T3"):
+        buffer.agregar(fila(rut))
+    assert buffer.vaciar() == 3
+    assert buffer.stats()["errores"] == 1
+    assert "BD caída" in buffer.stats()["ultimo_error"]
+    assert filas_en_bd(conn) == []
+
+    caida = False
+    assert buffer.vaciar() == 0
+    # Vuelven al inicio de la cola: se escriben en el orden en que llegaron
+    assert [r for r, _ in filas_en_bd(conn)] == ["T1", "T2", "T3"]
+    assert buffer.stats()["lotes"] == 2
+
+
+def test_descarta_las_mas_antiguas_sobre_max_pendientes(buffers):
+    escritas = []
+    buffer = buffers(escritas.extend, max_pendientes=2)
+    for rut in ("T1", "T2", "T3"):
+        buffer.agregar(fila(rut))
+    buffer.vaciar()
+    assert [f[0] for f in escritas] == ["T2", "T3"]
+    assert buffer.stats()["descartadas"] == 1
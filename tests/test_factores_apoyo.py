@@ -0,0 +1,57 @@
+from backend.factores_apoyo import ACADEMICOS, PSICOLOGICOS, registrar_factor, registrar_factores
+
+
+def factor(conn, tabla, rut):
+    return conn.execute(
+        f"SELECT nivel_riesgo, esta_recibiendo_apoyo, nombre_profesional FROM dbo.{tabla.nombre} WHERE rut_estudiante = ?",
+        rut,
+    ).fetchone()
+
+
+def rut_con_factor(conn, tabla):
+    return conn.execute(f"SELECT TOP 1 rut_estudiante FROM dbo.{tabla.nombre}").fetchone()[0]
+
+
+def test_resultados_del_merge(conn):
+    existente = rut_con_factor(conn, PSICOLOGICOS)
+    registros = [
+        {"rut": "90000001", "nivel_riesgo": "Alto", "esta_apoyo": True, "profesional": "Ps. Uno"},
+        {"rut": existente, "nivel_riesgo": "Medio", "esta_apoyo": 1, "profesional": "Ps. Dos"},
+        {"rut": "90000002", "nivel_riesgo": "Bajo"},
+        {"rut": 90000002, "nivel_riesgo": "Medio"},  # mismo RUT como número: gana este
+        {"nivel_riesgo": "Alto"},
+        {"rut": "90000003", "esta_apoyo": "sí"},
+        "no es un objeto",
+    ]
+    resultados = registrar_factores(conn, PSICOLOGICOS, registros)
+
+    assert [r["resultado"] for r in resultados] == [
+        "insertado", "actualizado", "duplicado", "insertado", "invalido", "invalido", "invalido",
+    ]
+    assert [r["fila"] for r in resultados] == list(range(len(registros)))
+    assert resultados[4]["detalle"] == "Falta el RUT"
+    assert resultados[5]["detalle"] == "esta_apoyo debe ser booleano o entero"
+
+    assert factor(conn, PSICOLOGICOS, "90000001") == ("Alto", 1, "Ps. Uno")
+    assert factor(conn, PSICOLOGICOS, existente) == ("Medio", 1, "Ps. Dos")
+    # Sin esta_apoyo se guarda 0, no NULL
+    assert factor(conn, PSICOLOGICOS, "90000002") == ("Medio", 0, None)
+    assert factor(conn, PSICOLOGICOS, "90000003") is None
+
+
+def test_lote_repetido_actualiza(conn):
+    registros = [{"rut": "90000001", "nivel_riesgo": "Alto"}, {"rut": "90000004", "nivel_riesgo": "Bajo"}]
+    assert [r["resultado"] for r in registrar_factores(conn, ACADEMICOS, registros)] == ["insertado"] * 2
+    registros[0]["nivel_riesgo"] = "Bajo"
+    assert [r["resultado"] for r in registrar_factores(conn, ACADEMICOS, registros)] == ["actualizado"] * 2
+    assert factor(conn, ACADEMICOS, "90000001") == ("Bajo", 0, None)
+
+
+def test_lote_sin_registros_validos(conn):
+    assert [r["resultado"] for r in registrar_factores(conn, ACADEMICOS, [{}, {"rut": ""}])] == ["invalido"] * 2
+
+
+def test_registro_individual(conn):
+    assert registrar_factor(conn, ACADEMICOS, {"rut": 90000005, "nivel_riesgo": "Medio"}) == "insertado"
+    assert registrar_factor(conn, ACADEMICOS, {"rut": "90000005", "esta_apoyo": True}) == "actualizado"
+    assert factor(conn, ACADEMICOS, "90000005") == (None, 1, None)
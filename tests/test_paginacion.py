@@ -0,0 +1,109 @@
+import pytest
+from fastapi.testclient import TestClient
+
+from backend import bd_falsa, db
+from backend.main import app, LISTADO_ESTUDIANTES, LISTADO_RIESGOS
+from backend.paginacion import CursorInvalidoError, Listado, leer_cursor, siguiente
+
+
+def leer(conn, sql, params):
+    cursor = conn.cursor()
+    cursor.execute(sql, params)
+    columnas = [d[0] for d in cursor.description]
+    filas = [dict(zip(columnas, fila)) for fila in cursor.fetchall()]
+    cursor.close()
+    return filas
+
+
+def paginar(conn, listado, por_pagina, columnas=None, filtros=None):
+    """Todas las páginas siguiendo el cursor, como un cliente con X-Siguiente."""
+    paginas, despues_de = [], None
+    while True:
+        sql, params = listado.consulta(columnas, filtros, despues_de, por_pagina)
+        filas = leer(conn, sql, params)
+        paginas.append(filas)
+        despues_de = siguiente(listado, filas, por_pagina)
+        if despues_de is None:
+            return paginas
+
+
+@pytest.mark.parametrize("listado, clave", [(LISTADO_ESTUDIANTES, "RUT"), (LISTADO_RIESGOS, "rut")])
+@pytest.mark.parametrize("por_pagina", [1, 37, 300, 5000])
+def test_recorre_todo_sin_repetir(conn, listado, clave, por_pagina):
+    todas = leer(conn, *listado.consulta())
+    paginas = paginar(conn, listado, por_pagina)
+    claves = [fila[clave] for pagina in paginas for fila in pagina]
+
+    assert all(len(pagina) <= por_pagina for pagina in paginas)
+    assert len(claves) == len(set(claves)) == len(todas)
+    assert claves == sorted(claves)
+    assert {f[clave]: f for p in paginas for f in p} == {f[clave]: f for f in todas}
+
+
+def test_riesgos_solo_la_ultima_evaluacion(conn):
+    runs = conn.execute("SELECT COUNT(*), COUNT(DISTINCT Run) FROM dbo.EvaluacionRiesgo").fetchone()
+    assert runs[0] > runs[1]  # la cohorte tiene historial
+    paginas = paginar(conn, LISTADO_RIESGOS, 50, ["rut", "fecha"])
+    assert sum(map(len, paginas)) == runs[1]
+    ultimas = {}
+    for run, fecha in conn.execute("SELECT Run, FechaEvaluacion FROM dbo.EvaluacionRiesgo").fetchall():
+        ultimas[run] = max(fecha, ultimas.get(run, fecha))
+    assert all(fila["fecha"] == ultimas[fila["rut"]] for pagina in paginas for fila in pagina)
+
+
+def test_con_filtro(conn):
+    carrera = conn.execute("SELECT TOP 1 Carrera FROM dbo.PACE2024_ACTUALIZADO").fetchone()[0]
+    filtros = {"carrera": carrera}
+    todas = leer(conn, *LISTADO_ESTUDIANTES.consulta(["RUT"], filtros))
+    paginas = paginar(conn, LISTADO_ESTUDIANTES, 7, ["RUT"], filtros)
+    assert sorted(f["RUT"] for p in paginas for f in p) == sorted(f["RUT"] for f in todas)
+
+
+def test_clave_compuesta(conn):
+    # Muchas filas por carrera: el cursor debe desempatar por RUT
+    listado = Listado(
+        origen="dbo.PACE2024_ACTUALIZADO",
+        columnas={"carrera": "[Carrera]", "rut": "[RUT]"},
+        clave=("carrera", "rut"),
+        filtros={},
+    )
+    todas = leer(conn, *listado.consulta())
+    paginas = paginar(conn, listado, 13)
+    claves = [(f["carrera"], f["rut"]) for p in paginas for f in p]
+    assert len(claves) == len(set(claves)) == len(todas)
+    assert claves == sorted(claves)
+
+
+def test_cursor_compuesto_invalido():
+    listado = Listado(origen="t", columnas={"a": "a", "b": "b"}, clave=("a", "b"), filtros={})
+    with pytest.raises(CursorInvalidoError):
+        leer_cursor(listado, '["solo uno"]')
+    with pytest.raises(CursorInvalidoError):
+        leer_cursor(listado, "no es json")
+
+
+@pytest.fixture
+def cliente(conn, tmp_path):
+    # El pool compartido abre la misma copia de la cohorte que `conn`
+    db.configure_pool(lambda: bd_falsa.conectar(tmp_path / "cohorte.db"), max_size=2)
+    yield TestClient(app)  # sin `with`: no corre el precalentamiento del arranque
+    db.configure_pool()
+
+
+@pytest.mark.parametrize("ruta, clave", [("/estudiantes", "RUT"), ("/riesgos_calculados", "rut")])
+def test_endpoints_con_x_siguiente(cliente, ruta, clave):
+    todas = cliente.get(ruta).json()
+    vistas, params = [], {"por_pagina": 40}
+    while True:
+        respuesta = cliente.get(ruta, params=params)
+        assert respuesta.status_code == 200
+        vistas += [fila[clave] for fila in respuesta.json()]
+        if "X-Siguiente" not in respuesta.headers:
+            break
+        params["despues_de"] = respuesta.headers["X-Siguiente"]
+    assert len(vistas) == len(set(vistas)) == len(todas)
+    assert set(vistas) == {fila[clave] for fila in todas}
+
+
+def test_endpoint_columna_invalida(cliente):
+    assert cliente.get("/estudiantes", params={"columnas": "RUT,NoExiste"}).status_code == 400
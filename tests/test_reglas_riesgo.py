@@ -0,0 +1,129 @@
+import itertools
+import warnings
+
+import pandas as pd
+import pytest
+
+from backend import evaluar_riesgo_heuristico as heuristico
+from backend.perfil_estudiante import cargar_perfiles, SECCIONES_GLOBAL
+from backend.recomendaciones import catalogo
+from backend.riesgo_academico import calcular_riesgo_academico
+from backend.riesgo_global import combinar_niveles, evaluar_riesgo_global_lote
+from backend.riesgo_interseccional import calcular_riesgo_interseccional, vulnerabilidades_desde_caracterizacion
+from backend.riesgo_psicologico import calcular_riesgo_psicologico
+
+# Funciones escalares anteriores al motor de reglas, tal como estaban
+
+def academico_anterior(ramos):
+    puntaje = 0
+    motivo = ""
+    if ramos == 1:
+        puntaje = 1
+        motivo = "1 ramo con nota menor a 4.0"
+    elif ramos >= 2:
+        puntaje = 2
+        motivo = f"{ramos} ramos con nota menor a 4.0"
+    nivel = "Bajo" if puntaje == 0 else "Medio" if puntaje == 1 else "Alto"
+    return puntaje, nivel, motivo
+
+
+MOTIVOS_PSICOLOGICOS = ("Autoeficacia baja", "Modulación emocional baja", "Autodeterminación baja",
+                        "Sociabilidad baja", "Prospectiva académica baja")
+
+
+def psicologico_anterior(*valores):
+    motivos = [m for v, m in zip(valores, MOTIVOS_PSICOLOGICOS) if v is not None and v < 3.0]
+    puntaje = len(motivos)
+    nivel = "Bajo" if puntaje <= 1 else "Medio" if puntaje == 2 else "Alto"
+    return puntaje, nivel, ", ".join(motivos)
+
+
+def interseccional_anterior(vulnerabilidades):
+    ponderaciones = [1, 2, 3, 2, 3, 1, 2, 2]
+    puntaje = sum(v * p for v, p in zip(vulnerabilidades, ponderaciones))
+    nivel = "Alto" if puntaje >= 8 else "Medio" if puntaje >= 5 else "Bajo"
+    factores_activados = [i for i, v in enumerate(vulnerabilidades) if v == 1]
+    return puntaje, nivel, f"Factores activados: {factores_activados}"
+
+
+def global_anterior(riesgos):
+    puntaje_total = sum({"Bajo": 1, "Medio": 2, "Alto": 3}.get(r, 0) for r in riesgos)
+    return "Bajo" if puntaje_total <= 4 else "Medio" if puntaje_total <= 6 else "Alto"
+
+
+def heuristico_anterior(fila):
+    ramos = fila["RamosReprobados"] if not pd.isna(fila["RamosReprobados"]) else 0
+    puntaje, motivos = 0, []
+    if ramos == 1:
+        puntaje += 1
+        motivos.append("1 ramo con nota menor a 4.0")
+    elif ramos >= 2:
+        puntaje += 2
+        motivos.append(f"{int(ramos)} ramos con nota menor a 4.0")
+    for columna, motivo in zip(heuristico.COLUMNAS_EPAES, MOTIVOS_PSICOLOGICOS):
+        if pd.notna(fila[columna]) and fila[columna] < 3.0:
+            puntaje += 1
+            motivos.append(motivo)
+    nivel = "Bajo" if puntaje <= 1 else "Medio" if puntaje == 2 else "Alto"
+    return puntaje, nivel, ", ".join(motivos)
+
+
+@pytest.mark.parametrize("ramos", range(7))
+def test_academico(ramos):
+    assert calcular_riesgo_academico(ramos) == academico_anterior(ramos)
+
+
+def test_psicologico():
+    # Alrededor del umbral 3.0, con NULL en cualquier posición
+    for valores in itertools.product([None, 1.0, 2.99, 3.0, 4.5], repeat=5):
+        assert calcular_riesgo_psicologico(*valores) == psicologico_anterior(*valores), valores
+
+
+def test_interseccional():
+    for vulnerabilidades in itertools.product([0, 1], repeat=8):
+        vulnerabilidades = list(vulnerabilidades)
+        assert calcular_riesgo_interseccional(vulnerabilidades) == interseccional_anterior(vulnerabilidades)
+    # Vectores más cortos o más largos que las ponderaciones, como con zip()
+    for vulnerabilidades in ([1, 1, 1], [1] * 10, []):
+        assert calcular_riesgo_interseccional(vulnerabilidades) == interseccional_anterior(vulnerabilidades)
+
+
+def test_combinar_niveles():
+    for riesgos in itertools.product(["Bajo", "Medio", "Alto", "Otro"], repeat=3):
+        assert combinar_niveles(list(riesgos)) == global_anterior(riesgos)
+
+
+def test_heuristico_vectorizado_en_la_cohorte(conn):
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")  # pandas avisa que la conexión no es de SQLAlchemy
+        df = pd.read_sql(heuristico.query, conn)
+    esperado = [heuristico_anterior(fila) for _, fila in df.iterrows()]
+    heuristico.evaluar_riesgo(df)
+    obtenido = list(zip(df["Puntaje"].astype(int), df["NivelRiesgo"], df["Motivos"]))
+    assert obtenido == esperado
+    assert {"Bajo", "Medio", "Alto"} <= set(df["NivelRiesgo"])
+
+
+def test_global_lote_igual_a_las_escalares(conn):
+    ruts = [fila[0] for fila in conn.execute("SELECT RUT FROM dbo.PACE2024_ACTUALIZADO").fetchall()]
+    perfiles = list(cargar_perfiles(conn, ruts, SECCIONES_GLOBAL).values())
+    catalogo.preparar(conn)
+
+    for perfil, resultado in zip(perfiles, evaluar_riesgo_global_lote(perfiles)):
+        riesgos = resultado["riesgos"]
+        _, nivel_a, _ = academico_anterior(perfil.ramos_reprobados)
+        if perfil.epaes is not None:
+            puntaje_p, nivel_p, motivos_p = psicologico_anterior(*perfil.epaes)
+            assert riesgos["psicologico"]["motivos"] == motivos_p
+        else:
+            puntaje_p, nivel_p = 0, "Bajo"
+        if perfil.caracterizacion is not None:
+            vulnerabilidades, _ = vulnerabilidades_desde_caracterizacion(perfil.caracterizacion)
+            puntaje_i, nivel_i, _ = interseccional_anterior(vulnerabilidades)
+        else:
+            puntaje_i, nivel_i = 0, "Bajo"
+
+        assert riesgos["academico"]["nivel"] == nivel_a
+        assert (riesgos["psicologico"]["puntaje"], riesgos["psicologico"]["nivel"]) == (puntaje_p, nivel_p)
+        assert (riesgos["interseccional"]["puntaje"], riesgos["interseccional"]["nivel"]) == (puntaje_i, nivel_i)
+        assert resultado["riesgo_global"] == global_anterior([nivel_a, nivel_p, nivel_i])